@@ -0,0 +1,71 @@
+"""Compare import time and frame throughput of the render engines side by side.
+
+Run from the repository root::
+
+    python -m benchmarks.engines --frames 300
+"""
+from __future__ import annotations
+
+import argparse
+import dataclasses
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import List, Optional
+
+from travelmap.config import RENDER_ENGINES, load_config
+from travelmap.engines import create_animator
+
+_DEFAULT_CONFIG = Path(__file__).resolve().parent.parent / "travelmap" / "examples" / "sample_trip.json"
+_ENGINE_MODULES = {"matplotlib": "travelmap.renderer", "raster": "travelmap.raster"}
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--config", type=Path, default=_DEFAULT_CONFIG)
+    parser.add_argument("--frames", type=int, default=300, help="Number of frames rendered per engine.")
+    parser.add_argument("--speed-kmh", type=float, default=20000.0, help="Override the trip speed.")
+    parser.add_argument("--width", type=int, default=1920)
+    parser.add_argument("--height", type=int, default=1080)
+    return parser.parse_args(argv)
+
+
+def measure_import_seconds(module: str) -> float:
+    """Import ``module`` in a fresh interpreter and return the wall time in seconds."""
+
+    code = f"import time; start = time.perf_counter(); import {module}; print(time.perf_counter() - start)"
+    result = subprocess.run([sys.executable, "-c", code], check=True, capture_output=True, text=True)
+    return float(result.stdout.strip())
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    args = parse_args(argv)
+    config = dataclasses.replace(
+        load_config(args.config), speed_kmh=args.speed_kmh, width=args.width, height=args.height
+    )
+
+    variants = [(engine, True) for engine in RENDER_ENGINES]
+    variants.insert(0, ("matplotlib", False))
+
+    print(f"{'engine':<18}{'import s':>10}{'setup s':>10}{'frames/s':>10}")
+    for engine, cache_static_layer in variants:
+        label = engine if cache_static_layer else f"{engine} (full)"
+        import_seconds = measure_import_seconds(_ENGINE_MODULES[engine])
+        start = time.perf_counter()
+        animator = create_animator(
+            dataclasses.replace(config, engine=engine, cache_static_layer=cache_static_layer)
+        )
+        setup_seconds = time.perf_counter() - start
+
+        frame_count = min(args.frames, len(animator._frame_states))
+        start = time.perf_counter()
+        for index in range(frame_count):
+            animator._render_frame(index)
+        fps = frame_count / (time.perf_counter() - start)
+        animator.close()
+        print(f"{label:<18}{import_seconds:>10.3f}{setup_seconds:>10.3f}{fps:>10.1f}")
+
+
+if __name__ == "__main__":  # pragma: no cover - benchmark entry point
+    main()
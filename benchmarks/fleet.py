@@ -0,0 +1,85 @@
+"""Measure fleet replay throughput as the number of concurrent vehicles grows.
+
+Every fleet is synthetic and deterministic: each vehicle random-walks around
+London for the whole replayed period, so all of them are on the map in every
+frame. Frame rates that fall no faster than the vehicle count grows show that
+drawing has no per-vehicle Python overhead.
+
+Run from the repository root::
+
+    python -m benchmarks.fleet --vehicles 100,1000,5000 --frames 120
+"""
+from __future__ import annotations
+
+import argparse
+import time
+from typing import List, Optional
+
+import numpy as np
+
+from travelmap.config import RENDER_ENGINES, AnimationConfig, FleetConfig, Trip
+from travelmap.engines import create_animator
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--vehicles", default="100,1000,5000", help="Comma-separated fleet sizes (default: 100,1000,5000)."
+    )
+    parser.add_argument("--frames", type=int, default=120, help="Number of frames rendered per case.")
+    parser.add_argument("--positions", type=int, default=97, help="Recorded positions per trip.")
+    parser.add_argument("--trail-minutes", type=float, default=30.0)
+    parser.add_argument("--engine", choices=RENDER_ENGINES, action="append", help="Engines to measure (default: all).")
+    parser.add_argument("--width", type=int, default=1920)
+    parser.add_argument("--height", type=int, default=1080)
+    return parser.parse_args(argv)
+
+
+def synthetic_fleet(vehicles: int, positions: int, seed: int = 0) -> List[Trip]:
+    """Return ``vehicles`` trips recorded every five minutes from 08:00."""
+
+    rng = np.random.default_rng(seed)
+    origins = rng.normal((51.5, -0.1), (0.3, 0.5), size=(vehicles, 2))
+    walks = origins[:, None, :] + rng.normal(0.0, 0.005, size=(vehicles, positions, 2)).cumsum(axis=1)
+    times = 8 * 3600.0 + 300.0 * np.arange(positions)
+    return [
+        Trip(f"Vehicle {index}", [(lat, lon, moment) for (lat, lon), moment in zip(walk.tolist(), times.tolist())])
+        for index, walk in enumerate(walks)
+    ]
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    args = parse_args(argv)
+    engines = args.engine or list(RENDER_ENGINES)
+
+    print(f"{'engine':<12}{'vehicles':>10}{'setup s':>10}{'frames/s':>10}{'vehicle-frames/s':>18}")
+    for vehicles in (int(value) for value in args.vehicles.split(",")):
+        trips = synthetic_fleet(vehicles, args.positions)
+        for engine in engines:
+            config = AnimationConfig(
+                waypoints=[],
+                engine=engine,
+                width=args.width,
+                height=args.height,
+                margin_degrees=0.2,
+                max_frames=args.frames,
+                pause_at_start=0.0,
+                pause_at_end=0.0,
+                summary_display_seconds=0.0,
+                fleet=FleetConfig(trips=trips, trail_minutes=args.trail_minutes),
+            )
+            start = time.perf_counter()
+            animator = create_animator(config)
+            setup_seconds = time.perf_counter() - start
+
+            frame_count = min(args.frames, len(animator._frame_states))
+            start = time.perf_counter()
+            for index in range(frame_count):
+                animator._render_frame(index)
+            fps = frame_count / (time.perf_counter() - start)
+            animator.close()
+            print(f"{engine:<12}{vehicles:>10}{setup_seconds:>10.3f}{fps:>10.1f}{fps * vehicles:>18.0f}")
+
+
+if __name__ == "__main__":  # pragma: no cover - benchmark entry point
+    main()
@@ -0,0 +1,61 @@
+"""Measure frame throughput of the serial and process-pool render paths.
+
+Run from the repository root::
+
+    python -m benchmarks.parallel_render --workers 1 2 4 8
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import time
+from pathlib import Path
+from typing import List, Optional
+
+from travelmap.config import load_config
+from travelmap.renderer import TravelMapAnimator
+
+_DEFAULT_CONFIG = Path(__file__).resolve().parent.parent / "travelmap" / "examples" / "sample_trip.json"
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--config", type=Path, default=_DEFAULT_CONFIG)
+    parser.add_argument(
+        "--workers",
+        type=int,
+        nargs="+",
+        default=sorted({1, 2, 4, os.cpu_count() or 1}),
+        help="Worker counts to benchmark.",
+    )
+    parser.add_argument("--frames", type=int, default=480, help="Number of frames rendered per run.")
+    parser.add_argument("--speed-kmh", type=float, default=20000.0, help="Override the trip speed.")
+    parser.add_argument("--chunk-frames", type=int, default=8)
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    args = parse_args(argv)
+    config = load_config(args.config)
+    config.speed_kmh = args.speed_kmh
+
+    animator = TravelMapAnimator(config)
+    frame_count = min(args.frames, len(animator._frame_states))
+    print(f"{frame_count} frames at {config.width}x{config.height}, {os.cpu_count()} CPUs")
+
+    baseline: Optional[float] = None
+    for workers in args.workers:
+        frames = animator.iter_frames(workers, chunk_frames=args.chunk_frames)
+        start = time.perf_counter()
+        for index, _ in enumerate(frames, start=1):
+            if index >= frame_count:
+                break
+        frames.close()
+        elapsed = time.perf_counter() - start
+        fps = frame_count / elapsed
+        baseline = baseline or fps
+        print(f"workers={workers:<3d} {fps:8.1f} frames/s  speedup x{fps / baseline:.2f}")
+
+
+if __name__ == "__main__":  # pragma: no cover - benchmark entry point
+    main()
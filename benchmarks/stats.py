@@ -0,0 +1,72 @@
+"""Check that ``travelmap stats`` stays light and measure its start-up and per-call time.
+
+The import and one report run in a fresh interpreter, which must not load
+NumPy or any rendering library. The command exits with status 1 when one of
+them is imported or when a call takes longer than ``--max-call-ms``.
+
+Run from the repository root::
+
+    python -m benchmarks.stats --calls 100
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import List, Optional
+
+_DEFAULT_CONFIG = Path(__file__).resolve().parent.parent / "travelmap" / "examples" / "sample_trip.json"
+_HEAVY_MODULES = ("numpy", "matplotlib", "PIL", "imageio")
+_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+from travelmap.stats import _load, trip_stats
+imported = time.perf_counter() - start
+config = _load(sys.argv[1])
+start = time.perf_counter()
+for _ in range(int(sys.argv[2])):
+    trip_stats(config)
+call = (time.perf_counter() - start) / int(sys.argv[2])
+heavy = sorted(name for name in sys.argv[3:] if name in sys.modules)
+print(json.dumps({"import_seconds": imported, "call_seconds": call, "heavy": heavy}))
+"""
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--config", type=Path, default=_DEFAULT_CONFIG)
+    parser.add_argument("--calls", type=int, default=100, help="Reports computed to time one call.")
+    parser.add_argument("--max-call-ms", type=float, default=20.0, help="Slowest acceptable call (default: 20).")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    args = parse_args(argv)
+    command = [sys.executable, "-c", _PROBE, str(args.config), str(args.calls), *_HEAVY_MODULES]
+    probe = json.loads(subprocess.run(command, check=True, capture_output=True, text=True).stdout)
+
+    start = time.perf_counter()
+    subprocess.run(
+        [sys.executable, "-m", "travelmap", "stats", str(args.config)], check=True, capture_output=True
+    )
+    process_seconds = time.perf_counter() - start
+
+    call_ms = probe["call_seconds"] * 1000.0
+    print(f"import travelmap.stats  {probe['import_seconds'] * 1000.0:8.1f} ms")
+    print(f"trip_stats() per call   {call_ms:8.2f} ms")
+    print(f"whole command           {process_seconds * 1000.0:8.1f} ms")
+    failures = []
+    if probe["heavy"]:
+        failures.append(f"imported {', '.join(probe['heavy'])}")
+    if call_ms > args.max_call_ms:
+        failures.append(f"a call took {call_ms:.1f} ms, more than {args.max_call_ms:g} ms")
+    if failures:
+        print(f"FAILED: {'; '.join(failures)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":  # pragma: no cover - benchmark entry point
+    main()
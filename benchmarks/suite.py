@@ -0,0 +1,273 @@
+"""Reproducible benchmark suite over synthetic itineraries, checked against a baseline.
+
+Every case builds a deterministic synthetic configuration and runs in a fresh
+process, so its timings and peak memory are not influenced by earlier cases.
+Nothing is downloaded; only the bundled data is used. Frames go to a null
+writer by default, which measures drawing without ffmpeg; ``--encoder ffmpeg``
+includes encoding and reports the output size.
+
+Run from the repository root::
+
+    python -m benchmarks.suite --save-baseline benchmarks/baseline.json
+    python -m benchmarks.suite --baseline benchmarks/baseline.json --threshold 0.2
+"""
+from __future__ import annotations
+
+import argparse
+import fnmatch
+import json
+import math
+import multiprocessing
+import platform
+import sys
+import tempfile
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from travelmap.config import RENDER_ENGINES, AnimationConfig, VehicleConfig, Waypoint
+
+KM_PER_DEGREE = 111.195
+# Metrics compared against the baseline and whether larger values are better.
+_METRICS = {
+    "timeline_seconds": False,
+    "frames_per_second": True,
+    "peak_rss_bytes": False,
+}
+# Timings this close to the baseline are treated as noise, whatever the ratio.
+_NOISE_FLOOR_SECONDS = 0.005
+
+
+@dataclass(frozen=True)
+class BenchmarkCase:
+    """One point in the benchmark grid.
+
+    The frame count follows from ``distance_km`` and ``speed_kmh`` (plus pauses),
+    like for a real trip. Pause-heavy cases stop for ``pause_seconds`` at every
+    waypoint; motion-heavy cases never stop.
+    """
+
+    name: str
+    waypoints: int = 20
+    distance_km: float = 4000.0
+    speed_kmh: float = 200000.0
+    frame_rate: int = 30
+    width: int = 1920
+    height: int = 1080
+    show_capitals: bool = True
+    pause_seconds: float = 0.0
+    seed: int = 0
+
+
+CASES = [
+    BenchmarkCase("waypoints-2", waypoints=2),
+    BenchmarkCase("waypoints-100", waypoints=100, distance_km=20000.0),
+    BenchmarkCase("waypoints-10k", waypoints=10000, distance_km=200000.0, speed_kmh=2000000.0),
+    BenchmarkCase("frames-long", distance_km=40000.0, speed_kmh=20000.0),
+    BenchmarkCase("fps-60", frame_rate=60),
+    BenchmarkCase("res-720p", width=1280, height=720),
+    BenchmarkCase("res-4k", width=3840, height=2160),
+    BenchmarkCase("no-capitals", show_capitals=False),
+    BenchmarkCase("pause-heavy", pause_seconds=2.0),
+    BenchmarkCase("motion-heavy", speed_kmh=50000.0),
+]
+
+
+def synthetic_waypoints(case: BenchmarkCase) -> List[Waypoint]:
+    """Return a seeded random walk of ``case.waypoints`` stops covering ``case.distance_km``."""
+
+    rng = np.random.default_rng(case.seed)
+    step = case.distance_km / max(case.waypoints - 1, 1) / KM_PER_DEGREE
+    lat, lon = 30.0, -100.0
+    waypoints = []
+    for index in range(case.waypoints):
+        waypoints.append(
+            Waypoint(
+                name=f"Stop {index + 1}",
+                latitude=round(lat, 6),
+                longitude=round(lon, 6),
+                pause_seconds=case.pause_seconds,
+            )
+        )
+        heading = rng.uniform(0.0, 2.0 * math.pi)
+        lat += step * math.cos(heading)
+        lon += step * math.sin(heading) / max(math.cos(math.radians(lat)), 0.2)
+        # Reflect off the high latitudes and the antimeridian to stay on the map.
+        lat = max(-70.0, min(70.0, lat)) if abs(lat) <= 70.0 else math.copysign(140.0, lat) - lat
+        lon = max(-179.0, min(179.0, lon)) if abs(lon) <= 179.0 else math.copysign(358.0, lon) - lon
+    return waypoints
+
+
+def synthetic_config(case: BenchmarkCase, engine: str, output_path: Path) -> AnimationConfig:
+    return AnimationConfig(
+        title=f"Benchmark {case.name}",
+        speed_kmh=case.speed_kmh,
+        frame_rate=case.frame_rate,
+        output_path=output_path,
+        width=case.width,
+        height=case.height,
+        waypoints=synthetic_waypoints(case),
+        vehicle=VehicleConfig(type="plane", fuel_efficiency_mpg=0.2, fuel_price_per_litre=1.4),
+        show_capitals=case.show_capitals,
+        pause_at_start=case.pause_seconds,
+        pause_at_end=case.pause_seconds,
+        engine=engine,
+    )
+
+
+class NullWriter:
+    """Frame writer that discards frames, to measure rendering without encoding."""
+
+    def append_data(self, image: np.ndarray) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+    def __enter__(self) -> "NullWriter":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+
+def run_case(case: BenchmarkCase, engine: str, max_frames: int, encoder: str) -> Dict[str, Any]:
+    """Build, render and measure ``case``; meant to run in a fresh process."""
+
+    from travelmap.engines import create_animator
+    from travelmap.pipeline import DEFAULT_PIPELINE_DEPTH
+    from travelmap.preview import PreviewOptions, select_runs
+    from travelmap.profiling import Profiler
+
+    with tempfile.TemporaryDirectory(prefix="travelmap-bench-") as directory:
+        output_path = Path(directory) / "benchmark.mp4"
+        config = synthetic_config(case, engine, output_path)
+        profiler = Profiler().start()
+        animator = create_animator(config, profiler=profiler)
+        timeline = animator._frame_states
+        runs = select_runs(timeline, PreviewOptions(scale=1.0, frames=(0, max_frames)), config.frame_rate)
+        writer = NullWriter() if encoder == "null" else animator._open_writer(output_path)
+        started = time.perf_counter()
+        with writer:
+            animator._encode(animator.iter_frame_runs(runs=runs), writer, DEFAULT_PIPELINE_DEPTH)
+        render_seconds = time.perf_counter() - started
+        animator.close()
+        profiler.stop()
+        report = profiler.report()
+        output_bytes = output_path.stat().st_size if output_path.exists() else None
+
+    rendered = int(runs[1].sum())
+    return {
+        "case": asdict(case),
+        "engine": engine,
+        "encoder": encoder,
+        "timeline_frames": len(timeline),
+        "rendered_frames": rendered,
+        "drawn_frames": len(runs[0]),
+        "timeline_seconds": report["stages"]["timeline"]["total_seconds"],
+        "setup_seconds": report["stages"]["setup_canvas"]["total_seconds"],
+        "render_seconds": round(render_seconds, 6),
+        "frames_per_second": round(rendered / render_seconds, 3) if render_seconds > 0 else 0.0,
+        "peak_rss_bytes": report["memory"]["peak_rss_bytes"],
+        "output_bytes": output_bytes,
+    }
+
+
+def compare(
+    results: Dict[str, Dict[str, Any]], baseline: Dict[str, Dict[str, Any]], threshold: float
+) -> List[str]:
+    """Return a description of every metric that regressed by more than ``threshold``."""
+
+    regressions = []
+    for key, result in results.items():
+        reference = baseline.get(key)
+        if reference is None:
+            continue
+        for metric, higher_is_better in _METRICS.items():
+            current, previous = result.get(metric), reference.get(metric)
+            if not current or not previous:
+                continue
+            if metric.endswith("_seconds") and abs(current - previous) < _NOISE_FLOOR_SECONDS:
+                continue
+            change = current / previous - 1.0
+            if (higher_is_better and change < -threshold) or (not higher_is_better and change > threshold):
+                regressions.append(f"{key}: {metric} {previous:g} -> {current:g} ({change:+.1%})")
+    return regressions
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--cases", nargs="+", default=["*"], help="Case names or glob patterns to run (default: all)."
+    )
+    parser.add_argument("--engine", choices=RENDER_ENGINES, nargs="+", default=["raster"])
+    parser.add_argument("--frames", type=int, default=240, help="Maximum frames rendered per case.")
+    parser.add_argument(
+        "--encoder",
+        choices=("null", "ffmpeg"),
+        default="null",
+        help="Discard frames (null, default) or encode them with ffmpeg.",
+    )
+    parser.add_argument("--output", type=Path, default=None, help="Write the results to this JSON file.")
+    parser.add_argument("--baseline", type=Path, default=None, help="Compare against this results file.")
+    parser.add_argument("--save-baseline", type=Path, default=None, help="Store the results as a baseline.")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.15,
+        help="Relative change that counts as a regression (default: 0.15).",
+    )
+    parser.add_argument("--list", action="store_true", help="List the cases and exit.")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    args = parse_args(argv)
+    cases = [case for case in CASES if any(fnmatch.fnmatch(case.name, pattern) for pattern in args.cases)]
+    if args.list:
+        for case in cases:
+            print(f"{case.name:<16} {case}")
+        return
+
+    # Each case gets a fresh interpreter so that caches and peak RSS do not leak between cases.
+    context = multiprocessing.get_context("spawn")
+    results: Dict[str, Dict[str, Any]] = {}
+    print(f"{'case':<26}{'frames':>9}{'timeline s':>12}{'setup s':>9}{'frames/s':>10}{'peak MB':>9}")
+    for engine in args.engine:
+        for case in cases:
+            with context.Pool(1, maxtasksperchild=1) as pool:
+                result = pool.apply(run_case, (case, engine, args.frames, args.encoder))
+            key = f"{engine}/{case.name}"
+            results[key] = result
+            peak = (result["peak_rss_bytes"] or 0) / 1024**2
+            print(
+                f"{key:<26}{result['timeline_frames']:>9}{result['timeline_seconds']:>12.4f}"
+                f"{result['setup_seconds']:>9.3f}{result['frames_per_second']:>10.1f}{peak:>9.1f}",
+                flush=True,
+            )
+
+    document = {
+        "environment": {"python": platform.python_version(), "platform": platform.platform()},
+        "frames": args.frames,
+        "encoder": args.encoder,
+        "results": results,
+    }
+    for path in (args.output, args.save_baseline):
+        if path is not None:
+            path.write_text(json.dumps(document, indent=2) + "\n", encoding="utf8")
+
+    if args.baseline is not None:
+        baseline = json.loads(args.baseline.read_text(encoding="utf8"))["results"]
+        regressions = compare(results, baseline, args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions beyond {args.threshold:.0%} against {args.baseline}")
+
+
+if __name__ == "__main__":  # pragma: no cover - benchmark entry point
+    main()
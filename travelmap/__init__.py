@@ -1,12 +1,43 @@
 """Travel map animation package."""
 
-from .config import AnimationConfig, VehicleConfig, Waypoint, load_config
-from .renderer import TravelMapAnimator
+import importlib
+from typing import Any
 
 __all__ = [
     "AnimationConfig",
+    "FleetConfig",
     "VehicleConfig",
     "Waypoint",
     "load_config",
+    "create_animator",
+    "RasterTravelMapAnimator",
     "TravelMapAnimator",
 ]
+
+# Public names and the modules that define them. Everything is imported on
+# first access so that ``import travelmap`` stays cheap: loading a
+# configuration never imports NumPy, and the raster engine never imports
+# matplotlib.
+_EXPORTS = {
+    "AnimationConfig": "config",
+    "FleetConfig": "config",
+    "VehicleConfig": "config",
+    "Waypoint": "config",
+    "load_config": "config",
+    "create_animator": "engines",
+    "RasterTravelMapAnimator": "raster",
+    "TravelMapAnimator": "renderer",
+}
+
+
+def __getattr__(name: str) -> Any:
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list:
+    return sorted(set(globals()) | set(__all__))
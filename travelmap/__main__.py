@@ -1,8 +1,26 @@
 """Module entry point to run the animator via ``python -m travelmap``."""
 from __future__ import annotations
 
-from .main import main
+import sys
 
 
-if __name__ == "__main__":  # pragma: no cover - CLI entry point
+def run() -> None:
+    # Subcommands are dispatched before the render CLI is imported so that
+    # ``stats`` starts without loading any of the rendering modules.
+    if sys.argv[1:2] == ["stats"]:
+        from .stats import main as stats_main
+
+        stats_main(sys.argv[2:])
+        return
+    if sys.argv[1:2] == ["serve"]:
+        from .serve import main as serve_main
+
+        serve_main(sys.argv[2:])
+        return
+    from .main import main
+
     main()
+
+
+if __name__ == "__main__":  # pragma: no cover - CLI entry point
+    run()
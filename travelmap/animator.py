@@ -0,0 +1,499 @@
+"""Engine-independent parts of the travel map animator."""
+from __future__ import annotations
+
+import contextlib
+from pathlib import Path
+from typing import ContextManager, Iterator, List, Optional, Sequence, Tuple
+
+import imageio.v2 as imageio
+import numpy as np
+
+from .checkpoint import CheckpointOptions, render_checkpointed
+from .config import AnimationConfig, Waypoint
+from .icons import SpriteAtlas, load_vehicle_icon
+from .parallel import DEFAULT_CHUNK_FRAMES, iter_frame_runs_parallel
+from .map_shapes import open_shape_layer
+from .places import Place, declutter, open_place_index
+from .outputs import MultiWriter, ResolvedOutput, resolve_outputs
+from .pipeline import DEFAULT_PIPELINE_DEPTH, PipelineStats, encode_pipelined, write_run
+from .profiling import Profiler
+from .projections import projection_for, visible_projected_rings
+from .progress import ProgressCallback, RenderCancelled, track_progress
+from .preview import PREVIEW_ENCODER_SETTINGS, PreviewOptions, preview_config, select_runs
+from .segment_cache import CacheStats, SegmentCache, render_cached
+from .summary import LegSummary, compute_leg_summaries, format_summary_text
+from .timeline import Timeline, build_timeline
+
+VIDEO_CODEC = "libx264"
+VIDEO_QUALITY = 8
+
+# Label sizes in points, shared by both engines, and the DPI they render at.
+PLACE_LABEL_POINTS = 6.0
+WAYPOINT_LABEL_POINTS = 9.0
+_LABEL_DPI = 100.0
+# Only the highest priority places are considered for decluttering.
+_LABEL_CANDIDATES_PER_SLOT = 8
+# Map polygons are clipped this many pixels outside the viewport so that clip
+# edges and their outline strokes stay out of sight.
+_CLIP_MARGIN_PIXELS = 4.0
+
+
+class BaseAnimator:
+    """Shared timeline, summary and video export logic for the render engines.
+
+    Subclasses provide :meth:`_setup_canvas` to prepare their drawing surface and
+    a ``_sprite_atlas`` for the vehicle, and :meth:`_render_frame` to turn a
+    timeline frame into an RGB or RGBA array.
+
+    The route, vehicle positions and headings are projected once up front
+    (``_route_xy``, ``_position_xy``, ``_screen_bearings``); engines draw frames
+    by slicing those arrays and never project per frame.
+    """
+
+    _sprite_atlas: SpriteAtlas
+
+    def __init__(self, config: AnimationConfig, profiler: Optional[Profiler] = None) -> None:
+        self.config = config
+        self.profiler = profiler
+        self.pipeline_stats: Optional[PipelineStats] = None
+        self._progress: Optional[ProgressCallback] = None
+        self.cache_stats: Optional[CacheStats] = None
+        self.output_paths: List[Path] = []
+        with self._stage("load_data"):
+            self._place_index = open_place_index(config.gazetteer)
+            self._shape_layer = open_shape_layer(config.map_data)
+            self._vehicle_icon = load_vehicle_icon(config.vehicle)
+        with self._stage("summary"):
+            self._leg_summaries, self._total_distance_miles, self._total_fuel_cost = (
+                self._compute_leg_summaries(config.waypoints)
+            )
+            self._summary_text_content = self._format_summary_text()
+        with self._stage("timeline"):
+            self._frame_states = self._build_frames(config.waypoints)
+        with self._stage("projection"):
+            self._project_route()
+        with self._stage("setup_canvas"):
+            self._setup_canvas()
+
+    def _stage(self, name: str) -> ContextManager[None]:
+        """Time the enclosed block as stage ``name`` when a profiler is attached."""
+
+        if self.profiler is None:
+            return contextlib.nullcontext()
+        return self.profiler.stage(name)
+
+    # ------------------------------------------------------------------
+    # Timeline construction
+    # ------------------------------------------------------------------
+
+    def _build_frames(self, waypoints: Sequence[Waypoint]) -> Timeline:
+        return build_timeline(self.config, waypoints)
+
+    def _compute_leg_summaries(
+        self, waypoints: Sequence[Waypoint]
+    ) -> Tuple[List[LegSummary], float, Optional[float]]:
+        return compute_leg_summaries(self.config, waypoints)
+
+    def _format_summary_text(self) -> str:
+        return format_summary_text(
+            self.config, self._leg_summaries, self._total_distance_miles, self._total_fuel_cost
+        )
+
+    # ------------------------------------------------------------------
+    # Rendering helpers
+    # ------------------------------------------------------------------
+
+    def _project_route(self) -> None:
+        """Project the route vertices, vehicle positions and headings of every frame."""
+
+        timeline = self._frame_states
+        self._projection = projection = projection_for(self.config, timeline.vertices)
+        self._route_xy = projection.project(timeline.vertices, starts=[0])
+        self._waypoint_xy = self._route_xy[timeline.waypoint_indices]
+        # Positions wrap like the route vertex they follow.
+        anchors = projection.map_longitudes(timeline.vertices[:, 1], starts=[0])[
+            np.maximum(timeline.trail_counts - 1, 0)
+        ]
+        self._position_xy = projection.project(timeline.positions, near=anchors)
+        self._screen_bearings = projection.screen_bearings(timeline.positions, timeline.bearings, near=anchors)
+
+    def _compute_limits(self) -> None:
+        # The route includes the waypoints and any leg paths between them.
+        xs, ys = self._route_xy[:, 0], self._route_xy[:, 1]
+        margin = self.config.margin_degrees
+        self._x_min = float(xs.min()) - margin
+        self._x_max = float(xs.max()) + margin
+        self._y_min = float(ys.min()) - margin
+        self._y_max = float(ys.max()) + margin
+        if not self._projection.is_identity:
+            # Projected maps keep their shapes; the equirectangular map fills the frame.
+            width, height = self._viewport_pixels()
+            scale = min(width / (self._x_max - self._x_min), height / (self._y_max - self._y_min))
+            x_centre, y_centre = (self._x_min + self._x_max) / 2.0, (self._y_min + self._y_max) / 2.0
+            self._x_min, self._x_max = x_centre - width / scale / 2.0, x_centre + width / scale / 2.0
+            self._y_min, self._y_max = y_centre - height / scale / 2.0, y_centre + height / scale / 2.0
+
+    def _viewport_pixels(self) -> Tuple[float, float]:
+        """Approximate ``(width, height)`` in pixels of the map area.
+
+        Engines that know their exact layout override this; the default is the
+        whole frame.
+        """
+
+        return float(self.config.width), float(self.config.height)
+
+    def _pixels_per_degree(self) -> float:
+        """Pixels per degree, or per projected unit, of the current viewport."""
+
+        width, height = self._viewport_pixels()
+        return max(width / abs(self._x_max - self._x_min), height / abs(self._y_max - self._y_min))
+
+    def _view_pixels(self, points: np.ndarray) -> np.ndarray:
+        """Approximate pixel positions of projected ``(x, y)`` rows, relative to the viewport."""
+
+        width, height = self._viewport_pixels()
+        x = (points[:, 0] - self._x_min) / (self._x_max - self._x_min) * width
+        y = (self._y_max - points[:, 1]) / (self._y_max - self._y_min) * height
+        return np.column_stack((x, y))
+
+    def _label_pixels(self, points: np.ndarray) -> np.ndarray:
+        """Approximate pixel positions of projected ``(x, y)`` rows for label placement."""
+
+        return self._view_pixels(points)
+
+    def _geographic_bounds(self) -> Tuple[float, float, float, float]:
+        """Return a ``(lat_min, lat_max, lon_min, lon_max)`` box covering the viewport."""
+
+        return self._projection.geographic_bounds(self._x_min, self._x_max, self._y_min, self._y_max)
+
+    def _visible_shapes(self) -> Tuple[np.ndarray, ...]:
+        """Return the map polygons to draw as closed, projected ``(K, 2)`` x/y arrays.
+
+        The level of detail follows the output resolution and polygons are
+        clipped to the viewport. The projected rings are cached and read-only.
+        """
+
+        pixels_per_degree = self._pixels_per_degree()
+        margin = _CLIP_MARGIN_PIXELS / pixels_per_degree
+        lat_min, lat_max, lon_min, lon_max = self._geographic_bounds()
+        bounds = (lat_min - margin, lat_max + margin, lon_min - margin, lon_max + margin)
+        return visible_projected_rings(self._shape_layer, self._projection, bounds, pixels_per_degree)
+
+    def _visible_places(self) -> Tuple[List[Place], np.ndarray]:
+        """Return the gazetteer places to label, without overlapping labels.
+
+        Places in the viewport are taken in priority order and a label is dropped
+        when its estimated box overlaps a waypoint label or a label kept earlier.
+        The places are returned with their projected ``(x, y)`` positions.
+        """
+
+        limit = self.config.max_place_labels
+        if not self.config.show_capitals or limit <= 0:
+            return [], np.zeros((0, 2))
+        lat_min, lat_max, lon_min, lon_max = self._geographic_bounds()
+        index = self._place_index
+        candidates = index.query(lat_min, lat_max, lon_min, lon_max, limit=limit * _LABEL_CANDIDATES_PER_SLOT)
+        points = self._projection.project(
+            np.column_stack((index.latitudes[candidates], index.longitudes[candidates]))
+        )
+        if not self._projection.is_identity:
+            # The lat/lon query box of a projected view is larger than the view.
+            pixels = self._view_pixels(points)
+            width, height = self._viewport_pixels()
+            inside = (pixels[:, 0] >= 0.0) & (pixels[:, 0] <= width)
+            inside &= (pixels[:, 1] >= 0.0) & (pixels[:, 1] <= height)
+            candidates, points = candidates[inside], points[inside]
+        if not len(candidates):
+            return [], np.zeros((0, 2))
+
+        waypoints = self.config.waypoints
+        names = [waypoint.name for waypoint in waypoints] + [index.name(i) for i in candidates.tolist()]
+        coordinates = np.concatenate((self._waypoint_xy, points))
+        sizes = np.array(
+            [WAYPOINT_LABEL_POINTS] * len(waypoints) + [PLACE_LABEL_POINTS] * len(candidates)
+        ) * (_LABEL_DPI / 72.0)
+        # DejaVu Sans averages about 0.6 em per character and 1.2 em per line.
+        widths = np.array([len(name) for name in names]) * 0.6 * sizes
+        heights = 1.2 * sizes
+        centres = self._label_pixels(coordinates)
+        # Waypoint labels sit above their point; place labels are centred on it.
+        centres[: len(waypoints), 1] -= heights[: len(waypoints)] / 2.0
+        boxes = np.column_stack(
+            (
+                centres[:, 0] - widths / 2.0,
+                centres[:, 1] - heights / 2.0,
+                centres[:, 0] + widths / 2.0,
+                centres[:, 1] + heights / 2.0,
+            )
+        )
+        kept = [i - len(waypoints) for i in declutter(boxes, cell_size=heights.max() * 4) if i >= len(waypoints)]
+        kept = kept[:limit]
+        return index.places(candidates[kept]), points[kept]
+
+    def _setup_canvas(self) -> None:
+        raise NotImplementedError
+
+    def _render_frame(self, index: int) -> np.ndarray:
+        """Draw frame ``index`` of the timeline and return its pixels."""
+
+        raise NotImplementedError
+
+    def close(self) -> None:
+        """Release any resources held by the drawing surface."""
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    def iter_frame_runs(
+        self,
+        workers: int = 1,
+        chunk_frames: int = DEFAULT_CHUNK_FRAMES,
+        share_sprites: bool = True,
+        runs: Optional[Tuple[np.ndarray, np.ndarray]] = None,
+    ) -> Iterator[Tuple[np.ndarray, int]]:
+        """Yield ``(image, repeat)`` pairs covering the animation in order.
+
+        Runs of identical frames (pauses and the summary hold) are rendered once
+        and reported with the number of times the image repeats. The image may be
+        a buffer that is reused by the next iteration.
+
+        With ``workers`` greater than one the timeline is rendered by a pool of
+        processes, each with its own canvas, and the frames are reordered before
+        being yielded. ``share_sprites`` pre-rotates the vehicle once into a
+        shared-memory atlas that all workers read from. ``runs`` restricts the
+        output to the given ``(starts, lengths)`` instead of the whole timeline.
+        """
+
+        run_starts, run_lengths = self._frame_states.runs() if runs is None else runs
+        if workers > 1:
+            atlas = self._sprite_atlas
+            handle = atlas.share() if share_sprites and atlas.resolution > 0 else None
+            frames = iter_frame_runs_parallel(
+                self.config,
+                run_starts,
+                run_lengths,
+                workers,
+                chunk_frames=chunk_frames,
+                sprite_atlas=handle,
+            )
+            try:
+                while True:
+                    with self._stage("collect"):
+                        item = next(frames, None)
+                    if item is None:
+                        break
+                    if self.profiler is not None:
+                        self.profiler.count_run(item[1])
+                    yield item
+            finally:
+                frames.close()
+                atlas.release()
+            return
+        for start, length in zip(run_starts.tolist(), run_lengths.tolist()):
+            with self._stage("render_frame"):
+                image = self._render_frame(start)
+            if self.profiler is not None:
+                self.profiler.count_run(length)
+            yield image, length
+
+    def iter_frames(
+        self,
+        workers: int = 1,
+        chunk_frames: int = DEFAULT_CHUNK_FRAMES,
+        share_sprites: bool = True,
+    ) -> Iterator[np.ndarray]:
+        """Yield every rendered frame of the animation in order.
+
+        See :meth:`iter_frame_runs` for the parameters; repeated frames are yielded
+        as the same array.
+        """
+
+        for image, repeat in self.iter_frame_runs(workers, chunk_frames, share_sprites):
+            for _ in range(repeat):
+                yield image
+
+    def encoder_settings(self) -> dict:
+        """Return the settings passed to the video encoder."""
+
+        return {
+            "fps": self.config.frame_rate,
+            "codec": VIDEO_CODEC,
+            "macro_block_size": None,
+            "quality": VIDEO_QUALITY,
+        }
+
+    def _open_writer(self, output_path: Path, **overrides):
+        settings = dict(self.encoder_settings(), **overrides)
+        try:
+            writer = imageio.get_writer(output_path, format="FFMPEG", **settings)
+        except ImportError as exc:
+            raise ImportError(
+                "FFMPEG support is required to export videos. Install the "
+                "'imageio-ffmpeg' package (for example via 'pip install "
+                "imageio-ffmpeg') and try again."
+            ) from exc
+        return writer if self.profiler is None else self.profiler.wrap_writer(writer)
+
+    def _open_outputs(self, outputs: List[ResolvedOutput]):
+        """Open one writer, or a :class:`MultiWriter` fanning out to every output."""
+
+        if len(outputs) == 1:
+            return self._open_writer(outputs[0].output_path)
+        return MultiWriter(
+            outputs, lambda output: self._open_writer(output.output_path, **output.encoder_overrides)
+        )
+
+    def render(
+        self,
+        workers: int = 1,
+        chunk_frames: int = DEFAULT_CHUNK_FRAMES,
+        share_sprites: bool = True,
+        pipeline_depth: int = DEFAULT_PIPELINE_DEPTH,
+        cache: Optional[SegmentCache] = None,
+        preview: Optional[PreviewOptions] = None,
+        progress: Optional[ProgressCallback] = None,
+        checkpoint: Optional[CheckpointOptions] = None,
+    ) -> Path:
+        """Render the animation to ``config.output_path`` and return the path.
+
+        With a positive ``pipeline_depth`` frames are encoded on a separate thread
+        while the next ones are drawn; the resulting queue and stall metrics are
+        stored in :attr:`pipeline_stats`. A depth of ``0`` draws and encodes
+        serially on the calling thread.
+
+        With a ``cache`` each leg is encoded as its own segment and only segments
+        missing from the cache are rendered; reuse metrics are stored in
+        :attr:`cache_stats`.
+
+        With a ``checkpoint`` the video is encoded in chunks that are committed
+        to disk as they complete, and a render that was interrupted resumes
+        after the last committed chunk; see
+        :class:`~travelmap.checkpoint.CheckpointOptions`. Metrics are stored in
+        :attr:`cache_stats`.
+
+        The ``outputs`` of the configuration are written in the same pass: each
+        frame is drawn once and downscaled to every output's size, and
+        :attr:`output_paths` lists every video written. They cannot be combined
+        with the cache or checkpoints, and neither can a ``fleet`` replay.
+
+        With ``preview`` a draft is rendered instead, see :class:`PreviewOptions`.
+
+        ``progress`` is called with a :class:`~travelmap.progress.RenderProgress`
+        as frames are drawn. It may raise
+        :class:`~travelmap.progress.RenderCancelled` to stop the render; the
+        partial video is deleted (cached segments and checkpoint chunks already
+        completed are kept) and the exception propagates.
+        """
+
+        if preview is not None:
+            if cache is not None:
+                raise ValueError("Previews cannot be combined with the segment cache.")
+            if checkpoint is not None:
+                raise ValueError("Previews cannot be checkpointed.")
+            self._progress = progress
+            return self._render_preview(preview, workers, chunk_frames, share_sprites, pipeline_depth)
+
+        if self.config.outputs and (cache is not None or checkpoint is not None):
+            raise ValueError("Multiple outputs cannot be combined with the segment cache or checkpoints.")
+        if self.config.fleet is not None and (cache is not None or checkpoint is not None):
+            raise ValueError("Fleet replays cannot be combined with the segment cache or checkpoints.")
+        outputs = resolve_outputs(self.config)
+        for output in outputs:
+            output.output_path.parent.mkdir(parents=True, exist_ok=True)
+        output_path = outputs[0].output_path
+
+        self._progress = progress
+        try:
+            if checkpoint is not None:
+                self.cache_stats = render_checkpointed(
+                    self,
+                    checkpoint,
+                    output_path,
+                    workers,
+                    chunk_frames,
+                    share_sprites,
+                    pipeline_depth,
+                    cache=cache,
+                )
+            elif cache is not None:
+                self.cache_stats = render_cached(
+                    self, cache, output_path, workers, chunk_frames, share_sprites, pipeline_depth
+                )
+            else:
+                runs = self.iter_frame_runs(workers, chunk_frames=chunk_frames, share_sprites=share_sprites)
+                try:
+                    with self._open_outputs(outputs) as writer:
+                        self._encode(runs, writer, pipeline_depth)
+                except RenderCancelled:
+                    for output in outputs:
+                        output.output_path.unlink(missing_ok=True)
+                    raise
+        finally:
+            self._progress = None
+            self.close()
+
+        self.output_paths = [output.output_path for output in outputs]
+        return output_path
+
+    def _render_preview(
+        self,
+        preview: PreviewOptions,
+        workers: int,
+        chunk_frames: int,
+        share_sprites: bool,
+        pipeline_depth: int,
+    ) -> Path:
+        config = preview_config(self.config, preview)
+        # A smaller frame needs its own canvas; the timeline is the same.
+        animator = self
+        if (config.width, config.height) != (self.config.width, self.config.height):
+            animator = type(self)(config, profiler=self.profiler)
+        animator._progress, self._progress = self._progress, None
+        output_path = Path(config.output_path)
+        try:
+            runs = select_runs(animator._frame_states, preview, config.frame_rate)
+            overrides = dict(PREVIEW_ENCODER_SETTINGS) if preview.fast_encoder else {}
+            overrides["fps"] = config.frame_rate / preview.stride
+
+            output_path.parent.mkdir(parents=True, exist_ok=True)
+            frames = animator.iter_frame_runs(
+                workers, chunk_frames=chunk_frames, share_sprites=share_sprites, runs=runs
+            )
+            try:
+                with animator._open_writer(output_path, **overrides) as writer:
+                    animator._encode(frames, writer, pipeline_depth, int(runs[1].sum()))
+            except RenderCancelled:
+                output_path.unlink(missing_ok=True)
+                raise
+        finally:
+            animator._progress = None
+            animator.close()
+            if animator is not self:
+                self.close()
+        self.pipeline_stats = animator.pipeline_stats
+        self.output_paths = [output_path]
+        return output_path
+
+    def _encode(
+        self,
+        runs: Iterator[Tuple[np.ndarray, int]],
+        writer,
+        pipeline_depth: int,
+        frame_count: Optional[int] = None,
+        frames_reused: int = 0,
+    ) -> None:
+        """Write ``runs`` to ``writer``.
+
+        ``frame_count`` is the total reported as progress, of which
+        ``frames_reused`` are already done without being in ``runs``.
+        """
+
+        if self._progress is not None:
+            total = len(self._frame_states) if frame_count is None else frame_count
+            runs = track_progress(runs, self._progress, total, frames_reused=frames_reused)
+        if pipeline_depth > 0:
+            self.pipeline_stats = encode_pipelined(runs, writer, depth=pipeline_depth)
+        else:
+            for image, repeat in runs:
+                write_run(writer, image, repeat)
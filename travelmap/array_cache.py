@@ -0,0 +1,72 @@
+"""On-disk caches of derived NumPy arrays, memory-mapped when reopened."""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+# ``meta.json`` is written last and marks a cache directory as complete.
+_META_FILE = "meta.json"
+
+
+def default_cache_dir() -> Path:
+    """Directory for derived data caches (``$TRAVELMAP_CACHE_DIR`` or the XDG cache)."""
+
+    if os.environ.get("TRAVELMAP_CACHE_DIR"):
+        return Path(os.environ["TRAVELMAP_CACHE_DIR"])
+    base = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(base) / "travelmap"
+
+
+def source_fingerprint(source: Path, *params: Any) -> str:
+    """Identify the derived data of ``source`` by its path, size, mtime and ``params``."""
+
+    source = Path(source).resolve()
+    stat = source.stat()
+    payload = json.dumps([str(source), stat.st_size, stat.st_mtime_ns, *params], default=str)
+    return hashlib.sha256(payload.encode("utf8")).hexdigest()
+
+
+def cache_directory(kind: str, fingerprint: str, cache_dir: Optional[Path] = None) -> Path:
+    return Path(cache_dir or default_cache_dir()) / kind / fingerprint[:32]
+
+
+def load_arrays(directory: Path) -> Optional[Tuple[Dict[str, np.ndarray], Dict[str, Any]]]:
+    """Memory-map the arrays saved by :func:`save_arrays`, or return ``None`` if absent."""
+
+    meta_path = directory / _META_FILE
+    if not meta_path.exists():
+        return None
+    meta = json.loads(meta_path.read_text(encoding="utf8"))
+    arrays = {name: np.load(directory / f"{name}.npy", mmap_mode="r") for name in meta["arrays"]}
+    return arrays, meta
+
+
+def save_arrays(directory: Path, arrays: Dict[str, np.ndarray], meta: Optional[Dict[str, Any]] = None) -> bool:
+    """Atomically write ``arrays`` and ``meta`` to ``directory``.
+
+    Returns ``False`` when the cache location is not writable.
+    """
+
+    try:
+        directory.parent.mkdir(parents=True, exist_ok=True)
+        staging = Path(tempfile.mkdtemp(dir=directory.parent, prefix=".staging-"))
+    except OSError:
+        return False
+    try:
+        for name, array in arrays.items():
+            np.save(staging / f"{name}.npy", np.ascontiguousarray(array))
+        payload = dict(meta or {}, arrays=list(arrays))
+        (staging / _META_FILE).write_text(json.dumps(payload), encoding="utf8")
+        os.replace(staging, directory)
+    except OSError:
+        # Another process may have completed the same directory first.
+        shutil.rmtree(staging, ignore_errors=True)
+        return (directory / _META_FILE).exists()
+    return True
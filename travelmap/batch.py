@@ -0,0 +1,208 @@
+"""Render many configurations in one go over a pool of warm worker processes."""
+from __future__ import annotations
+
+import glob
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional, Sequence
+
+from .checkpoint import CheckpointOptions
+from .pipeline import DEFAULT_PIPELINE_DEPTH
+from .preview import PreviewOptions
+from .segment_cache import SegmentCache
+
+_GLOB_CHARACTERS = set("*?[")
+
+
+@dataclass
+class JobResult:
+    """Outcome of rendering a single configuration."""
+
+    config_path: Path
+    output_path: Optional[Path] = None
+    frames: int = 0
+    seconds: float = 0.0
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+    @property
+    def frames_per_second(self) -> float:
+        return self.frames / self.seconds if self.seconds > 0 else 0.0
+
+    def describe(self) -> str:
+        if not self.ok:
+            return f"Failed {self.config_path}: {self.error}"
+        return (
+            f"Saved animation to {self.output_path} ({self.frames} frames in "
+            f"{self.seconds:.2f}s, {self.frames_per_second:.1f} fps)"
+        )
+
+
+@dataclass
+class BatchSummary:
+    """Aggregate throughput of a batch render."""
+
+    results: List[JobResult]
+    wall_seconds: float
+
+    @property
+    def frames(self) -> int:
+        return sum(result.frames for result in self.results if result.ok)
+
+    @property
+    def failed(self) -> int:
+        return sum(not result.ok for result in self.results)
+
+    def describe(self) -> str:
+        rate = self.frames / self.wall_seconds if self.wall_seconds > 0 else 0.0
+        return (
+            f"{len(self.results)} jobs ({self.failed} failed), {self.frames} frames in "
+            f"{self.wall_seconds:.2f}s, {rate:.1f} fps overall"
+        )
+
+
+def read_manifest(path: Path) -> List[str]:
+    """Return the config paths listed in a manifest, one per line.
+
+    Blank lines and ``#`` comments are ignored and relative entries are resolved
+    against the manifest's directory. Entries may be glob patterns.
+    """
+
+    path = Path(path)
+    entries: List[str] = []
+    with path.open("r", encoding="utf8") as handle:
+        for line in handle:
+            entry = line.split("#", 1)[0].strip()
+            if entry:
+                entries.append(str(path.parent / entry))
+    return entries
+
+
+def expand_config_paths(patterns: Iterable[str]) -> List[Path]:
+    """Expand config paths and glob patterns, preserving order and dropping duplicates."""
+
+    paths: List[Path] = []
+    seen = set()
+    for pattern in patterns:
+        if _GLOB_CHARACTERS & set(pattern):
+            matches = sorted(glob.glob(pattern, recursive=True))
+            if not matches:
+                raise FileNotFoundError(f"No configuration files match {pattern!r}")
+        else:
+            matches = [pattern]
+        for match in matches:
+            path = Path(match)
+            if path.resolve() not in seen:
+                seen.add(path.resolve())
+                paths.append(path)
+    return paths
+
+
+def _warm_worker() -> None:
+    """Load the per-process caches before the first job arrives."""
+
+    from .places import open_place_index
+    from .raster import load_font
+
+    open_place_index()
+    load_font(10)
+    # Importing the matplotlib engine up front keeps its import cost out of the
+    # first job's timing; the raster engine does not need it.
+    try:
+        from . import renderer  # noqa: F401
+    except ImportError:  # pragma: no cover - matplotlib is optional for raster-only batches
+        pass
+
+
+def render_job(
+    config_path: Path,
+    workers: int = 1,
+    pipeline_depth: int = DEFAULT_PIPELINE_DEPTH,
+    cache: Optional[SegmentCache] = None,
+    preview: Optional[PreviewOptions] = None,
+    checkpoint: Optional[CheckpointOptions] = None,
+) -> JobResult:
+    """Render one configuration, capturing failures in the returned :class:`JobResult`."""
+
+    from .config import load_config
+    from .engines import create_animator
+
+    result = JobResult(config_path=Path(config_path))
+    started = time.perf_counter()
+    animator = None
+    try:
+        animator = create_animator(load_config(config_path))
+        result.frames = len(animator._frame_states)
+        result.output_path = animator.render(
+            workers=workers,
+            pipeline_depth=pipeline_depth,
+            cache=cache,
+            preview=preview,
+            checkpoint=checkpoint,
+        )
+        if preview is not None and animator.pipeline_stats is not None:
+            result.frames = animator.pipeline_stats.frames
+    except Exception as exc:  # noqa: BLE001 - one failed job must not stop the batch
+        result.error = f"{type(exc).__name__}: {exc}"
+    finally:
+        # Warm workers render many jobs, so a failed one must not keep its figure.
+        if animator is not None:
+            animator.close()
+    result.seconds = time.perf_counter() - started
+    return result
+
+
+def iter_batch(
+    config_paths: Sequence[Path],
+    jobs: int = 1,
+    workers: int = 1,
+    pipeline_depth: int = DEFAULT_PIPELINE_DEPTH,
+    cache: Optional[SegmentCache] = None,
+    preview: Optional[PreviewOptions] = None,
+    checkpoint: Optional[CheckpointOptions] = None,
+) -> Iterator[JobResult]:
+    """Render ``config_paths`` and yield each :class:`JobResult` as it completes.
+
+    With ``jobs`` greater than one the configurations are spread over a pool of
+    processes that stay alive for the whole batch, so imports, the place
+    table, vehicle icons, sprite atlases and fonts are loaded once per worker
+    rather than once per job. ``workers`` applies to each job and can only be
+    combined with ``jobs=1``. A ``checkpoint`` without a directory keeps each
+    configuration's chunks next to its own output.
+    """
+
+    if jobs < 1:
+        raise ValueError("At least one batch job slot is required.")
+    if jobs > 1 and workers > 1:
+        raise ValueError("Frame workers cannot be combined with parallel batch jobs.")
+    if jobs == 1 or len(config_paths) == 1:
+        for path in config_paths:
+            yield render_job(path, workers, pipeline_depth, cache, preview, checkpoint)
+        return
+    with ProcessPoolExecutor(max_workers=min(jobs, len(config_paths)), initializer=_warm_worker) as pool:
+        futures = [
+            pool.submit(render_job, path, 1, pipeline_depth, cache, preview, checkpoint) for path in config_paths
+        ]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+def render_batch(
+    config_paths: Sequence[Path],
+    jobs: int = 1,
+    workers: int = 1,
+    pipeline_depth: int = DEFAULT_PIPELINE_DEPTH,
+    cache: Optional[SegmentCache] = None,
+    preview: Optional[PreviewOptions] = None,
+    checkpoint: Optional[CheckpointOptions] = None,
+) -> BatchSummary:
+    """Render every configuration and return the aggregate :class:`BatchSummary`."""
+
+    started = time.perf_counter()
+    results = list(iter_batch(config_paths, jobs, workers, pipeline_depth, cache, preview, checkpoint))
+    return BatchSummary(results, time.perf_counter() - started)
@@ -0,0 +1,79 @@
+"""Camera paths for the follow mode: centre on the vehicle and zoom per leg."""
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+if TYPE_CHECKING:  # pragma: no cover - imported for type checking only
+    from .config import AnimationConfig
+    from .timeline import Timeline
+
+
+def _smoothstep(t: np.ndarray) -> np.ndarray:
+    t = np.clip(t, 0.0, 1.0)
+    return t * t * (3.0 - 2.0 * t)
+
+
+def leg_spans(config: "AnimationConfig", timeline: "Timeline") -> np.ndarray:
+    """Return the longitude span in degrees that frames each leg, one entry per leg.
+
+    The span covers the leg's route (its waypoints, its path and every vehicle
+    position on it) with ``camera_padding`` on each side, so the whole leg
+    stays in view while the camera is centred on the vehicle.
+    """
+
+    vertices = timeline.vertices
+    waypoint_indices = timeline.waypoint_indices
+    leg_count = max(len(waypoint_indices) - 1, 1)
+    points = [timeline.positions]
+    legs = [timeline.legs]
+    if len(waypoint_indices) > 1:
+        # Every route vertex belongs to the leg it starts; each leg also ends
+        # at the next waypoint.
+        vertex_legs = np.searchsorted(waypoint_indices, np.arange(len(vertices)), side="right") - 1
+        points += [vertices, vertices[waypoint_indices[1:]]]
+        legs += [np.clip(vertex_legs, 0, leg_count - 1), np.arange(leg_count)]
+    points = np.concatenate(points)
+    legs = np.concatenate(legs)
+
+    low = np.full((leg_count, 2), np.inf)
+    high = np.full((leg_count, 2), -np.inf)
+    np.minimum.at(low, legs, points)
+    np.maximum.at(high, legs, points)
+    lat_extent, lon_extent = (high - low).T
+
+    aspect = config.height / max(config.width, 1)
+    extent = np.maximum(lon_extent, lat_extent / aspect)
+    spans = extent * (1.0 + 2.0 * max(config.camera_padding, 0.0))
+    return np.clip(spans, max(config.camera_min_span, 1e-3), 360.0)
+
+
+def follow_views(config: "AnimationConfig", timeline: "Timeline") -> np.ndarray:
+    """Return an ``(N, 3)`` array of ``(centre lat, centre lon, lon span)`` per frame.
+
+    The camera is centred on the vehicle. The zoom is fixed within a leg and
+    eases between consecutive legs over ``camera_transition_seconds``,
+    interpolating the span logarithmically so zooming in and out feels even.
+    """
+
+    frame_count = len(timeline)
+    views = np.empty((frame_count, 3), dtype=np.float64)
+    if not frame_count:
+        return views
+    views[:, :2] = timeline.positions
+
+    spans = np.log(leg_spans(config, timeline))
+    log_spans = spans[timeline.legs]
+    transition = int(round(max(config.camera_transition_seconds, 0.0) * config.frame_rate))
+    boundaries = np.flatnonzero(timeline.legs[1:] != timeline.legs[:-1]) + 1
+    if transition > 1:
+        for boundary in boundaries.tolist():
+            before = spans[timeline.legs[boundary - 1]]
+            after = spans[timeline.legs[boundary]]
+            first = boundary - transition // 2
+            window = np.arange(max(first, 0), min(first + transition, frame_count))
+            eased = _smoothstep((window - first + 0.5) / transition)
+            log_spans[window] = before + (after - before) * eased
+    views[:, 2] = np.exp(log_spans)
+    return views
@@ -0,0 +1,173 @@
+"""Checkpointed renders that survive crashes, preemption and cancellation.
+
+The timeline is cut into chunks of at most ``chunk_frames`` frames (never
+spanning two legs) and every chunk is encoded into its own file, which is
+moved into the checkpoint directory as soon as it is complete. A small JSON
+manifest next to the chunks records which frames are committed. Running the
+same render again skips the committed chunks and continues from the first
+missing one; the finished video is assembled from the chunks without
+re-encoding, after which the checkpoint is removed.
+
+Chunks are named after the same content fingerprint as the segment cache, so
+a resumed render whose configuration changed in the meantime still reuses
+every chunk that draws the same pixels.
+"""
+from __future__ import annotations
+
+import contextlib
+import json
+import os
+import re
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Iterator, List, Optional, Set
+
+from .segment_cache import CacheStats, Segment, SegmentCache, plan_segments, render_cached
+
+if TYPE_CHECKING:  # pragma: no cover - imported for type checking only
+    from .animator import BaseAnimator
+
+# 30 seconds of video at the default 30 fps.
+DEFAULT_CHECKPOINT_FRAMES = 900
+MANIFEST_NAME = "checkpoint.json"
+MANIFEST_VERSION = 1
+# Committed chunks are named after their fingerprint; partial ones add a dot
+# prefix and the writer's process id.
+_CHUNK_NAME = re.compile(r"^\.?[0-9a-f]{64}[.]")
+
+
+@dataclass
+class CheckpointOptions:
+    """Where and how often a checkpointed render commits its progress.
+
+    Attributes:
+        directory: folder holding the committed chunks and the manifest;
+            defaults to the output path with ``.checkpoint`` appended.
+        chunk_frames: most frames encoded between two commits. Smaller chunks
+            lose less work when interrupted but add a keyframe each.
+        keep: leave the chunks and manifest in place after the video is
+            assembled instead of deleting them.
+    """
+
+    directory: Optional[Path] = None
+    chunk_frames: int = DEFAULT_CHECKPOINT_FRAMES
+    keep: bool = False
+
+    def __post_init__(self) -> None:
+        if self.chunk_frames < 1:
+            raise ValueError("Checkpoint chunks must hold at least one frame.")
+
+    def resolve_directory(self, output_path: Path) -> Path:
+        if self.directory is not None:
+            return Path(self.directory)
+        output_path = Path(output_path)
+        return output_path.with_name(f"{output_path.name}.checkpoint")
+
+
+class CheckpointManifest:
+    """The chunks of one checkpointed render and which of them are committed."""
+
+    def __init__(self, path: Path, output_path: Path, frame_rate: int, segments: List[Segment]) -> None:
+        self.path = Path(path)
+        self.output_path = Path(output_path)
+        self.frame_rate = frame_rate
+        self.segments = segments
+        self.committed = [False] * len(segments)
+
+    @property
+    def frames_committed(self) -> int:
+        return sum(segment.frames for segment, done in zip(self.segments, self.committed) if done)
+
+    @property
+    def frame_count(self) -> int:
+        return self.segments[-1].stop if self.segments else 0
+
+    def mark(self, segment: Segment) -> None:
+        """Record every chunk with ``segment``'s key as committed and save the manifest."""
+
+        for index, other in enumerate(self.segments):
+            if other.key == segment.key:
+                self.committed[index] = True
+        self.save()
+
+    def save(self) -> None:
+        data = {
+            "version": MANIFEST_VERSION,
+            "output": str(self.output_path),
+            "frame_rate": self.frame_rate,
+            "frame_count": self.frame_count,
+            "frames_committed": self.frames_committed,
+            "chunks": [
+                {"key": segment.key, "start": segment.start, "stop": segment.stop, "committed": done}
+                for segment, done in zip(self.segments, self.committed)
+            ],
+        }
+        # Write then rename, so an interruption never leaves a truncated manifest.
+        partial = self.path.with_name(f".{self.path.name}.{os.getpid()}.partial")
+        with partial.open("w", encoding="utf8") as handle:
+            json.dump(data, handle, indent=2)
+        os.replace(partial, self.path)
+
+
+def _chunk_files(directory: Path) -> Iterator[Path]:
+    """Yield the chunk files in ``directory``, including partial ones left by an interruption."""
+
+    for path in directory.iterdir():
+        if path.is_file() and _CHUNK_NAME.match(path.name):
+            yield path
+
+
+def _discard_stale(directory: Path, keep: Set[Path]) -> None:
+    """Remove partial chunks and chunks that no longer belong to the render."""
+
+    for path in _chunk_files(directory):
+        if path not in keep:
+            path.unlink(missing_ok=True)
+
+
+def render_checkpointed(
+    animator: "BaseAnimator",
+    options: CheckpointOptions,
+    output_path: Path,
+    workers: int,
+    chunk_frames: int,
+    share_sprites: bool,
+    pipeline_depth: int,
+    cache: Optional[SegmentCache] = None,
+) -> CacheStats:
+    """Render ``animator`` to ``output_path`` in committed chunks, resuming earlier progress.
+
+    With a ``cache`` the chunks are stored there and only the manifest lives in
+    the checkpoint directory; otherwise the checkpoint directory holds both.
+    """
+
+    directory = options.resolve_directory(output_path)
+    directory.mkdir(parents=True, exist_ok=True)
+    store = cache if cache is not None else SegmentCache(directory)
+    suffix = output_path.suffix
+    segments = plan_segments(animator, suffix, max_frames=options.chunk_frames)
+    if cache is None:
+        _discard_stale(directory, {store.path(segment.key, suffix) for segment in segments})
+
+    manifest = CheckpointManifest(directory / MANIFEST_NAME, output_path, animator.config.frame_rate, segments)
+    manifest.committed = [store.lookup(segment.key, suffix) is not None for segment in segments]
+    manifest.save()
+
+    stats = render_cached(
+        animator,
+        store,
+        output_path,
+        workers,
+        chunk_frames,
+        share_sprites,
+        pipeline_depth,
+        segments=segments,
+        on_commit=manifest.mark,
+    )
+    if not options.keep:
+        manifest.path.unlink(missing_ok=True)
+        if cache is None:
+            _discard_stale(directory, set())
+        with contextlib.suppress(OSError):
+            directory.rmdir()
+    return stats
@@ -2,12 +2,17 @@
 from __future__ import annotations
 
 from dataclasses import dataclass, field
+from datetime import datetime, time, timezone
 from pathlib import Path
-from typing import Any, Dict, Iterable, List, Optional
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 import json
 
 
 LITRES_PER_GALLON = 3.785411784
+RENDER_ENGINES = ("matplotlib", "raster")
+CAMERA_MODES = ("fixed", "follow")
+TIME_WARPS = ("proportional", "log")
+PROJECTIONS = ("equirectangular", "mercator", "equal_earth", "robinson", "azimuthal")
 
 
 @dataclass
@@ -19,15 +24,15 @@ class Waypoint:
     longitude: float
     pause_seconds: float = 0.0
     fuel_price_per_litre: Optional[float] = None
+    # Road geometry travelled from the previous waypoint to this one.
+    path: Optional[List[Tuple[float, float]]] = None
 
     @staticmethod
     def from_mapping(data: Dict[str, Any]) -> "Waypoint":
-        try:
-            name = data["name"]
-            latitude = float(data["lat"] if "lat" in data else data["latitude"])
-            longitude = float(data["lon"] if "lon" in data else data["longitude"])
-        except KeyError as exc:  # pragma: no cover - defensive branch
-            raise ValueError(f"Waypoint configuration missing field: {exc.args[0]}") from exc
+        if "name" not in data:
+            raise ValueError("Waypoint configuration missing field: name")
+        name = data["name"]
+        latitude, longitude = _parse_point(data, f"position of waypoint '{name}'")
         pause = float(data.get("pause", data.get("pause_seconds", 0.0)))
         fuel_price = None
         if "fuel_price_per_litre" in data:
@@ -47,9 +52,44 @@ class Waypoint:
             longitude=longitude,
             pause_seconds=pause,
             fuel_price_per_litre=fuel_price,
+            path=_parse_path(data.get("path", data.get("polyline"))),
         )
 
 
+def _parse_point(value: Any, what: str) -> Optional[Tuple[float, float]]:
+    """Read a ``[lat, lon]`` pair or a mapping with ``lat`` and ``lon``.
+
+    Every point in a configuration is read here, so they all accept the same
+    keys (``lat``/``latitude`` and ``lon``/``lng``/``longitude``) and report
+    the same error.
+    """
+
+    if value is None:
+        return None
+    try:
+        if isinstance(value, dict):
+            lat = value["lat"] if "lat" in value else value["latitude"]
+            lon = next(value[key] for key in ("lon", "lng", "longitude") if key in value)
+        else:
+            lat, lon = value
+        return float(lat), float(lon)
+    except (KeyError, StopIteration, TypeError, ValueError) as exc:
+        raise ValueError(f"Invalid {what}: {value!r}") from exc
+
+
+def _parse_path(value: Any) -> Optional[List[Tuple[float, float]]]:
+    """Read a leg path given as an encoded polyline or as ``[lat, lon]`` pairs or mappings."""
+
+    if value is None:
+        return None
+    if isinstance(value, str):
+        # Imported here so that loading a configuration does not import NumPy.
+        from .geometry import decode_polyline
+
+        return [(lat, lon) for lat, lon in decode_polyline(value).tolist()]
+    return [_parse_point(point, "waypoint path point") for point in value]
+
+
 @dataclass
 class VehicleConfig:
     """Configuration for how the vehicle should be rendered."""
@@ -59,6 +99,7 @@ class VehicleConfig:
     icon_scale: float = 1.0
     fuel_efficiency_mpg: Optional[float] = None
     fuel_price_per_litre: Optional[float] = None
+    rotation_resolution: float = 1.0
 
     @staticmethod
     def from_mapping(data: Optional[Dict[str, Any]]) -> "VehicleConfig":
@@ -85,7 +126,163 @@ class VehicleConfig:
                 if "fuel_price" in data
                 else None
             ),
+            rotation_resolution=float(data.get("rotation_resolution", 1.0)),
+        )
+
+
+@dataclass
+class OutputTarget:
+    """An extra video written from the same frames, downscaled to its own size.
+
+    ``width`` and ``height`` default to the animation's size; when only one is
+    given the other keeps the animation's aspect ratio. ``codec`` and
+    ``quality`` override the encoder settings, and the container follows the
+    file extension.
+    """
+
+    output_path: Path
+    width: Optional[int] = None
+    height: Optional[int] = None
+    codec: Optional[str] = None
+    quality: Optional[float] = None
+
+    @staticmethod
+    def from_mapping(data: Any) -> "OutputTarget":
+        if isinstance(data, str):
+            return OutputTarget(output_path=Path(data))
+        if not isinstance(data, dict):
+            raise ValueError("Each output must be a path or a mapping with an 'output' path.")
+        output_path = data.get("output") or data.get("output_path") or data.get("path")
+        if not output_path:
+            raise ValueError("Output configuration missing field: output")
+        width, height = data.get("width"), data.get("height")
+        quality = data.get("quality")
+        target = OutputTarget(
+            output_path=Path(output_path),
+            width=int(width) if width is not None else None,
+            height=int(height) if height is not None else None,
+            codec=str(data["codec"]) if data.get("codec") else None,
+            quality=float(quality) if quality is not None else None,
+        )
+        if (target.width is not None and target.width < 2) or (target.height is not None and target.height < 2):
+            raise ValueError(f"Output {target.output_path} must be at least 2x2 pixels.")
+        return target
+
+
+def parse_clock(value: Any) -> float:
+    """Read a time as seconds: a number, an ISO 8601 timestamp or a ``HH:MM[:SS]`` time of day.
+
+    Timestamps count from the Unix epoch (UTC unless an offset is given) and
+    times of day from midnight.
+    """
+
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    text = str(value).strip()
+    try:
+        return float(text)
+    except ValueError:
+        pass
+    if text.endswith(("Z", "z")):
+        text = text[:-1] + "+00:00"
+    try:
+        moment = datetime.fromisoformat(text)
+    except ValueError:
+        try:
+            clock = time.fromisoformat(text)
+        except ValueError as exc:
+            raise ValueError(f"Invalid time: {value!r}") from exc
+        return clock.hour * 3600.0 + clock.minute * 60.0 + clock.second + clock.microsecond / 1e6
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.timestamp()
+
+
+@dataclass
+class Trip:
+    """One vehicle's trip in a fleet replay, as ``(lat, lon, time)`` points.
+
+    Times are seconds on the replay's shared clock (see :func:`parse_clock`);
+    points may be listed in any order.
+    """
+
+    name: str
+    points: List[Tuple[float, float, float]]
+
+    @staticmethod
+    def from_mapping(data: Dict[str, Any], index: int) -> "Trip":
+        name = str(data.get("name") or data.get("id") or f"Trip {index + 1}")
+        points: List[Tuple[float, float, float]] = []
+        for point in data.get("points") or []:
+            what = f"point in trip '{name}'"
+            try:
+                if isinstance(point, dict):
+                    moment = point["time"] if "time" in point else point["timestamp"]
+                    coordinate = point
+                else:
+                    *coordinate, moment = point
+                lat, lon = _parse_point(coordinate, what)
+                points.append((lat, lon, parse_clock(moment)))
+            except (KeyError, TypeError, ValueError) as exc:
+                # Report the whole point, not just its coordinate.
+                raise ValueError(f"Invalid {what}: {point!r}") from exc
+        if not points:
+            raise ValueError(f"Trip '{name}' has no points.")
+        return Trip(name=name, points=points)
+
+
+@dataclass
+class FleetConfig:
+    """Many trips replayed together on one map against a shared clock.
+
+    Attributes:
+        trips: trips given inline in the configuration.
+        source: CSV file with one row per recorded position and ``trip``,
+            ``lat``, ``lon`` and ``time`` columns; its trips follow the inline
+            ones.
+        replay_speed: clock seconds shown per second of video, unless
+            ``target_duration`` or ``max_frames`` sets the length.
+        trail_minutes: clock minutes of history drawn behind each vehicle;
+            ``0`` draws each trip from its start.
+        icon_pixels: size of the vehicle sprites; defaults to 1/80 of the
+            frame's longer side.
+        clock_format: ``strftime`` format of the clock shown in the corner of
+            the map, or empty to hide it.
+    """
+
+    trips: List[Trip] = field(default_factory=list)
+    source: Optional[Path] = None
+    replay_speed: float = 600.0
+    trail_minutes: float = 30.0
+    icon_pixels: Optional[int] = None
+    clock_format: str = "%H:%M"
+
+    @staticmethod
+    def from_mapping(data: Any, base_dir: Optional[Path] = None) -> "FleetConfig":
+        if isinstance(data, str):
+            data = {"file": data}
+        if not isinstance(data, dict):
+            raise ValueError("The fleet must be a CSV path or a mapping with 'trips' or a 'file'.")
+        trips_data = data.get("trips") or []
+        if not isinstance(trips_data, list):
+            raise ValueError("Fleet trips must be provided as a list.")
+        source = data.get("file") or data.get("source")
+        if source:
+            source = _resolve_path(source, base_dir)
+        icon_pixels = data.get("icon_pixels")
+        fleet = FleetConfig(
+            trips=[Trip.from_mapping(item, index) for index, item in enumerate(trips_data)],
+            source=source or None,
+            replay_speed=float(data.get("replay_speed", 600.0)),
+            trail_minutes=float(data.get("trail_minutes", 30.0)),
+            icon_pixels=int(icon_pixels) if icon_pixels is not None else None,
+            clock_format=str(data.get("clock_format", "%H:%M")),
         )
+        if not fleet.trips and fleet.source is None:
+            raise ValueError("A fleet needs inline 'trips' or a CSV 'file'.")
+        if fleet.replay_speed <= 0:
+            raise ValueError("The fleet replay speed must be positive.")
+        return fleet
 
 
 @dataclass
@@ -103,22 +300,96 @@ class AnimationConfig:
     waypoints: List[Waypoint] = field(default_factory=list)
     vehicle: VehicleConfig = field(default_factory=VehicleConfig)
     show_capitals: bool = True
+    gazetteer: Optional[Path] = None
+    max_place_labels: int = 200
+    map_data: Optional[Path] = None
     pause_at_start: float = 0.0
     pause_at_end: float = 1.0
     currency_symbol: str = "$"
     summary_display_seconds: float = 2.0
+    cache_static_layer: bool = True
+    engine: str = "matplotlib"
+    camera: str = "fixed"
+    camera_padding: float = 0.5
+    camera_min_span: float = 0.5
+    camera_transition_seconds: float = 1.5
+    target_duration: Optional[float] = None
+    max_frames: Optional[int] = None
+    time_warp: str = "proportional"
+    min_leg_seconds: float = 0.5
+    outputs: List[OutputTarget] = field(default_factory=list)
+    projection: str = "equirectangular"
+    projection_center: Optional[Tuple[float, float]] = None
+    fleet: Optional[FleetConfig] = None
 
     @staticmethod
-    def from_mapping(data: Dict[str, Any]) -> "AnimationConfig":
+    def from_mapping(data: Dict[str, Any], base_dir: Optional[Path] = None) -> "AnimationConfig":
+        """Build a configuration from a parsed mapping.
+
+        A ``track`` entry (a GPX or CSV recording) or a ``fleet`` of trips may
+        replace ``waypoints``; relative track, fleet, gazetteer and map data
+        paths are resolved against ``base_dir``.
+        """
+
         waypoints_data = data.get("waypoints") or []
         if not isinstance(waypoints_data, Iterable) or isinstance(waypoints_data, (str, bytes)):
             raise ValueError("Waypoints must be provided as a list of mappings.")
 
-        waypoints = [Waypoint.from_mapping(item) for item in waypoints_data]
-        if len(waypoints) < 2:
+        fleet = None
+        if data.get("fleet") is not None:
+            if waypoints_data or data.get("track") is not None:
+                raise ValueError("Provide either waypoints, a track or a fleet, not several.")
+            fleet = FleetConfig.from_mapping(data["fleet"], base_dir)
+            waypoints = []
+        elif data.get("track") is not None:
+            if waypoints_data:
+                raise ValueError("Provide either waypoints or a track, not both.")
+            waypoints = _track_waypoints(data["track"], int(data.get("width", 1920)), base_dir)
+        else:
+            waypoints = [Waypoint.from_mapping(item) for item in waypoints_data]
+        if fleet is None and len(waypoints) < 2:
             raise ValueError("At least two waypoints are required to build an itinerary.")
+        if waypoints and waypoints[0].path:
+            raise ValueError("The first waypoint cannot have a path; a path leads to its waypoint.")
 
         output_path = data.get("output") or data.get("output_path") or "travelmap.webm"
+        outputs_data = data.get("outputs") or []
+        if not isinstance(outputs_data, list):
+            raise ValueError("Outputs must be provided as a list.")
+        outputs = [OutputTarget.from_mapping(item) for item in outputs_data]
+
+        engine = str(data.get("engine", "matplotlib")).lower()
+        if engine not in RENDER_ENGINES:
+            raise ValueError(
+                f"Unknown render engine '{engine}'. Choose one of: {', '.join(RENDER_ENGINES)}."
+            )
+
+        camera = str(data.get("camera", "fixed")).lower()
+        if camera not in CAMERA_MODES:
+            raise ValueError(
+                f"Unknown camera mode '{camera}'. Choose one of: {', '.join(CAMERA_MODES)}."
+            )
+        if camera != "fixed" and engine != "raster":
+            raise ValueError(f"The '{camera}' camera requires the raster engine.")
+        if camera != "fixed" and fleet is not None:
+            raise ValueError("Fleet replays require the fixed camera.")
+
+        projection = str(data.get("projection", "equirectangular")).lower()
+        if projection not in PROJECTIONS:
+            raise ValueError(f"Unknown projection '{projection}'. Choose one of: {', '.join(PROJECTIONS)}.")
+        if projection != "equirectangular" and camera != "fixed":
+            raise ValueError(f"The '{camera}' camera only supports the equirectangular projection.")
+        projection_center = _parse_point(data.get("projection_center"), "projection center")
+
+        time_warp = str(data.get("time_warp", "proportional")).lower()
+        if time_warp not in TIME_WARPS:
+            raise ValueError(f"Unknown time warp '{time_warp}'. Choose one of: {', '.join(TIME_WARPS)}.")
+        target_duration = data.get("target_duration")
+        if target_duration is not None and not float(target_duration) > 0:
+            raise ValueError("The target duration must be a positive number of seconds.")
+        max_frames = data.get("max_frames")
+        if max_frames is not None and int(max_frames) < 1:
+            raise ValueError("The frame budget 'max_frames' must be at least 1.")
 
         return AnimationConfig(
             title=data.get("title", ""),
@@ -132,13 +403,57 @@ class AnimationConfig:
             waypoints=waypoints,
             vehicle=VehicleConfig.from_mapping(data.get("vehicle")),
             show_capitals=bool(data.get("show_capitals", True)),
+            gazetteer=_resolve_path(data["gazetteer"], base_dir) if data.get("gazetteer") else None,
+            max_place_labels=int(data.get("max_place_labels", 200)),
+            map_data=_resolve_path(data["map_data"], base_dir) if data.get("map_data") else None,
             pause_at_start=float(data.get("pause_at_start", 0.0)),
             pause_at_end=float(data.get("pause_at_end", 1.0)),
             currency_symbol=str(data.get("currency_symbol", data.get("currency", "$"))),
             summary_display_seconds=float(data.get("summary_display_seconds", 2.0)),
+            cache_static_layer=bool(data.get("cache_static_layer", True)),
+            engine=engine,
+            camera=camera,
+            camera_padding=float(data.get("camera_padding", 0.5)),
+            camera_min_span=float(data.get("camera_min_span", 0.5)),
+            camera_transition_seconds=float(data.get("camera_transition_seconds", 1.5)),
+            target_duration=float(target_duration) if target_duration is not None else None,
+            max_frames=int(max_frames) if max_frames is not None else None,
+            time_warp=time_warp,
+            min_leg_seconds=float(data.get("min_leg_seconds", 0.5)),
+            outputs=outputs,
+            projection=projection,
+            projection_center=projection_center,
+            fleet=fleet,
         )
 
 
+def _resolve_path(value: Any, base_dir: Optional[Path]) -> Path:
+    """Return ``value`` as a path, relative to ``base_dir`` unless it is absolute."""
+
+    path = Path(value)
+    if base_dir is not None and not path.is_absolute():
+        path = Path(base_dir) / path
+    return path
+
+
+def _track_waypoints(spec: Any, width: int, base_dir: Optional[Path]) -> List[Waypoint]:
+    """Load the waypoints of a ``track`` entry: a file path or a mapping with ``file`` and options."""
+
+    from .tracks import TrackOptions, load_track_waypoints
+
+    options = dict(spec) if isinstance(spec, dict) else {"file": spec}
+    source = options.pop("file", None) or options.pop("path", None)
+    if not source:
+        raise ValueError("Track configuration requires a 'file'.")
+    source = _resolve_path(source, base_dir)
+    options.setdefault("width", width)
+    try:
+        track_options = TrackOptions(**options)
+    except TypeError as exc:
+        raise ValueError(f"Invalid track option: {exc}") from exc
+    return load_track_waypoints(source, track_options)
+
+
 def _load_yaml(path: Path) -> Dict[str, Any]:
     try:  # pragma: no cover - optional dependency
         import yaml  # type: ignore
@@ -166,4 +481,4 @@ def load_config(path: Path) -> AnimationConfig:
     if not isinstance(raw, dict):
         raise ValueError("Configuration file must contain a mapping at the top level.")
 
-    return AnimationConfig.from_mapping(raw)
+    return AnimationConfig.from_mapping(raw, base_dir=path.parent)
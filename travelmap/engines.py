@@ -0,0 +1,35 @@
+"""Selection of the rendering engine configured for an animation."""
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Optional
+
+from .config import RENDER_ENGINES, AnimationConfig
+
+if TYPE_CHECKING:  # pragma: no cover - typing only
+    from .animator import BaseAnimator
+    from .profiling import Profiler
+
+
+def create_animator(config: AnimationConfig, profiler: Optional["Profiler"] = None) -> "BaseAnimator":
+    """Instantiate the animator for ``config.engine``, optionally instrumented by ``profiler``.
+
+    Engines are imported on demand so that the raster engine never pays for
+    importing matplotlib. Configurations with a ``fleet`` get the engine's
+    fleet replay animator.
+    """
+
+    if config.engine == "raster":
+        from .raster import FleetRasterAnimator, RasterTravelMapAnimator
+
+        if config.fleet is not None:
+            return FleetRasterAnimator(config, profiler=profiler)
+        return RasterTravelMapAnimator(config, profiler=profiler)
+    if config.engine == "matplotlib":
+        from .renderer import FleetTravelMapAnimator, TravelMapAnimator
+
+        if config.fleet is not None:
+            return FleetTravelMapAnimator(config, profiler=profiler)
+        return TravelMapAnimator(config, profiler=profiler)
+    raise ValueError(
+        f"Unknown render engine '{config.engine}'. Choose one of: {', '.join(RENDER_ENGINES)}."
+    )
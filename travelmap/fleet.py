@@ -0,0 +1,667 @@
+"""Fleet replays: many trips animated together on one map against a shared clock.
+
+A fleet is stored as one sorted array of recorded positions, grouped by trip
+and ordered by time within each trip. Every frame of the video corresponds to
+a moment on the shared clock, and the position and heading of every vehicle at
+that moment are found for a whole batch of frames at once with a single
+``searchsorted`` over the recorded times. The trails of a frame are built as
+one array of polylines laid end to end, so the engines draw them as a single
+batch: the raster engine strokes their segments into a mask with NumPy and the
+matplotlib engine draws them as one line broken by NaN gaps. Vehicles are drawn by a
+:class:`SpriteSheet`, which blends every sprite from a dense pre-rotated atlas
+in one vectorised pass. No step loops over vehicles in Python.
+"""
+from __future__ import annotations
+
+import csv
+import math
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, ContextManager, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from PIL import Image
+
+from .array_cache import cache_directory, load_arrays, save_arrays, source_fingerprint
+from .config import AnimationConfig, FleetConfig, Waypoint, parse_clock
+from .geometry import haversine_km_many
+from .icons import SpriteAtlas, sprite_atlas_for
+from .planning import warp_segment_frames
+from .profiling import Profiler
+from .projections import Projection, projection_for
+from .summary import MILES_PER_KM, LegSummary
+from .tracks import _LATITUDE_COLUMNS, _LONGITUDE_COLUMNS, _TIME_COLUMNS, _column, _open_text
+
+_FORMAT_VERSION = 1
+_TRIP_COLUMNS = ("trip", "trip_id", "vehicle", "vehicle_id", "id")
+# Vehicle states are sampled for this many consecutive frames at a time.
+_SAMPLE_BATCH_FRAMES = 32
+# Bounds the temporary arrays of one stroke or sprite batch.
+_STROKE_CHUNK_SAMPLES = 1 << 18
+_SPRITE_CHUNK = 2048
+
+
+# ----------------------------------------------------------------------
+# Loading
+# ----------------------------------------------------------------------
+
+
+class FleetTrips:
+    """The recorded positions of every trip of a fleet.
+
+    Attributes:
+        points: ``(P, 2)`` lat/lon positions, grouped by trip and sorted by time
+            within each trip.
+        times: ``(P,)`` clock time of each position in seconds.
+        offsets: ``(T + 1,)`` start of each trip in ``points``; trip ``i`` is
+            ``points[offsets[i]:offsets[i + 1]]``.
+        names: name of each trip.
+    """
+
+    def __init__(self, points: np.ndarray, times: np.ndarray, offsets: np.ndarray, names: List[str]) -> None:
+        self.points = points
+        self.times = times
+        self.offsets = offsets
+        self.names = names
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    @property
+    def start(self) -> float:
+        return float(self.times.min())
+
+    @property
+    def end(self) -> float:
+        return float(self.times.max())
+
+    def distance_km(self) -> float:
+        """Total distance driven by all trips, along their recorded positions."""
+
+        if len(self.points) < 2:
+            return 0.0
+        steps = haversine_km_many(self.points[:-1], self.points[1:])
+        # The step from the last point of a trip to the first of the next is not driven.
+        steps[self.offsets[1:-1] - 1] = 0.0
+        return float(steps.sum())
+
+    @classmethod
+    def from_rows(
+        cls, trip_ids: np.ndarray, points: np.ndarray, times: np.ndarray, names: List[str]
+    ) -> "FleetTrips":
+        """Group unsorted rows by trip and sort each trip by time."""
+
+        order = np.lexsort((times, trip_ids))
+        counts = np.bincount(trip_ids, minlength=len(names))
+        offsets = np.concatenate(([0], np.cumsum(counts))).astype(np.int64)
+        return cls(points[order], times[order], offsets, names)
+
+
+def _read_fleet_csv(path: Path) -> Tuple[np.ndarray, np.ndarray, np.ndarray, List[str]]:
+    """Return the trip index, lat/lon and time of every row of ``path`` and the trip names."""
+
+    trip_index: Dict[str, int] = {}
+    trip_ids: List[int] = []
+    coordinates: List[Tuple[float, float]] = []
+    times: List[float] = []
+    with _open_text(path) as handle:
+        reader = csv.reader(handle)
+        header = next(reader, None)
+        if header is None:
+            raise ValueError(f"Fleet file {path} is empty.")
+        trip_column = _column(header, _TRIP_COLUMNS)
+        lat_column = _column(header, _LATITUDE_COLUMNS)
+        lon_column = _column(header, _LONGITUDE_COLUMNS)
+        time_column = _column(header, _TIME_COLUMNS)
+        for line, row in enumerate(reader, start=2):
+            if not row:
+                continue
+            try:
+                name = row[trip_column].strip()
+                coordinates.append((float(row[lat_column]), float(row[lon_column])))
+                times.append(parse_clock(row[time_column]))
+            except (IndexError, ValueError) as exc:
+                raise ValueError(f"Invalid fleet row {line} in {path}: {exc}") from exc
+            trip_ids.append(trip_index.setdefault(name, len(trip_index)))
+    return (
+        np.array(trip_ids, dtype=np.int64),
+        np.array(coordinates, dtype=np.float64).reshape(-1, 2),
+        np.array(times, dtype=np.float64),
+        list(trip_index),
+    )
+
+
+def _load_fleet_csv(path: Path, cache_dir: Optional[Path] = None) -> FleetTrips:
+    """Read the fleet CSV ``path``, reusing the sorted arrays cached by an earlier run."""
+
+    directory = cache_directory("fleets", source_fingerprint(path, _FORMAT_VERSION), cache_dir)
+    cached = load_arrays(directory)
+    if cached is not None:
+        arrays, meta = cached
+        return FleetTrips(
+            np.asarray(arrays["points"]),
+            np.asarray(arrays["times"]),
+            np.asarray(arrays["offsets"]),
+            list(meta["names"]),
+        )
+    trips = FleetTrips.from_rows(*_read_fleet_csv(path))
+    save_arrays(
+        directory,
+        {"points": trips.points, "times": trips.times, "offsets": trips.offsets},
+        {"names": trips.names},
+    )
+    return trips
+
+
+def load_fleet(fleet: FleetConfig, cache_dir: Optional[Path] = None) -> FleetTrips:
+    """Return the inline trips of ``fleet`` followed by the trips of its CSV file."""
+
+    names = [trip.name for trip in fleet.trips]
+    rows = np.array([point for trip in fleet.trips for point in trip.points], dtype=np.float64).reshape(-1, 3)
+    trip_ids = np.repeat(np.arange(len(fleet.trips)), [len(trip.points) for trip in fleet.trips])
+    trips = FleetTrips.from_rows(trip_ids, rows[:, :2], rows[:, 2], names)
+    if fleet.source is not None:
+        loaded = _load_fleet_csv(Path(fleet.source), cache_dir)
+        trips = FleetTrips(
+            np.concatenate((trips.points, loaded.points)),
+            np.concatenate((trips.times, loaded.times)),
+            np.concatenate((trips.offsets[:-1], loaded.offsets + trips.offsets[-1])),
+            trips.names + loaded.names,
+        )
+    if not len(trips):
+        raise ValueError("The fleet does not contain any trips.")
+    if trips.end <= trips.start:
+        raise ValueError("The fleet's positions must span a period of time.")
+    return trips
+
+
+# ----------------------------------------------------------------------
+# Timeline
+# ----------------------------------------------------------------------
+
+
+class FleetTimeline:
+    """Per-frame clock times of a fleet replay and batched vehicle states.
+
+    Provides the frame columns the render pipeline reads from a
+    :class:`~travelmap.timeline.Timeline` (``show_summary``, ``legs``,
+    ``paused``, ``views``, :meth:`runs`), with ``frame_times`` in place of a
+    single vehicle's state. :meth:`project` must be called before vehicle
+    states or trails are requested.
+
+    Attributes:
+        trips: the recorded positions.
+        vertices: ``(P, 2)`` the recorded lat/lon positions of every trip.
+        frame_times: ``(N,)`` clock time shown by each frame.
+        window: clock seconds of history in each trail, ``inf`` for all of it.
+    """
+
+    def __init__(self, trips: FleetTrips, frame_times: np.ndarray, summary_frames: int, window: float) -> None:
+        self.trips = trips
+        self.vertices = trips.points
+        self.waypoint_indices = np.zeros(0, dtype=np.int64)
+        self.frame_times = frame_times
+        self.window = window
+        frame_count = len(frame_times)
+        self.show_summary = np.zeros(frame_count, dtype=bool)
+        self.show_summary[frame_count - summary_frames :] = summary_frames > 0
+        self.legs = np.zeros(frame_count, dtype=np.int32)
+        self.paused = np.concatenate(([True], frame_times[1:] == frame_times[:-1]))
+        self.views: Optional[np.ndarray] = None
+
+        # Trips are laid end to end on one axis, each shifted past the previous
+        # one's times, so a single ``searchsorted`` locates every vehicle.
+        self._elapsed = trips.times - trips.start
+        self._stride = float(self._elapsed.max()) + 1.0
+        trip_ids = np.repeat(np.arange(len(trips)), np.diff(trips.offsets))
+        self._keys = self._elapsed + trip_ids * self._stride
+        self._first = trips.offsets[:-1]
+        self._last = trips.offsets[1:] - 1
+        self._xy: Optional[np.ndarray] = None
+        self._headings: Optional[np.ndarray] = None
+        self._batch_start = -1
+        self._batch = (np.zeros((0, 0, 2)), np.zeros((0, 0)), np.zeros((0, 0), dtype=bool))
+
+    def __len__(self) -> int:
+        return len(self.frame_times)
+
+    def runs(self, start: int = 0, stop: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Return ``(starts, lengths)`` of the runs of frames at the same clock time.
+
+        See :meth:`~travelmap.timeline.Timeline.runs`.
+        """
+
+        start, stop, _ = slice(start, stop).indices(len(self))
+        if stop <= start:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+        times = self.frame_times[start:stop]
+        summary = self.show_summary[start:stop]
+        same = (times[1:] == times[:-1]) & (summary[1:] == summary[:-1])
+        starts = start + np.flatnonzero(np.concatenate(([True], ~same)))
+        lengths = np.diff(np.append(starts, stop))
+        return starts, lengths
+
+    def project(self, projection: Projection) -> np.ndarray:
+        """Project every recorded position with ``projection`` and return the ``(P, 2)`` x/y array.
+
+        The screen heading of each recorded step is derived from the projected
+        positions; vehicles that stand still keep the heading of their last move.
+        """
+
+        xy = projection.project(self.vertices, starts=self.trips.offsets[:-1])
+        count = len(xy)
+        steps = np.zeros((count, 2))
+        steps[:-1] = xy[1:] - xy[:-1]
+        moving = np.any(steps != 0.0, axis=1)
+        moving[self._last] = False
+        headings = np.degrees(np.arctan2(steps[:, 0], steps[:, 1])) % 360.0
+        # Fill stationary steps from the previous move of the same trip, or the
+        # next one before a trip's first move.
+        trip_first = np.repeat(self._first, np.diff(self.trips.offsets))
+        previous = np.maximum.accumulate(np.where(moving, np.arange(count), -1))
+        following = np.minimum.accumulate(np.where(moving, np.arange(count), count)[::-1])[::-1]
+        trip_last = np.repeat(self._last, np.diff(self.trips.offsets))
+        source = np.where(previous >= trip_first, previous, np.where(following <= trip_last, following, -1))
+        self._headings = np.where(source >= 0, headings[np.maximum(source, 0)], 0.0)
+        self._xy = xy
+        self._batch_start = -1
+        return xy
+
+    def _locate(
+        self, elapsed: np.ndarray, trips: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """Find the recorded step of ``trips`` at the clock times ``elapsed`` after the start.
+
+        Returns the index of the step's first position, the fraction of the step
+        covered, whether the trip has started and whether it has not yet ended.
+        """
+
+        found = np.searchsorted(self._keys, elapsed + trips * self._stride, side="right") - 1
+        first, last = self._first[trips], self._last[trips]
+        started = found >= first
+        running = elapsed <= self._elapsed[last]
+        step = np.clip(found, first, np.maximum(last - 1, first))
+        following = np.minimum(step + 1, last)
+        span = self._elapsed[following] - self._elapsed[step]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            fraction = np.where(span > 0, np.clip((elapsed - self._elapsed[step]) / span, 0.0, 1.0), 0.0)
+        return step, fraction, started, running
+
+    def _positions(self, step: np.ndarray, fraction: np.ndarray) -> np.ndarray:
+        """Interpolate the projected positions a ``fraction`` of the way along each step."""
+
+        assert self._xy is not None
+        start = self._xy[step]
+        # Single-position trips have no step to follow and a fraction of zero.
+        end = self._xy[np.minimum(step + 1, len(self._xy) - 1)]
+        return start + (end - start) * fraction[..., None]
+
+    def sample(self, index: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Return the projected positions ``(T, 2)``, headings ``(T,)`` and on-road mask ``(T,)`` at frame ``index``.
+
+        Vehicles are only on the road between the first and last position of
+        their trip. States are computed for a batch of consecutive frames at a
+        time, so rendering frames in order samples each batch once.
+        """
+
+        if not 0 <= index - self._batch_start < len(self._batch[0]):
+            frames = self.frame_times[index : index + _SAMPLE_BATCH_FRAMES] - self.trips.start
+            trips = np.arange(len(self.trips))
+            elapsed = np.repeat(frames, len(trips))
+            step, fraction, started, running = self._locate(elapsed, np.tile(trips, len(frames)))
+            assert self._headings is not None
+            shape = (len(frames), len(trips))
+            self._batch = (
+                self._positions(step, fraction).reshape(shape + (2,)),
+                self._headings[step].reshape(shape),
+                (started & running).reshape(shape),
+            )
+            self._batch_start = index
+        offset = index - self._batch_start
+        positions, headings, active = self._batch
+        return positions[offset], headings[offset], active[offset]
+
+    def trails(self, index: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Return the trails of frame ``index`` as projected polylines laid end to end.
+
+        Each trail follows its trip's recorded positions from ``window`` seconds
+        before the frame's time, or the start of the trip, up to the vehicle.
+        Trails of finished trips fade out as their end drops out of the window.
+        Returns the ``(C, 2)`` points of all trails and the ``(R,)`` index of
+        each trail's first point.
+        """
+
+        elapsed = float(self.frame_times[index] - self.trips.start)
+        trips = np.arange(len(self.trips))
+        tail = np.maximum(elapsed - self.window, self._elapsed[self._first])
+        head = np.minimum(elapsed, self._elapsed[self._last])
+        drawn = tail < head
+        trips, tail, head = trips[drawn], tail[drawn], head[drawn]
+        if not len(trips):
+            return np.zeros((0, 2)), np.zeros(0, dtype=np.int64)
+        tail_step, tail_fraction, _, _ = self._locate(tail, trips)
+        head_step, head_fraction, _, _ = self._locate(head, trips)
+
+        # Each trail is its tail point, the recorded positions passed since, and
+        # the head point.
+        inner = head_step - tail_step
+        counts = inner + 2
+        starts = np.cumsum(counts) - counts
+        points = np.empty((int(counts.sum()), 2))
+        points[starts] = self._positions(tail_step, tail_fraction)
+        points[starts + counts - 1] = self._positions(head_step, head_fraction)
+        trail_of = np.repeat(np.arange(len(trips)), inner)
+        within = np.arange(len(trail_of)) - np.repeat(np.cumsum(inner) - inner, inner)
+        assert self._xy is not None
+        points[starts[trail_of] + 1 + within] = self._xy[tail_step[trail_of] + 1 + within]
+        return points, starts
+
+    def trail_segments(self, index: int) -> np.ndarray:
+        """Return the trails of frame ``index`` as projected ``(K, 2, 2)`` line segments."""
+
+        points, starts = self.trails(index)
+        segments = np.stack((points[:-1], points[1:]), axis=1)
+        # Drop the segments joining one trail's head to the next trail's tail.
+        joins = np.ones(len(segments), dtype=bool)
+        joins[starts[1:] - 1] = False
+        return segments[joins]
+
+    def trail_polyline(self, index: int) -> np.ndarray:
+        """Return the trails of frame ``index`` as one ``(C, 2)`` polyline broken by NaN rows."""
+
+        points, starts = self.trails(index)
+        return np.insert(points, starts[1:], np.nan, axis=0)
+
+
+def build_fleet_timeline(config: AnimationConfig, trips: FleetTrips) -> FleetTimeline:
+    """Lay the fleet's clock out over the video's frames.
+
+    The clock runs at ``replay_speed`` clock seconds per video second, unless a
+    ``target_duration`` or ``max_frames`` budget sets the number of motion
+    frames as it does for a single trip. The clock holds at the first recorded
+    time for the start pause and at the last one for the end pause and summary.
+    """
+
+    fleet = config.fleet
+    assert fleet is not None
+    fps = config.frame_rate
+    span = trips.end - trips.start
+    start_pause_frames = int(round(config.pause_at_start * fps))
+    end_pause_frames = int(round(config.pause_at_end * fps))
+    summary_frames = int(round(max(config.summary_display_seconds, 0.0) * fps))
+    natural = max(2, int(math.ceil(span / fleet.replay_speed * fps)))
+    (motion_frames,) = warp_segment_frames(
+        config, [natural], [span], start_pause_frames + end_pause_frames + summary_frames
+    )
+    frame_times = np.concatenate(
+        (
+            np.full(start_pause_frames, trips.start),
+            trips.start + span * np.arange(1, motion_frames + 1) / motion_frames,
+            np.full(end_pause_frames + summary_frames, trips.end),
+        )
+    )
+    window = fleet.trail_minutes * 60.0 if fleet.trail_minutes > 0 else math.inf
+    return FleetTimeline(trips, frame_times, summary_frames, window)
+
+
+def format_clock(seconds: float, clock_format: str) -> str:
+    """Format a clock time in seconds (UTC, or since midnight) with ``clock_format``."""
+
+    return datetime.fromtimestamp(seconds, timezone.utc).strftime(clock_format)
+
+
+# ----------------------------------------------------------------------
+# Bulk drawing
+# ----------------------------------------------------------------------
+
+
+def _brush(width: float) -> Tuple[np.ndarray, np.ndarray]:
+    """Row and column offsets of the pixels of a round brush ``width`` pixels across."""
+
+    radius = max(width, 1.0) / 2.0
+    reach = int(math.ceil(radius))
+    rows, columns = np.mgrid[-reach : reach + 1, -reach : reach + 1]
+    inside = rows * rows + columns * columns <= radius * radius + 0.25
+    return rows[inside], columns[inside]
+
+
+def stroke_mask(shape: Tuple[int, int], segments: np.ndarray, width: float) -> np.ndarray:
+    """Rasterise pixel-space ``(K, 2, 2)`` line segments ``width`` pixels wide into a boolean mask.
+
+    Segments are sampled every pixel along their length into a mask of stroke
+    centres, which is then dilated by a round brush. Dilation costs a few
+    whole-mask operations however many segments there are, and gives the
+    strokes round caps and joins.
+    """
+
+    height, width_px = shape
+    brush_rows, brush_columns = _brush(width)
+    reach = int(np.abs(brush_rows).max())
+    # Centres are marked on a mask padded by the brush reach, so that strokes
+    # just outside the frame still reach into it.
+    padded_width = width_px + 2 * reach
+    centres = np.zeros((height + 2 * reach, padded_width), dtype=bool)
+    flat_centres = centres.reshape(-1)
+    starts = segments[:, 0] + reach
+    deltas = segments[:, 1] - segments[:, 0]
+    samples = np.ceil(np.hypot(deltas[:, 0], deltas[:, 1])).astype(np.int64) + 1
+    # Segments entirely outside the padded mask are skipped whole.
+    low = np.minimum(starts, starts + deltas)
+    high = np.maximum(starts, starts + deltas)
+    visible = (high[:, 0] >= 0) & (low[:, 0] < padded_width) & (high[:, 1] >= 0) & (low[:, 1] < centres.shape[0])
+    starts, deltas, samples = starts[visible], deltas[visible], samples[visible]
+
+    cumulative = np.cumsum(samples)
+    first = 0
+    while first < len(samples):
+        done = cumulative[first - 1] if first else 0
+        stop = max(first + 1, int(np.searchsorted(cumulative, done + _STROKE_CHUNK_SAMPLES, side="right")))
+        counts = samples[first:stop]
+        owner = np.repeat(np.arange(first, stop), counts)
+        step = np.arange(len(owner)) - np.repeat(np.cumsum(counts) - counts, counts)
+        fraction = step / np.maximum(samples[owner] - 1, 1)
+        points = np.rint(starts[owner] + deltas[owner] * fraction[:, None]).astype(np.int64)
+        inside = (points[:, 0] >= 0) & (points[:, 0] < padded_width)
+        inside &= (points[:, 1] >= 0) & (points[:, 1] < centres.shape[0])
+        points = points[inside]
+        flat_centres[points[:, 1] * padded_width + points[:, 0]] = True
+        first = stop
+
+    mask = np.zeros(shape, dtype=bool)
+    for row, column in zip(brush_rows.tolist(), brush_columns.tolist()):
+        mask |= centres[reach - row : reach - row + height, reach - column : reach - column + width_px]
+    return mask
+
+
+def blend_mask(buffer: np.ndarray, mask: np.ndarray, colour: Tuple[int, int, int, int]) -> None:
+    """Blend the RGBA ``colour`` into the ``(H, W, 4)`` uint8 ``buffer`` wherever ``mask`` is set."""
+
+    red, green, blue, alpha = colour
+    pixels = _flat_pixels(buffer)
+    drawn = np.flatnonzero(mask)
+    target = pixels[drawn, :3].astype(np.uint16)
+    source = np.array([red, green, blue], dtype=np.uint16) * alpha + 127
+    pixels[drawn, :3] = ((source + target * (255 - alpha)) // 255).astype(np.uint8)
+
+
+def _flat_pixels(buffer: np.ndarray) -> np.ndarray:
+    """View a contiguous ``(H, W, 4)`` buffer as ``(H * W, 4)`` rows without copying."""
+
+    if not buffer.flags.c_contiguous:
+        raise ValueError("Bulk drawing requires a contiguous frame buffer.")
+    return buffer.reshape(-1, buffer.shape[-1])
+
+
+class SpriteSheet:
+    """The visible pixels of every rotation in a dense sprite atlas, ready for bulk blending.
+
+    Each rotation lists the offsets and premultiplied colours of its
+    non-transparent pixels, padded to a common length by repeating its first
+    pixel, so any number of sprites is blended with a few gathers and one
+    scatter and no per-sprite work.
+
+    Attributes:
+        atlas: the ``(angles, S, S, 4)`` atlas the sheet was built from.
+    """
+
+    def __init__(self, atlas: np.ndarray) -> None:
+        self.atlas = atlas
+        angles, self.size = atlas.shape[:2]
+        drawn = atlas[..., 3].reshape(angles, -1) > 0
+        counts = drawn.sum(axis=1)
+        pixels = max(int(counts.max()), 1)
+        # Visible pixels first, in row-major order; the padding repeats the
+        # first one, which writes the same value twice.
+        order = np.argsort(~drawn, axis=1, kind="stable")[:, :pixels]
+        order = np.where(np.arange(pixels) < counts[:, None], order, order[:, :1])
+        self.rows = (order // self.size).astype(np.int32)
+        self.columns = (order % self.size).astype(np.int32)
+        colours = atlas.reshape(angles, -1, 4)[np.arange(angles)[:, None], order]
+        alpha = colours[..., 3:].astype(np.uint16)
+        self.premultiplied = colours[..., :3] * alpha + 127
+        self.transparency = 255 - alpha
+        self._offsets: Tuple[int, np.ndarray] = (-1, self.rows)
+
+    def offsets(self, width: int) -> np.ndarray:
+        """Return the ``(angles, pixels)`` flat offsets of the visible pixels in a buffer ``width`` wide."""
+
+        if self._offsets[0] != width:
+            self._offsets = (width, self.rows * np.int32(width) + self.columns)
+        return self._offsets[1]
+
+    def composite(
+        self,
+        buffer: np.ndarray,
+        keys: np.ndarray,
+        centres: np.ndarray,
+        clip: Optional[Tuple[int, int, int, int]] = None,
+    ) -> None:
+        """Blend rotation ``keys[i]`` centred on pixel ``centres[i]`` (``x, y``) into ``buffer``.
+
+        ``buffer`` is a contiguous ``(H, W, 4)`` uint8 frame and sprites are
+        clipped to the ``(x0, y0, x1, y1)`` box ``clip``, the whole buffer by
+        default. Every sprite is blended over the buffer as it was before the
+        call; where sprites overlap the later one is kept.
+        """
+
+        if not len(keys):
+            return
+        height, width = buffer.shape[:2]
+        x0, y0, x1, y1 = clip if clip is not None else (0, 0, width, height)
+        size = self.size
+        corners = np.rint(centres - size / 2.0).astype(np.int32)
+        visible = (corners[:, 0] > x0 - size) & (corners[:, 0] < x1)
+        visible &= (corners[:, 1] > y0 - size) & (corners[:, 1] < y1)
+        keys, corners = keys[visible], corners[visible]
+        inside = (corners[:, 0] >= x0) & (corners[:, 0] <= x1 - size)
+        inside &= (corners[:, 1] >= y0) & (corners[:, 1] <= y1 - size)
+
+        offsets = self.offsets(width)
+        for first in range(0, len(keys), _SPRITE_CHUNK):
+            chunk = slice(first, first + _SPRITE_CHUNK)
+            chunk_keys, chunk_corners = keys[chunk], corners[chunk]
+            targets = offsets.take(chunk_keys, axis=0) + (
+                chunk_corners[:, 1:] * np.int32(width) + chunk_corners[:, :1]
+            )
+            colours = self.premultiplied.take(chunk_keys, axis=0)
+            transparency = self.transparency.take(chunk_keys, axis=0)
+            edge = ~inside[chunk]
+            if edge.any():
+                # Sprites crossing the clip box keep only their pixels inside it.
+                rows = self.rows.take(chunk_keys[edge], axis=0) + chunk_corners[edge, 1:]
+                columns = self.columns.take(chunk_keys[edge], axis=0) + chunk_corners[edge, :1]
+                keep = (rows >= y0) & (rows < y1) & (columns >= x0) & (columns < x1)
+                _blend(buffer, targets[edge][keep], colours[edge][keep], transparency[edge][keep])
+                interior = ~edge
+                targets, colours, transparency = targets[interior], colours[interior], transparency[interior]
+            _blend(buffer, targets.ravel(), colours.reshape(-1, 3), transparency.reshape(-1, 1))
+
+
+def _blend(buffer: np.ndarray, targets: np.ndarray, colours: np.ndarray, transparency: np.ndarray) -> None:
+    """Blend premultiplied ``colours`` over the flat pixel indices ``targets`` of ``buffer``."""
+
+    pixels = _flat_pixels(buffer)
+    blended = pixels.take(targets, axis=0)
+    blended[:, :3] = (colours + blended[:, :3] * transparency) // 255
+    # One 32-bit scatter per pixel is much cheaper than indexing the channels.
+    pixels.view(np.uint32)[targets, 0] = blended.view(np.uint32)[:, 0]
+
+
+# ----------------------------------------------------------------------
+# Animator support
+# ----------------------------------------------------------------------
+
+
+class FleetMixin:
+    """Replace an animator's single itinerary with a fleet replay.
+
+    Mixed in ahead of an engine's animator class, it loads the fleet, builds a
+    :class:`FleetTimeline` and projects the recorded positions; the engine
+    subclass draws the trails, vehicles and clock.
+    """
+
+    config: AnimationConfig
+    profiler: Optional[Profiler]
+    _frame_states: FleetTimeline
+    _total_distance_miles: float
+    _stage: Callable[[str], ContextManager[None]]
+    _sprite_atlas: SpriteAtlas
+    _sheet: Optional[SpriteSheet] = None
+
+    def __init__(self, config: AnimationConfig, profiler: Optional[Profiler] = None) -> None:
+        if config.fleet is None:
+            raise ValueError("A fleet replay requires a 'fleet' configuration.")
+        self.profiler = profiler
+        with self._stage("load_fleet"):
+            self._trips = load_fleet(config.fleet)
+        super().__init__(config, profiler=profiler)
+
+    def _build_frames(self, waypoints: Sequence[Waypoint]) -> FleetTimeline:
+        return build_fleet_timeline(self.config, self._trips)
+
+    def _compute_leg_summaries(
+        self, waypoints: Sequence[Waypoint]
+    ) -> Tuple[List[LegSummary], float, Optional[float]]:
+        return [], self._trips.distance_km() * MILES_PER_KM, None
+
+    def _format_summary_text(self) -> str:
+        return "\n".join(
+            [
+                "Fleet Summary",
+                f"Trips: {len(self._trips)}",
+                f"Total distance: {self._total_distance_miles:.1f} mi",
+            ]
+        )
+
+    def _project_route(self) -> None:
+        timeline = self._frame_states
+        self._projection = projection_for(self.config, timeline.vertices)
+        self._route_xy = timeline.project(self._projection)
+        self._waypoint_xy = np.zeros((0, 2))
+
+    def _fleet_sprite_atlas(self, icon: np.ndarray) -> SpriteAtlas:
+        """Return the dense atlas of ``icon`` scaled to the fleet's sprite size."""
+
+        fleet = self.config.fleet
+        assert fleet is not None
+        size = fleet.icon_pixels or max(1, int(round(max(self.config.width, self.config.height) / 80.0)))
+        sprite = np.array(Image.fromarray(icon, mode="RGBA").resize((size, size), Image.LANCZOS))
+        # Sprites are gathered from the dense atlas, which needs quantised bearings.
+        atlas = sprite_atlas_for(sprite, self.config.vehicle.rotation_resolution or 1.0)
+        atlas.precompute()
+        return atlas
+
+    def _sprite_sheet(self) -> SpriteSheet:
+        """Return the sprite sheet of the current atlas, which render workers may have swapped."""
+
+        atlas = self._sprite_atlas.precompute()
+        if self._sheet is None or self._sheet.atlas is not atlas:
+            self._sheet = SpriteSheet(atlas)
+        return self._sheet
+
+    def _clock_text(self, index: int) -> str:
+        fleet = self.config.fleet
+        assert fleet is not None
+        if not fleet.clock_format:
+            return ""
+        return format_clock(float(self._frame_states.frame_times[index]), fleet.clock_format)
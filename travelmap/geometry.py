@@ -1,80 +1,167 @@
-"""Geospatial utility helpers for the travel map animation."""
+"""Geospatial utility helpers for the travel map animation.
+
+The ``*_many`` functions and :func:`cumulative_distances` are NumPy batch
+counterparts of the scalar helpers, which live in :mod:`travelmap.spherical`
+so that code paths without NumPy can use them, and are re-exported here. They accept arrays of ``(lat, lon)`` pairs
+with shape ``(..., 2)`` and broadcast like NumPy ufuncs. Their results agree
+with the scalar versions to within ``BATCH_TOLERANCE`` (degrees for positions
+and bearings, kilometres for distances). The only differences come from
+floating point rounding in the vectorised trigonometry.
+"""
 from __future__ import annotations
 
 import math
-from typing import List, Sequence, Tuple
+from typing import Optional, Sequence, Tuple
 
-Coordinate = Tuple[float, float]
+import numpy as np
 
+from .spherical import (  # noqa: F401 - re-exported scalar helpers
+    EARTH_RADIUS_KM,
+    Coordinate,
+    bearing_degrees,
+    haversine_km,
+    interpolate_great_circle,
+)
 
-EARTH_RADIUS_KM = 6371.0088
+BATCH_TOLERANCE = 1e-9
 
 
-def haversine_km(a: Coordinate, b: Coordinate) -> float:
-    """Compute the great-circle distance between two lat/lon points in kilometres."""
+def _radians(points: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    radians = np.radians(np.asarray(points, dtype=np.float64))
+    return radians[..., 0], radians[..., 1]
 
-    lat1, lon1 = map(math.radians, a)
-    lat2, lon2 = map(math.radians, b)
-    delta_lat = lat2 - lat1
-    delta_lon = lon2 - lon1
-    sin_lat = math.sin(delta_lat / 2.0)
-    sin_lon = math.sin(delta_lon / 2.0)
-    h = sin_lat**2 + math.cos(lat1) * math.cos(lat2) * sin_lon**2
-    central_angle = 2.0 * math.asin(min(1.0, math.sqrt(h)))
-    return EARTH_RADIUS_KM * central_angle
 
+def haversine_km_many(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Vectorised :func:`haversine_km` between the ``(lat, lon)`` arrays ``a`` and ``b``."""
+
+    lat1, lon1 = _radians(a)
+    lat2, lon2 = _radians(b)
+    sin_lat = np.sin((lat2 - lat1) / 2.0)
+    sin_lon = np.sin((lon2 - lon1) / 2.0)
+    h = sin_lat**2 + np.cos(lat1) * np.cos(lat2) * sin_lon**2
+    return EARTH_RADIUS_KM * 2.0 * np.arcsin(np.minimum(1.0, np.sqrt(h)))
 
-def interpolate_great_circle(a: Coordinate, b: Coordinate, fraction: float) -> Coordinate:
-    """Interpolate along the great-circle path between two coordinates."""
 
-    if fraction <= 0.0:
-        return a
-    if fraction >= 1.0:
-        return b
+def interpolate_great_circle_many(a: np.ndarray, b: np.ndarray, fractions: np.ndarray) -> np.ndarray:
+    """Vectorised :func:`interpolate_great_circle`.
 
-    lat1, lon1 = map(math.radians, a)
-    lat2, lon2 = map(math.radians, b)
+    ``a`` and ``b`` are ``(lat, lon)`` arrays broadcast against ``fractions``; the
+    result has shape ``fractions.shape + (2,)``. As with the scalar version,
+    fractions at or below ``0`` return ``a`` and fractions at or above ``1``
+    return ``b`` exactly.
+    """
 
-    delta = 2.0 * math.asin(
-        math.sqrt(
-            math.sin((lat2 - lat1) / 2.0) ** 2
-            + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2.0) ** 2
-        )
-    )
+    fractions = np.asarray(fractions, dtype=np.float64)
+    a = np.asarray(a, dtype=np.float64)
+    b = np.asarray(b, dtype=np.float64)
+    lat1, lon1 = _radians(a)
+    lat2, lon2 = _radians(b)
 
-    if delta == 0.0:
-        return a
+    h = np.sin((lat2 - lat1) / 2.0) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2.0) ** 2
+    delta = 2.0 * np.arcsin(np.minimum(1.0, np.sqrt(h)))
 
-    sin_delta = math.sin(delta)
-    factor_a = math.sin((1 - fraction) * delta) / sin_delta
-    factor_b = math.sin(fraction * delta) / sin_delta
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sin_delta = np.sin(delta)
+        factor_a = np.sin((1 - fractions) * delta) / sin_delta
+        factor_b = np.sin(fractions * delta) / sin_delta
 
-    x = factor_a * math.cos(lat1) * math.cos(lon1) + factor_b * math.cos(lat2) * math.cos(lon2)
-    y = factor_a * math.cos(lat1) * math.sin(lon1) + factor_b * math.cos(lat2) * math.sin(lon2)
-    z = factor_a * math.sin(lat1) + factor_b * math.sin(lat2)
+    x = factor_a * np.cos(lat1) * np.cos(lon1) + factor_b * np.cos(lat2) * np.cos(lon2)
+    y = factor_a * np.cos(lat1) * np.sin(lon1) + factor_b * np.cos(lat2) * np.sin(lon2)
+    z = factor_a * np.sin(lat1) + factor_b * np.sin(lat2)
 
-    lat = math.atan2(z, math.sqrt(x**2 + y**2))
-    lon = math.atan2(y, x)
+    lat = np.degrees(np.arctan2(z, np.sqrt(x**2 + y**2)))
+    lon = np.degrees(np.arctan2(y, x))
+    result = np.stack(np.broadcast_arrays(lat, lon), axis=-1)
 
-    return math.degrees(lat), math.degrees(lon)
+    start = np.broadcast_to(a, result.shape)
+    end = np.broadcast_to(b, result.shape)
+    at_start = ((fractions <= 0.0) | (delta == 0.0))[..., None]
+    at_end = (fractions >= 1.0)[..., None]
+    return np.where(at_end, end, np.where(at_start, start, result))
 
 
-def bearing_degrees(a: Coordinate, b: Coordinate) -> float:
-    """Return the initial bearing from coordinate ``a`` to coordinate ``b`` in degrees."""
+def bearings_many(points: np.ndarray, targets: np.ndarray) -> np.ndarray:
+    """Vectorised :func:`bearing_degrees` from each of ``points`` to ``targets``."""
 
-    lat1, lon1 = map(math.radians, a)
-    lat2, lon2 = map(math.radians, b)
+    lat1, lon1 = _radians(points)
+    lat2, lon2 = _radians(targets)
     delta_lon = lon2 - lon1
-    x = math.sin(delta_lon) * math.cos(lat2)
-    y = math.cos(lat1) * math.sin(lat2) - math.sin(lat1) * math.cos(lat2) * math.cos(delta_lon)
-    bearing = math.degrees(math.atan2(x, y))
+    x = np.sin(delta_lon) * np.cos(lat2)
+    y = np.cos(lat1) * np.sin(lat2) - np.sin(lat1) * np.cos(lat2) * np.cos(delta_lon)
+    bearing = np.degrees(np.arctan2(x, y))
     return (bearing + 360.0) % 360.0
 
 
-def cumulative_distances(points: Sequence[Coordinate]) -> List[float]:
-    """Return cumulative travel distance along a sequence of coordinates."""
+def cumulative_distances(points: Sequence[Coordinate]) -> np.ndarray:
+    """Return cumulative travel distance in kilometres along a sequence of coordinates."""
 
-    distances: List[float] = [0.0]
-    for start, end in zip(points[:-1], points[1:]):
-        distances.append(distances[-1] + haversine_km(start, end))
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    distances = np.zeros(max(1, len(points)))
+    if len(points) > 1:
+        np.cumsum(haversine_km_many(points[:-1], points[1:]), out=distances[1:])
     return distances
+
+
+def decode_polyline(encoded: str, precision: int = 5) -> np.ndarray:
+    """Decode an encoded polyline string (as used by map directions APIs) to ``(K, 2)`` lat/lon rows."""
+
+    values = []
+    value = shift = 0
+    for character in encoded.encode("ascii"):
+        chunk = character - 63
+        if chunk < 0:
+            raise ValueError(f"Invalid character in encoded polyline: {chr(character)!r}")
+        value |= (chunk & 0x1F) << shift
+        shift += 5
+        if chunk < 0x20:
+            values.append(~(value >> 1) if value & 1 else value >> 1)
+            value = shift = 0
+    if shift or len(values) % 2:
+        raise ValueError("Encoded polyline is truncated.")
+    # Coordinates are stored as deltas from the previous point.
+    deltas = np.array(values, dtype=np.int64).reshape(-1, 2)
+    return np.cumsum(deltas, axis=0) / float(10**precision)
+
+
+def douglas_peucker(
+    points: np.ndarray, tolerance_km: float, keep: Optional[np.ndarray] = None
+) -> np.ndarray:
+    """Return a mask of the vertices Douglas–Peucker keeps within ``tolerance_km``.
+
+    Vertices set in ``keep`` are always kept and split the line into pieces that
+    are simplified independently; the first and last vertex are always kept.
+    Offsets are measured on a local equirectangular plane per piece, which is
+    accurate for the short spans a tolerance is compared against.
+    """
+
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    mask = np.zeros(len(points), dtype=bool) if keep is None else np.array(keep, dtype=bool)
+    if not len(points):
+        return mask
+    mask[0] = mask[-1] = True
+    km_per_degree = math.radians(EARTH_RADIUS_KM)
+    anchors = np.flatnonzero(mask)
+    stack = [(int(a), int(b)) for a, b in zip(anchors[:-1], anchors[1:]) if b - a > 1]
+    while stack:
+        start, end = stack.pop()
+        first, last = points[start], points[end]
+        scale_x = km_per_degree * math.cos(math.radians((first[0] + last[0]) / 2.0))
+        interior = points[start + 1 : end]
+        x = (interior[:, 1] - first[1]) * scale_x
+        y = (interior[:, 0] - first[0]) * km_per_degree
+        dx = (last[1] - first[1]) * scale_x
+        dy = (last[0] - first[0]) * km_per_degree
+        length = math.hypot(dx, dy)
+        if length > 0.0:
+            offsets = np.abs(x * dy - y * dx) / length
+        else:
+            offsets = np.hypot(x, y)
+        farthest = int(np.argmax(offsets))
+        if offsets[farthest] > tolerance_km:
+            split = start + 1 + farthest
+            mask[split] = True
+            if split - start > 1:
+                stack.append((start, split))
+            if end - split > 1:
+                stack.append((split, end))
+    return mask
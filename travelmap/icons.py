@@ -1,8 +1,13 @@
 """Helpers for loading and generating vehicle icons."""
 from __future__ import annotations
 
+import functools
+import hashlib
+from collections import OrderedDict
+from dataclasses import dataclass
+from multiprocessing import shared_memory
 from pathlib import Path
-from typing import Dict
+from typing import Dict, Optional, Tuple
 
 import numpy as np
 from PIL import Image, ImageDraw, ImageFont
@@ -51,19 +56,37 @@ def _generate_placeholder(vehicle_type: str, size: int = 96) -> Image.Image:
     return image
 
 
-def load_vehicle_icon(config: VehicleConfig, base_size: int = 128) -> np.ndarray:
-    """Return a numpy array containing the RGBA icon for the selected vehicle."""
-
-    if config.icon_path and Path(config.icon_path).exists():
-        image = Image.open(config.icon_path).convert("RGBA")
+@functools.lru_cache(maxsize=64)
+def _load_icon(
+    vehicle_type: str, icon_path: Optional[str], modified: float, icon_scale: float, base_size: int
+) -> np.ndarray:
+    if icon_path is not None:
+        image = Image.open(icon_path).convert("RGBA")
     else:
-        image = _generate_placeholder(config.type, size=base_size)
+        image = _generate_placeholder(vehicle_type, size=base_size)
 
-    if config.icon_scale != 1.0:
-        scaled_size = max(16, int(round(base_size * config.icon_scale)))
+    if icon_scale != 1.0:
+        scaled_size = max(16, int(round(base_size * icon_scale)))
         image = image.resize((scaled_size, scaled_size), Image.LANCZOS)
 
-    return np.array(image)
+    icon = np.array(image)
+    icon.setflags(write=False)
+    return icon
+
+
+def load_vehicle_icon(config: VehicleConfig, base_size: int = 128) -> np.ndarray:
+    """Return a numpy array containing the RGBA icon for the selected vehicle.
+
+    Icons are cached per process, keyed by the icon file's modification time,
+    so repeated renders do not decode or generate the same icon again.
+    """
+
+    icon_path: Optional[str] = None
+    modified = 0.0
+    if config.icon_path and Path(config.icon_path).exists():
+        icon_path = str(Path(config.icon_path).resolve())
+        modified = Path(icon_path).stat().st_mtime
+    return _load_icon(config.type, icon_path, modified, config.icon_scale, base_size).copy()
 
 
 def rotate_icon(icon: np.ndarray, bearing: float) -> np.ndarray:
@@ -72,3 +95,145 @@ def rotate_icon(icon: np.ndarray, bearing: float) -> np.ndarray:
     image = Image.fromarray(icon, mode="RGBA")
     rotated = image.rotate(-bearing, resample=Image.BICUBIC, expand=True)
     return np.array(rotated)
+
+
+@dataclass(frozen=True)
+class SharedAtlasHandle:
+    """Picklable reference to a :class:`SpriteAtlas` stored in shared memory."""
+
+    name: str
+    shape: Tuple[int, ...]
+    resolution: float
+
+
+class SpriteAtlas:
+    """Pre-rotated copies of a vehicle icon at a fixed angular resolution.
+
+    Bearings are quantised to multiples of ``resolution`` degrees and each
+    rotation is computed once. By default rotations are produced lazily and kept
+    in an LRU cache of ``cache_size`` entries; :meth:`precompute` instead builds a
+    dense ``(angles, size, size, 4)`` atlas with every rotation centred in a
+    square slot. A ``resolution`` of ``0`` disables quantisation and caches exact
+    bearings. Returned sprites are read-only views and must not be modified.
+    """
+
+    def __init__(self, icon: np.ndarray, resolution: float = 1.0, cache_size: int = 256) -> None:
+        if resolution < 0:
+            raise ValueError("Sprite rotation resolution must not be negative.")
+        self.icon = icon
+        self._angles = int(round(360.0 / resolution)) if resolution > 0 else 0
+        self.resolution = 360.0 / self._angles if self._angles else 0.0
+        self._cache: "OrderedDict[float, np.ndarray]" = OrderedDict()
+        self._cache_size = max(1, cache_size)
+        self._atlas: Optional[np.ndarray] = None
+        self._shared_memory: Optional[shared_memory.SharedMemory] = None
+        self._attached_memory: Optional[shared_memory.SharedMemory] = None
+
+    def _key(self, bearing: float) -> float:
+        if not self._angles:
+            return bearing % 360.0
+        return float(int(round(bearing / self.resolution)) % self._angles)
+
+    def get(self, bearing: float) -> np.ndarray:
+        """Return the icon rotated to ``bearing`` degrees."""
+
+        key = self._key(bearing)
+        if self._atlas is not None:
+            return self._atlas[int(key)]
+        sprite = self._cache.get(key)
+        if sprite is not None:
+            self._cache.move_to_end(key)
+            return sprite
+        angle = key * self.resolution if self._angles else key
+        sprite = rotate_icon(self.icon, angle)
+        sprite.setflags(write=False)
+        self._cache[key] = sprite
+        if len(self._cache) > self._cache_size:
+            self._cache.popitem(last=False)
+        return sprite
+
+    def indices(self, bearings: np.ndarray) -> np.ndarray:
+        """Return the slot in the dense atlas of each of ``bearings`` (degrees)."""
+
+        if not self._angles:
+            raise ValueError("A dense sprite atlas requires a positive rotation resolution.")
+        return np.rint(np.asarray(bearings) / self.resolution).astype(np.int64) % self._angles
+
+    def precompute(self) -> np.ndarray:
+        """Build and return the dense atlas holding every quantised rotation."""
+
+        if self._atlas is not None:
+            return self._atlas
+        if not self._angles:
+            raise ValueError("A dense sprite atlas requires a positive rotation resolution.")
+        sprites = [rotate_icon(self.icon, index * self.resolution) for index in range(self._angles)]
+        size = max(max(sprite.shape[:2]) for sprite in sprites)
+        atlas = np.zeros((self._angles, size, size, 4), dtype=np.uint8)
+        for slot, sprite in zip(atlas, sprites):
+            top = (size - sprite.shape[0]) // 2
+            left = (size - sprite.shape[1]) // 2
+            slot[top : top + sprite.shape[0], left : left + sprite.shape[1]] = sprite
+        atlas.setflags(write=False)
+        self._atlas = atlas
+        self._cache.clear()
+        return atlas
+
+    def share(self) -> SharedAtlasHandle:
+        """Publish a copy of the dense atlas in shared memory for other processes.
+
+        The segment stays alive until :meth:`release` is called on this atlas.
+        """
+
+        atlas = self.precompute()
+        if self._shared_memory is None:
+            self._shared_memory = shared_memory.SharedMemory(create=True, size=atlas.nbytes)
+            shared = np.ndarray(atlas.shape, dtype=np.uint8, buffer=self._shared_memory.buf)
+            shared[...] = atlas
+            del shared
+        return SharedAtlasHandle(self._shared_memory.name, atlas.shape, self.resolution)
+
+    @classmethod
+    def attach(cls, handle: SharedAtlasHandle) -> "SpriteAtlas":
+        """Create an atlas that reads the rotations published by :meth:`share`.
+
+        The attached process keeps the shared segment mapped for its lifetime.
+        """
+
+        memory = shared_memory.SharedMemory(name=handle.name)
+        atlas = np.ndarray(handle.shape, dtype=np.uint8, buffer=memory.buf)
+        atlas.setflags(write=False)
+        instance = cls(np.array(atlas[0]), resolution=handle.resolution)
+        instance._atlas = atlas
+        instance._attached_memory = memory
+        return instance
+
+    def release(self) -> None:
+        """Remove the shared memory segment created by :meth:`share`."""
+
+        if self._shared_memory is None:
+            return
+        self._shared_memory.close()
+        self._shared_memory.unlink()
+        self._shared_memory = None
+
+
+# Atlases are reused across animators in the same process, e.g. by consecutive
+# jobs of a batch render that share a vehicle.
+_ATLAS_CACHE: "OrderedDict[Tuple[str, Tuple[int, ...], float], SpriteAtlas]" = OrderedDict()
+_ATLAS_CACHE_SIZE = 16
+
+
+def sprite_atlas_for(icon: np.ndarray, resolution: float = 1.0) -> SpriteAtlas:
+    """Return a :class:`SpriteAtlas` for ``icon``, reusing one built earlier in this process."""
+
+    icon = np.ascontiguousarray(icon)
+    key = (hashlib.sha1(icon.tobytes()).hexdigest(), icon.shape, float(resolution))
+    atlas = _ATLAS_CACHE.get(key)
+    if atlas is None:
+        atlas = SpriteAtlas(icon, resolution)
+        _ATLAS_CACHE[key] = atlas
+        if len(_ATLAS_CACHE) > _ATLAS_CACHE_SIZE:
+            _ATLAS_CACHE.popitem(last=False)
+    else:
+        _ATLAS_CACHE.move_to_end(key)
+    return atlas
@@ -2,29 +2,313 @@
 from __future__ import annotations
 
 import argparse
+import sys
+import time
 from pathlib import Path
-from typing import Optional
+from typing import Callable, List, Optional, Tuple, TypeVar
 
+from .batch import BatchSummary, expand_config_paths, iter_batch, read_manifest
+from .checkpoint import DEFAULT_CHECKPOINT_FRAMES, CheckpointOptions
 from .config import load_config
-from .renderer import TravelMapAnimator
+from .engines import create_animator
+from .pipeline import DEFAULT_PIPELINE_DEPTH
+from .preview import EmptyPreviewError, PreviewOptions
+from .profiling import Profiler
+from .segment_cache import SegmentCache, parse_size
 
+T = TypeVar("T")
 
-def parse_args(argv: Optional[list[str]] = None) -> argparse.Namespace:
+
+def _range_type(
+    cast: Callable[[str], T], single: Optional[Callable[[T], T]] = None
+) -> Callable[[str], Tuple[Optional[T], Optional[T]]]:
+    """Argparse type for ``START:STOP`` ranges where either end may be omitted.
+
+    A value without a colon is only accepted when ``single`` is given; it maps
+    the value to the end of the range it stands for.
+    """
+
+    def parse(text: str) -> Tuple[Optional[T], Optional[T]]:
+        start, separator, stop = text.partition(":")
+        try:
+            first = cast(start) if start.strip() else None
+            last = cast(stop) if stop.strip() else None
+        except ValueError as exc:
+            raise argparse.ArgumentTypeError(f"invalid range: {text!r}") from exc
+        if not separator:
+            if single is None or first is None:
+                raise argparse.ArgumentTypeError(f"expected START:STOP, got {text!r}")
+            last = single(first)
+        return first, last
+
+    return parse
+
+
+def _build_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(description="Generate an animated travel map video.")
     parser.add_argument(
         "config",
+        nargs="*",
+        help=(
+            "Paths or glob patterns of the JSON or YAML configuration files containing "
+            "waypoints. Several configurations are rendered as a batch."
+        ),
+    )
+    parser.add_argument(
+        "--manifest",
+        type=Path,
+        action="append",
+        default=[],
+        help="File listing configuration paths or globs, one per line (may be repeated).",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        help="Number of configurations rendered concurrently in a batch (default: 1).",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Number of worker processes used to render frames (default: 1).",
+    )
+    parser.add_argument(
+        "--pipeline-depth",
+        type=int,
+        default=DEFAULT_PIPELINE_DEPTH,
+        help=(
+            "Frames queued between the drawing and encoding threads "
+            f"(default: {DEFAULT_PIPELINE_DEPTH}; 0 disables the encoder thread)."
+        ),
+    )
+    parser.add_argument(
+        "--cache-dir",
         type=Path,
-        help="Path to the JSON or YAML configuration file containing waypoints.",
+        default=None,
+        help="Directory of encoded leg segments reused between renders (default: disabled).",
+    )
+    parser.add_argument(
+        "--cache-max-bytes",
+        type=parse_size,
+        default=None,
+        help="Evict least recently used segments beyond this size, e.g. 500M or 2G (default: unlimited).",
+    )
+    parser.add_argument(
+        "--checkpoint",
+        action="store_true",
+        help=(
+            "Commit the video in chunks to OUTPUT.checkpoint/ as they are encoded and resume "
+            "an interrupted render from the last committed chunk."
+        ),
+    )
+    parser.add_argument(
+        "--checkpoint-frames",
+        type=int,
+        default=None,
+        help=f"Most frames encoded between two checkpoint commits (default: {DEFAULT_CHECKPOINT_FRAMES}).",
+    )
+    parser.add_argument(
+        "--keep-checkpoint",
+        action="store_true",
+        help="Keep the checkpoint chunks after the video is assembled.",
+    )
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        const="",
+        default=None,
+        metavar="REPORT",
+        help=(
+            "Record per-stage timings and peak memory and write a JSON report to REPORT "
+            "(default: next to the video with a .profile.json suffix)."
+        ),
+    )
+    parser.add_argument(
+        "--profile-memory",
+        action="store_true",
+        help="Also trace Python heap allocations while profiling (slows rendering down).",
+    )
+    preview = parser.add_argument_group(
+        "preview", "Render a quick draft next to the configured output. Any of these options implies --preview."
+    )
+    preview.add_argument(
+        "--preview",
+        action="store_true",
+        help="Render a draft at reduced resolution with fast encoder settings.",
+    )
+    preview.add_argument(
+        "--scale",
+        type=float,
+        default=None,
+        help="Fraction of the configured width and height to render at (default: 0.5).",
+    )
+    preview.add_argument(
+        "--stride",
+        type=int,
+        default=None,
+        help="Keep every Nth frame; the frame rate is reduced to match (default: 1).",
     )
-    return parser.parse_args(argv)
+    preview.add_argument(
+        "--frames",
+        type=_range_type(int, single=lambda frame: frame + 1),
+        default=None,
+        metavar="START[:STOP]",
+        help="Only render frames START (inclusive) to STOP (exclusive), or the single frame START.",
+    )
+    preview.add_argument(
+        "--seconds",
+        type=_range_type(float),
+        default=None,
+        metavar="START:STOP",
+        help="Only render the part of the video between these times in seconds.",
+    )
+    preview.add_argument(
+        "--legs",
+        type=_range_type(int, single=lambda leg: leg),
+        default=None,
+        metavar="FIRST[:LAST]",
+        help="Only render these legs, numbered from 1 (e.g. 3 or 2:4).",
+    )
+    return parser
 
 
-def main(argv: Optional[list[str]] = None) -> None:
-    args = parse_args(argv)
-    animation_config = load_config(args.config)
-    animator = TravelMapAnimator(animation_config)
-    output_path = animator.render()
+def parse_args(
+    argv: Optional[list[str]] = None, parser: Optional[argparse.ArgumentParser] = None
+) -> argparse.Namespace:
+    parser = _build_parser() if parser is None else parser
+    args = parser.parse_args(argv)
+    if not args.config and not args.manifest:
+        parser.error("at least one configuration file or --manifest is required")
+    if args.jobs > 1 and args.workers > 1:
+        parser.error("--workers cannot be combined with --jobs")
+    if args.profile_memory and args.profile is None:
+        args.profile = ""
+    if args.profile is not None and (len(args.config) != 1 or args.manifest):
+        parser.error("--profile requires exactly one configuration file")
+    try:
+        args.preview_options = _preview_options(args)
+    except ValueError as exc:
+        parser.error(str(exc))
+    if args.preview_options is not None and args.cache_dir:
+        parser.error("--cache-dir cannot be combined with preview options")
+    try:
+        args.checkpoint_options = _checkpoint_options(args)
+    except ValueError as exc:
+        parser.error(str(exc))
+    if args.checkpoint_options is not None and args.preview_options is not None:
+        parser.error("--checkpoint cannot be combined with preview options")
+    return args
+
+
+def _checkpoint_options(args: argparse.Namespace) -> Optional[CheckpointOptions]:
+    if not (args.checkpoint or args.checkpoint_frames is not None or args.keep_checkpoint):
+        return None
+    frames = DEFAULT_CHECKPOINT_FRAMES if args.checkpoint_frames is None else args.checkpoint_frames
+    return CheckpointOptions(chunk_frames=frames, keep=args.keep_checkpoint)
+
+
+def _preview_options(args: argparse.Namespace) -> Optional[PreviewOptions]:
+    selected = (args.scale, args.stride, args.frames, args.seconds, args.legs)
+    if not args.preview and all(value is None for value in selected):
+        return None
+    legs = None
+    if args.legs is not None:
+        first, last = args.legs
+        if (first is not None and first < 1) or (last is not None and last < 1):
+            raise ValueError("legs are numbered from 1")
+        if first is not None and last is not None and last < first:
+            raise ValueError(f"--legs range {first}:{last} is reversed")
+        legs = (first - 1 if first is not None else 0, last - 1 if last is not None else sys.maxsize)
+    return PreviewOptions(
+        scale=0.5 if args.scale is None else args.scale,
+        stride=1 if args.stride is None else args.stride,
+        frames=args.frames,
+        seconds=args.seconds,
+        legs=legs,
+    )
+
+
+def _render_single(config_path: Path, args: argparse.Namespace, cache: Optional[SegmentCache]) -> None:
+    profiler = Profiler(trace_memory=args.profile_memory).start() if args.profile is not None else None
+    animation_config = load_config(config_path)
+    animator = create_animator(animation_config, profiler=profiler)
+    output_path = animator.render(
+        workers=args.workers,
+        pipeline_depth=args.pipeline_depth,
+        cache=cache,
+        preview=args.preview_options,
+        checkpoint=args.checkpoint_options,
+    )
     print(f"Saved animation to {output_path}")
+    for extra_path in animator.output_paths[1:]:
+        print(f"Saved animation to {extra_path}")
+    if animator.cache_stats is not None:
+        label = "Checkpoint" if args.checkpoint_options is not None else "Cache"
+        print(f"{label}: {animator.cache_stats.describe()}")
+    if animator.pipeline_stats is not None:
+        print(f"Pipeline: {animator.pipeline_stats.describe()}")
+    if profiler is not None:
+        profiler.stop()
+        report_path = Path(args.profile) if args.profile else output_path.with_suffix(".profile.json")
+        profiler.write_report(
+            report_path,
+            config=str(config_path),
+            engine=animation_config.engine,
+            width=animation_config.width,
+            height=animation_config.height,
+            workers=args.workers,
+            pipeline_depth=args.pipeline_depth,
+        )
+        print(f"Profile: {profiler.describe()}")
+        print(f"Profile report written to {report_path}")
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    arguments = sys.argv[1:] if argv is None else argv
+    if arguments[:1] == ["stats"]:
+        from .stats import main as stats_main
+
+        stats_main(arguments[1:])
+        return
+    if arguments[:1] == ["serve"]:
+        from .serve import main as serve_main
+
+        serve_main(arguments[1:])
+        return
+    parser = _build_parser()
+    args = parse_args(argv, parser)
+    cache = SegmentCache(args.cache_dir, args.cache_max_bytes) if args.cache_dir else None
+
+    patterns: List[str] = list(args.config)
+    for manifest in args.manifest:
+        patterns.extend(read_manifest(manifest))
+    config_paths = expand_config_paths(patterns)
+    if len(config_paths) == 1 and not args.manifest:
+        try:
+            _render_single(config_paths[0], args, cache)
+        except EmptyPreviewError as exc:
+            # Only the timeline shows that the range is out of bounds.
+            parser.error(str(exc))
+        return
+
+    started = time.perf_counter()
+    results = []
+    for result in iter_batch(
+        config_paths,
+        args.jobs,
+        args.workers,
+        args.pipeline_depth,
+        cache,
+        args.preview_options,
+        args.checkpoint_options,
+    ):
+        print(result.describe(), flush=True)
+        results.append(result)
+    summary = BatchSummary(results, time.perf_counter() - started)
+    print(f"Batch: {summary.describe()}")
+    if summary.failed:
+        sys.exit(1)
 
 
 if __name__ == "__main__":  # pragma: no cover - CLI entry point
@@ -1,10 +1,39 @@
-"""Simplified map shapes used to render a stylised world map."""
+"""Map shapes used to render the world map backdrop.
+
+Besides the built-in stylised continents, polygon data can be loaded from
+GeoJSON files or packed ``.npz`` files (a ``vertices`` array of ``(lat, lon)``
+rows and an ``offsets`` array delimiting the rings). Loaded data is simplified
+into a level-of-detail pyramid that is cached on disk, and rendering picks the
+coarsest level that is still accurate to a fraction of a pixel and clips it to
+the viewport, so the drawing cost follows the output resolution rather than
+the size of the dataset.
+"""
 from __future__ import annotations
 
-from typing import Dict, List, Sequence, Tuple
+import functools
+import json
+import math
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .array_cache import cache_directory, load_arrays, save_arrays, source_fingerprint
+from .geometry import douglas_peucker
+from .spherical import EARTH_RADIUS_KM
 
 Coordinate = Tuple[float, float]
 
+# Simplification tolerances in degrees, finest first. Each level is simplified
+# from the previous one.
+LOD_TOLERANCES = (0.0, 0.002, 0.008, 0.03, 0.12, 0.5)
+# Largest simplification error allowed on screen, in pixels.
+MAX_ERROR_PIXELS = 0.75
+_FORMAT_VERSION = 2
+# Rings reaching the poles are simplified as if they stopped at about 84 degrees.
+_MIN_LONGITUDE_SCALE = 0.1
+
 # The shapes below are stylised, intentionally low fidelity outlines intended to
 # provide geographical context without the need for large shape files. They were
 # sketched manually using coarse coordinates for each continent.
@@ -93,3 +122,253 @@ def iter_shapes() -> Sequence[List[Coordinate]]:
     """Yield the coordinate sets for each simplified shape."""
 
     return CONTINENT_SHAPES.values()
+
+
+@dataclass
+class ShapeLevel:
+    """Rings simplified to ``tolerance`` degrees, stored as flat arrays.
+
+    Rings are open (the first vertex is not repeated) and ring ``i`` spans
+    ``vertices[offsets[i]:offsets[i + 1]]``. ``bounds`` holds each ring's
+    ``(lat_min, lat_max, lon_min, lon_max)`` for fast viewport culling.
+    """
+
+    tolerance: float
+    vertices: np.ndarray
+    offsets: np.ndarray
+    bounds: np.ndarray
+
+    @classmethod
+    def from_rings(cls, tolerance: float, rings: Sequence[np.ndarray]) -> "ShapeLevel":
+        lengths = np.array([len(ring) for ring in rings], dtype=np.int64)
+        offsets = np.concatenate(([0], np.cumsum(lengths))).astype(np.int64)
+        vertices = np.concatenate(rings) if rings else np.zeros((0, 2))
+        bounds = np.array(
+            [(r[:, 0].min(), r[:, 0].max(), r[:, 1].min(), r[:, 1].max()) for r in rings], dtype=np.float64
+        ).reshape(-1, 4)
+        return cls(tolerance, vertices.astype(np.float64), offsets, bounds)
+
+    def rings(self) -> Iterator[np.ndarray]:
+        offsets = self.offsets.tolist()
+        for start, stop in zip(offsets[:-1], offsets[1:]):
+            yield self.vertices[start:stop]
+
+
+class ShapeLayer:
+    """Level-of-detail pyramid of map polygons."""
+
+    def __init__(self, levels: List[ShapeLevel], fingerprint: str) -> None:
+        self.levels = levels
+        self.fingerprint = fingerprint
+
+    @classmethod
+    def build(
+        cls,
+        rings: Sequence[np.ndarray],
+        fingerprint: str = "",
+        tolerances: Sequence[float] = LOD_TOLERANCES,
+    ) -> "ShapeLayer":
+        """Simplify ``rings`` at every tolerance in ``tolerances`` (finest first)."""
+
+        current = [ring for ring in (_open_ring(ring) for ring in rings) if len(ring) >= 3]
+        levels = [ShapeLevel.from_rings(tolerances[0], current)]
+        for tolerance in tolerances[1:]:
+            simplified = []
+            for ring in current:
+                extent = np.ptp(ring, axis=0)
+                # Rings smaller than the tolerance would not cover a pixel.
+                if extent.max() < tolerance:
+                    continue
+                ring = simplify_ring(ring, tolerance)
+                if len(ring) >= 3:
+                    simplified.append(ring)
+            current = simplified
+            levels.append(ShapeLevel.from_rings(tolerance, current))
+        return cls(levels, fingerprint)
+
+    @classmethod
+    def open(cls, source: Path, cache_dir: Optional[Path] = None) -> "ShapeLayer":
+        """Load GeoJSON or packed polygon data, reusing a cached pyramid when possible."""
+
+        fingerprint = source_fingerprint(source, _FORMAT_VERSION, LOD_TOLERANCES)
+        directory = cache_directory("shapes", fingerprint, cache_dir)
+        cached = load_arrays(directory)
+        if cached is not None:
+            arrays, meta = cached
+            levels = [
+                ShapeLevel(
+                    tolerance,
+                    arrays[f"vertices_{index}"],
+                    arrays[f"offsets_{index}"],
+                    arrays[f"bounds_{index}"],
+                )
+                for index, tolerance in enumerate(meta["tolerances"])
+            ]
+            return cls(levels, fingerprint)
+
+        layer = cls.build(read_rings(Path(source)), fingerprint)
+        arrays: Dict[str, np.ndarray] = {}
+        for index, level in enumerate(layer.levels):
+            arrays[f"vertices_{index}"] = level.vertices
+            arrays[f"offsets_{index}"] = level.offsets
+            arrays[f"bounds_{index}"] = level.bounds
+        save_arrays(directory, arrays, {"tolerances": [level.tolerance for level in layer.levels]})
+        return layer
+
+    def level_for(self, pixels_per_degree: float) -> ShapeLevel:
+        """Return the coarsest level whose error stays below :data:`MAX_ERROR_PIXELS`."""
+
+        allowed = MAX_ERROR_PIXELS / max(pixels_per_degree, 1e-9)
+        chosen = self.levels[0]
+        for level in self.levels:
+            if level.tolerance <= allowed:
+                chosen = level
+        return chosen
+
+    def visible_rings(
+        self, lat_min: float, lat_max: float, lon_min: float, lon_max: float, pixels_per_degree: float
+    ) -> List[np.ndarray]:
+        """Return closed ``(K, 2)`` lat/lon rings clipped to the box at a matching detail level."""
+
+        level = self.level_for(pixels_per_degree)
+        bounds = level.bounds
+        overlapping = np.flatnonzero(
+            (bounds[:, 0] <= lat_max)
+            & (bounds[:, 1] >= lat_min)
+            & (bounds[:, 2] <= lon_max)
+            & (bounds[:, 3] >= lon_min)
+        )
+        inside = (
+            (bounds[overlapping, 0] >= lat_min)
+            & (bounds[overlapping, 1] <= lat_max)
+            & (bounds[overlapping, 2] >= lon_min)
+            & (bounds[overlapping, 3] <= lon_max)
+        )
+        rings: List[np.ndarray] = []
+        offsets = level.offsets
+        for index, contained in zip(overlapping.tolist(), inside.tolist()):
+            ring = np.asarray(level.vertices[offsets[index] : offsets[index + 1]])
+            if not contained:
+                ring = clip_ring(ring, lat_min, lat_max, lon_min, lon_max)
+                if len(ring) < 3:
+                    continue
+            rings.append(np.concatenate((ring, ring[:1])))
+        return rings
+
+
+def _open_ring(ring: np.ndarray) -> np.ndarray:
+    ring = np.asarray(ring, dtype=np.float64).reshape(-1, 2)
+    if len(ring) > 1 and np.array_equal(ring[0], ring[-1]):
+        ring = ring[:-1]
+    return ring
+
+
+def simplify_ring(ring: np.ndarray, tolerance: float) -> np.ndarray:
+    """Simplify an open ring with Douglas-Peucker at ``tolerance`` degrees.
+
+    :func:`~travelmap.geometry.douglas_peucker` measures offsets in km, with
+    longitude shortened by the cosine of the latitude. The km tolerance is
+    scaled by the cosine at the ring's most poleward vertex, so no vertex
+    moves more than ``tolerance`` degrees in longitude either.
+    """
+
+    if len(ring) <= 3 or tolerance <= 0:
+        return ring
+    # Split the ring at the vertex farthest from its first vertex, so it is
+    # simplified as two polylines that share both end points.
+    split = int(np.argmax(np.hypot(*(ring - ring[0]).T)))
+    if split == 0:
+        return ring[:1]
+    closed = np.concatenate((ring, ring[:1]))
+    keep = np.zeros(len(closed), dtype=bool)
+    keep[split] = True
+    shortening = max(math.cos(math.radians(float(np.abs(ring[:, 0]).max()))), _MIN_LONGITUDE_SCALE)
+    mask = douglas_peucker(closed, tolerance * math.radians(EARTH_RADIUS_KM) * shortening, keep)
+    return closed[:-1][mask[:-1]]
+
+
+def _clip_half_plane(points: np.ndarray, axis: int, limit: float, keep_above: bool) -> np.ndarray:
+    """One Sutherland-Hodgman pass clipping an open ring against ``points[:, axis] = limit``."""
+
+    if not len(points):
+        return points
+    values = points[:, axis]
+    inside = values >= limit if keep_above else values <= limit
+    if inside.all():
+        return points
+    if not inside.any():
+        return points[:0]
+    following = np.roll(points, -1, axis=0)
+    crossing = inside != np.roll(inside, -1)
+    delta = following[:, axis] - values
+    with np.errstate(divide="ignore", invalid="ignore"):
+        fraction = np.where(crossing, (limit - values) / delta, 0.0)
+    intersections = points + fraction[:, None] * (following - points)
+    counts = inside.astype(np.int64) + crossing
+    positions = np.cumsum(counts) - counts
+    clipped = np.empty((int(counts.sum()), 2))
+    clipped[positions[inside]] = points[inside]
+    clipped[positions[crossing] + inside[crossing]] = intersections[crossing]
+    return clipped
+
+
+def clip_ring(ring: np.ndarray, lat_min: float, lat_max: float, lon_min: float, lon_max: float) -> np.ndarray:
+    """Clip an open ring to a lat/lon box and return the open clipped ring."""
+
+    ring = _clip_half_plane(ring, 0, lat_min, True)
+    ring = _clip_half_plane(ring, 0, lat_max, False)
+    ring = _clip_half_plane(ring, 1, lon_min, True)
+    return _clip_half_plane(ring, 1, lon_max, False)
+
+
+def _geojson_polygons(node: Any) -> Iterator[Any]:
+    """Yield the exterior rings (as ``[lon, lat]`` lists) of every polygon in a GeoJSON node."""
+
+    kind = node.get("type") if isinstance(node, dict) else None
+    if kind == "FeatureCollection":
+        for feature in node.get("features", []):
+            yield from _geojson_polygons(feature)
+    elif kind == "Feature":
+        if node.get("geometry"):
+            yield from _geojson_polygons(node["geometry"])
+    elif kind == "GeometryCollection":
+        for geometry in node.get("geometries", []):
+            yield from _geojson_polygons(geometry)
+    elif kind == "Polygon":
+        if node["coordinates"]:
+            yield node["coordinates"][0]
+    elif kind == "MultiPolygon":
+        for polygon in node["coordinates"]:
+            if polygon:
+                yield polygon[0]
+
+
+def read_rings(path: Path) -> List[np.ndarray]:
+    """Read polygon rings as ``(K, 2)`` lat/lon arrays from GeoJSON or a packed ``.npz`` file.
+
+    Only exterior rings are used; holes are ignored.
+    """
+
+    path = Path(path)
+    if path.suffix.lower() == ".npz":
+        with np.load(path) as packed:
+            vertices = np.asarray(packed["vertices"], dtype=np.float64)
+            offsets = packed["offsets"].tolist()
+        return [vertices[start:stop] for start, stop in zip(offsets[:-1], offsets[1:])]
+    if path.suffix.lower() not in {".geojson", ".json"}:
+        raise ValueError(f"Unsupported map data format '{path.suffix}'. Use GeoJSON or packed .npz files.")
+    with path.open("r", encoding="utf8") as handle:
+        data = json.load(handle)
+    # GeoJSON positions are (lon, lat).
+    return [np.asarray(ring, dtype=np.float64)[:, 1::-1] for ring in _geojson_polygons(data)]
+
+
+@functools.lru_cache(maxsize=8)
+def open_shape_layer(path: Optional[Path] = None) -> ShapeLayer:
+    """Return the shape layer for ``path`` (default: the built-in continents), once per process."""
+
+    if path is None:
+        # The sketched continents are already coarse and are drawn as-is.
+        shapes = [np.asarray(shape) for shape in CONTINENT_SHAPES.values()]
+        return ShapeLayer.build(shapes, "builtin", tolerances=(0.0,))
+    return ShapeLayer.open(Path(path))
@@ -0,0 +1,381 @@
+"""Write several resolutions of the same animation from one pass of drawn frames.
+
+Every frame is drawn once at the animation's size. A :class:`MultiWriter`
+builds a downscale pyramid from it, where each output is area-averaged from
+a larger level that is already computed, and encodes each level on its own
+thread.
+"""
+from __future__ import annotations
+
+import queue
+import threading
+from dataclasses import dataclass
+from fractions import Fraction
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from PIL import Image
+
+from .config import AnimationConfig
+
+# Frames queued per output while its encoder catches up.
+_SINK_DEPTH = 2
+# Fixed-point precision of fractional resampling weights.
+_WEIGHT_BITS = 8
+_WEIGHT_ONE = 1 << _WEIGHT_BITS
+# Ratios whose reduced denominator is at most this are resampled phase by phase.
+_MAX_PHASES = 16
+# Codecs implied by containers that cannot hold the default H.264 stream.
+_CONTAINER_CODECS = {".webm": "libvpx-vp9"}
+
+
+def _even(value: float) -> int:
+    # Encoders subsample chroma 2x2, so keep both dimensions even.
+    return max(2, int(round(value / 2.0)) * 2)
+
+
+@dataclass
+class ResolvedOutput:
+    """An output target with its final frame size and encoder overrides."""
+
+    output_path: Path
+    width: int
+    height: int
+    encoder_overrides: Dict[str, Any]
+
+
+def resolve_outputs(config: AnimationConfig) -> List[ResolvedOutput]:
+    """Return the primary output followed by ``config.outputs`` with concrete sizes.
+
+    Outputs may not be larger than the drawn frame, since they are only ever
+    downscaled from it.
+    """
+
+    resolved = [ResolvedOutput(Path(config.output_path), config.width, config.height, {})]
+    for target in config.outputs:
+        width, height = target.width, target.height
+        if width is None and height is None:
+            width, height = config.width, config.height
+        elif height is None:
+            height = _even(width * config.height / config.width)
+        elif width is None:
+            width = _even(height * config.width / config.height)
+        if width > config.width or height > config.height:
+            raise ValueError(
+                f"Output {target.output_path} ({width}x{height}) is larger than the rendered "
+                f"frame ({config.width}x{config.height}); raise the animation's width and height."
+            )
+        overrides: Dict[str, Any] = {}
+        codec = target.codec or _CONTAINER_CODECS.get(Path(target.output_path).suffix.lower())
+        if codec is not None:
+            overrides["codec"] = codec
+        if target.quality is not None:
+            overrides["quality"] = target.quality
+        resolved.append(ResolvedOutput(Path(target.output_path), width, height, overrides))
+    return resolved
+
+
+# ----------------------------------------------------------------------
+# Area resampling
+# ----------------------------------------------------------------------
+
+
+def _crop_size(width: int, height: int, new_width: int, new_height: int) -> Tuple[int, int]:
+    """Return the largest ``width`` x ``height`` crop with the aspect ratio of the new size."""
+
+    if new_width * height == new_height * width:
+        return width, height
+    return (
+        min(width, int(round(height * new_width / new_height))),
+        min(height, int(round(width * new_height / new_width))),
+    )
+
+
+def _box_reduce(image: np.ndarray, factor_y: int, factor_x: int) -> np.ndarray:
+    """Average ``factor_y`` x ``factor_x`` blocks of uint8 ``image`` with integer arithmetic."""
+
+    height, width = image.shape[:2]
+    accumulator = np.uint16 if factor_y * factor_x <= 257 else np.uint32
+    rows = image.reshape((height // factor_y, factor_y) + image.shape[1:])
+    total = rows[:, 0].astype(accumulator)
+    for offset in range(1, factor_y):
+        total += rows[:, offset]
+    columns = total.reshape((height // factor_y, width // factor_x, factor_x) + image.shape[2:])
+    total = columns[:, :, 0].copy()
+    for offset in range(1, factor_x):
+        total += columns[:, :, offset]
+    count = factor_y * factor_x
+    total += count // 2
+    if count & (count - 1):
+        total //= count
+    else:
+        total >>= count.bit_length() - 1
+    return total.astype(np.uint8)
+
+
+def _area_taps(size: int, new_size: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Return ``(indices, weights)`` of shape ``(new_size, taps)`` averaging ``size`` samples.
+
+    Output sample ``i`` covers the input interval ``[i, i + 1) * size / new_size``
+    and each input sample is weighted by how much of it lies in that interval.
+    Weights are fixed point with :data:`_WEIGHT_ONE` as one; every row sums to
+    exactly that, so a ``uint16`` accumulator cannot overflow.
+    """
+
+    scale = size / new_size
+    taps = int(np.ceil(scale)) + 1
+    starts = np.arange(new_size) * scale
+    first = np.floor(starts).astype(np.int64)
+    indices = first[:, None] + np.arange(taps)[None, :]
+    low = np.maximum(indices, starts[:, None])
+    high = np.minimum(indices + 1, (starts + scale)[:, None])
+    exact = np.clip(high - low, 0.0, None) / scale * _WEIGHT_ONE
+    weights = np.floor(exact + 0.5).astype(np.int64)
+    rows = np.arange(new_size)
+    weights[rows, exact.argmax(axis=1)] += _WEIGHT_ONE - weights.sum(axis=1)
+    return np.minimum(indices, size - 1), weights.astype(np.uint16)
+
+
+def _resample_axis(image: np.ndarray, new_size: int, axis: int) -> np.ndarray:
+    """Area-resample uint8 ``image`` along ``axis`` to ``new_size`` samples."""
+
+    size = image.shape[axis]
+    before, after = image.shape[:axis], image.shape[axis + 1 :]
+    ratio = Fraction(size, new_size)
+    period, outputs = ratio.numerator, ratio.denominator
+    total = np.empty(before + (new_size,) + after, dtype=np.uint16)
+    term = np.empty_like(total)
+    if outputs <= _MAX_PHASES:
+        # The weights repeat every ``period`` inputs, so each output phase is a
+        # weighted sum of strided slices; nothing is gathered.
+        indices, weights = _area_taps(period, outputs)
+        blocks = image.reshape(before + (size // period, period) + after)
+        phases = total.reshape(before + (new_size // outputs, outputs) + after)
+        scratch = term.reshape(phases.shape)
+        lead = (slice(None),) * axis
+        for phase in range(outputs):
+            target = phases[lead + (slice(None), phase)]
+            spare = scratch[lead + (slice(None), phase)]
+            started = False
+            for index, weight in zip(indices[phase].tolist(), weights[phase].tolist()):
+                if not weight:
+                    continue
+                source = blocks[lead + (slice(None), index)]
+                np.multiply(source, np.uint16(weight), out=spare if started else target, dtype=np.uint16)
+                if started:
+                    target += spare
+                started = True
+    else:
+        indices, weights = _area_taps(size, new_size)
+        shape = (-1,) + (1,) * len(after)
+        for tap in range(indices.shape[1]):
+            source = np.take(image, indices[:, tap], axis=axis)
+            np.multiply(source, weights[:, tap].reshape(shape), out=term if tap else total, dtype=np.uint16)
+            if tap:
+                total += term
+    total += _WEIGHT_ONE // 2
+    total >>= _WEIGHT_BITS
+    return total.astype(np.uint8)
+
+
+def area_resize(image: np.ndarray, width: int, height: int) -> np.ndarray:
+    """Downscale ``(H, W, C)`` uint8 ``image`` to ``width`` x ``height`` by area averaging.
+
+    When the aspect ratio changes the image is first cropped around its centre
+    to the target's aspect ratio, so nothing is stretched. Integer factors use
+    an exact integer box filter; other factors weight partially covered pixels
+    in 8-bit fixed point, which is within one level of the exact average.
+    """
+
+    source_height, source_width = image.shape[:2]
+    if width > source_width or height > source_height:
+        raise ValueError("area_resize only downscales.")
+    crop_width, crop_height = _crop_size(source_width, source_height, width, height)
+    if (crop_width, crop_height) != (source_width, source_height):
+        left = (source_width - crop_width) // 2
+        top = (source_height - crop_height) // 2
+        image = image[top : top + crop_height, left : left + crop_width]
+    if (width, height) == (crop_width, crop_height):
+        return image
+    if not crop_width % width and not crop_height % height:
+        return _box_reduce(image, crop_height // height, crop_width // width)
+    if crop_height != height:
+        image = _resample_axis(image, height, 0)
+    if crop_width != width:
+        image = _resample_axis(image, width, 1)
+    return image
+
+
+def pyramid_sources(sizes: Sequence[Tuple[int, int]]) -> List[int]:
+    """Return, for every ``(width, height)``, the index of the level to downscale it from.
+
+    ``sizes[0]`` is the drawn frame. Larger sizes are computed first and each
+    one is reduced from the smallest level computed before it that covers it,
+    preferring levels it divides evenly, so a 4K frame feeding 1080p, 720p and
+    360p outputs is reduced by 2, 3 and 2 (from 720p) with exact box filters.
+    """
+
+    def area(index: int) -> int:
+        return sizes[index][0] * sizes[index][1]
+
+    sources = [0] * len(sizes)
+    computed = [0]
+    for index in sorted(range(1, len(sizes)), key=area, reverse=True):
+        width, height = sizes[index]
+        best: Optional[Tuple[bool, int]] = None
+        for level in computed:
+            level_width, level_height = sizes[level]
+            if level_width < width or level_height < height:
+                continue
+            crop_width, crop_height = _crop_size(level_width, level_height, width, height)
+            rank = (bool(crop_width % width or crop_height % height), area(level))
+            if best is None or rank < best:
+                best, sources[index] = rank, level
+        computed.append(index)
+    return sources
+
+
+# ----------------------------------------------------------------------
+# Encoder sinks
+# ----------------------------------------------------------------------
+
+
+def reduce_level(image: np.ndarray, width: int, height: int) -> np.ndarray:
+    """Downscale the pyramid level ``image`` to ``width`` x ``height`` for encoding.
+
+    Like :func:`area_resize`, but integer factors of a contiguous RGBA frame are
+    averaged by Pillow's ``reduce``, which is two to three times faster than
+    :func:`_box_reduce` and matches it to within one level. The frame is read
+    as RGBX because the encoders discard alpha: the fourth channel of the
+    result is always 255.
+    """
+
+    source_height, source_width = image.shape[:2]
+    crop_width, crop_height = _crop_size(source_width, source_height, width, height)
+    factor_x, spare_x = divmod(crop_width, width)
+    factor_y, spare_y = divmod(crop_height, height)
+    if spare_x or spare_y or factor_x * factor_y == 1 or image.shape[2:] != (4,) or not image.flags.c_contiguous:
+        return area_resize(image, width, height)
+    left = (source_width - crop_width) // 2
+    top = (source_height - crop_height) // 2
+    level = Image.frombuffer("RGBX", (source_width, source_height), image, "raw", "RGBX", 0, 1)
+    return np.asarray(level.reduce((factor_x, factor_y), box=(left, top, left + crop_width, top + crop_height)))
+
+
+class _Frame:
+    """A drawn frame and the pyramid levels computed from it so far."""
+
+    def __init__(self, image: np.ndarray, count: int) -> None:
+        self._levels: List[Optional[np.ndarray]] = [image] + [None] * (count - 1)
+        self._ready = [threading.Event() for _ in range(count)]
+        self._ready[0].set()
+
+    def level(self, index: int) -> np.ndarray:
+        self._ready[index].wait()
+        image = self._levels[index]
+        if image is None:
+            raise RuntimeError("A larger output failed to produce its frame.")
+        return image
+
+    def publish(self, index: int, image: Optional[np.ndarray]) -> None:
+        self._levels[index] = image
+        self._ready[index].set()
+
+
+class _Sink:
+    """One output's writer, fed frames on its own thread.
+
+    The thread computes its own pyramid level from its source level, so the
+    downscaling of different outputs runs in parallel with the encoders.
+    """
+
+    def __init__(self, writer: Any, index: int, source: int, size: Tuple[int, int]) -> None:
+        self.writer = writer
+        self.errors: List[BaseException] = []
+        self._index = index
+        self._source = source
+        self._size = size
+        self._queue: "queue.Queue[Optional[Tuple[_Frame, int]]]" = queue.Queue(maxsize=_SINK_DEPTH)
+        self._thread = threading.Thread(target=self._run, name=f"travelmap-output-{index}", daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            frame, repeat = item
+            if self.errors:
+                # Unblock the outputs reduced from this one, then keep draining.
+                frame.publish(self._index, None)
+                continue
+            image: Optional[np.ndarray] = None
+            try:
+                image = frame.level(self._source)
+                if self._index:
+                    image = reduce_level(image, *self._size)
+                frame.publish(self._index, image)
+                for _ in range(repeat):
+                    self.writer.append_data(image)
+            except BaseException as exc:  # pragma: no cover - surfaced by MultiWriter
+                self.errors.append(exc)
+                frame.publish(self._index, image)
+
+    def put(self, frame: _Frame, repeat: int) -> None:
+        self._queue.put((frame, repeat))
+
+    def close(self) -> None:
+        self._queue.put(None)
+        self._thread.join()
+        self.writer.close()
+
+
+class MultiWriter:
+    """Frame writer that fans each frame out to several outputs at their own sizes.
+
+    ``open_writer`` is called with each :class:`ResolvedOutput` to create its
+    encoder; the first output must be the size of the drawn frames. Each
+    output has a thread that downscales and encodes, so the outputs are
+    produced side by side while the next frame is drawn.
+    """
+
+    def __init__(self, outputs: Sequence[ResolvedOutput], open_writer: Callable[[ResolvedOutput], Any]) -> None:
+        self.outputs = list(outputs)
+        sizes = [(output.width, output.height) for output in self.outputs]
+        sources = pyramid_sources(sizes)
+        self._sinks: List[_Sink] = []
+        try:
+            for index, output in enumerate(self.outputs):
+                self._sinks.append(_Sink(open_writer(output), index, sources[index], sizes[index]))
+        except BaseException:
+            self.close()
+            raise
+
+    def append_data(self, image: np.ndarray) -> None:
+        self.append_run(image, 1)
+
+    def append_run(self, image: np.ndarray, repeat: int) -> None:
+        """Write ``image`` ``repeat`` times to every output, downscaling it only once."""
+
+        for sink in self._sinks:
+            if sink.errors:
+                raise sink.errors[0]
+        # The drawn frame may be a reused buffer, so the outputs get their own copy.
+        frame = _Frame(np.array(image, copy=True), len(self._sinks))
+        for sink in self._sinks:
+            sink.put(frame, repeat)
+
+    def close(self) -> None:
+        sinks, self._sinks = self._sinks, []
+        for sink in sinks:
+            sink.close()
+        for sink in sinks:
+            if sink.errors:
+                raise sink.errors[0]
+
+    def __enter__(self) -> "MultiWriter":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
@@ -0,0 +1,87 @@
+"""Process pool helpers for rendering animation frames in parallel."""
+from __future__ import annotations
+
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Deque, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .config import AnimationConfig
+from .icons import SharedAtlasHandle, SpriteAtlas
+
+# Each worker process keeps its own animator (and therefore its own canvas and
+# cached static layer) for the lifetime of the pool.
+_WORKER_ANIMATOR = None
+
+DEFAULT_CHUNK_FRAMES = 8
+
+
+def _init_worker(config: AnimationConfig, sprite_atlas: Optional[SharedAtlasHandle]) -> None:
+    global _WORKER_ANIMATOR
+    from .engines import create_animator
+
+    _WORKER_ANIMATOR = create_animator(config)
+    if sprite_atlas is not None:
+        _WORKER_ANIMATOR._sprite_atlas = SpriteAtlas.attach(sprite_atlas)
+
+
+def _render_chunk(indices: List[int]) -> np.ndarray:
+    """Render the frames at ``indices`` and return them stacked in one array."""
+
+    animator = _WORKER_ANIMATOR
+    if animator is None:  # pragma: no cover - defensive branch
+        raise RuntimeError("Render worker used before initialisation.")
+    chunk: Optional[np.ndarray] = None
+    for offset, index in enumerate(indices):
+        image = animator._render_frame(index)
+        if chunk is None:
+            chunk = np.empty((len(indices),) + image.shape, dtype=np.uint8)
+        chunk[offset] = image
+    assert chunk is not None
+    return chunk
+
+
+def iter_frame_runs_parallel(
+    config: AnimationConfig,
+    run_starts: Sequence[int],
+    run_lengths: Sequence[int],
+    workers: int,
+    chunk_frames: int = DEFAULT_CHUNK_FRAMES,
+    sprite_atlas: Optional[SharedAtlasHandle] = None,
+) -> Iterator[Tuple[np.ndarray, int]]:
+    """Yield ``(image, repeat)`` pairs in timeline order using a pool of ``workers`` processes.
+
+    Each run of identical frames, described by ``run_starts`` and ``run_lengths``,
+    is rendered once. Runs are grouped into contiguous chunks of ``chunk_frames``
+    rendered frames. At most ``2 * workers`` chunks are in flight at any time so
+    memory use is bounded by the chunk size rather than the length of the video.
+    When ``sprite_atlas`` is given the workers read vehicle rotations from that
+    shared atlas instead of rotating the icon themselves.
+    """
+
+    if workers < 1:
+        raise ValueError("At least one render worker is required.")
+    chunk_frames = max(1, int(chunk_frames))
+    max_pending = 2 * workers
+    run_count = len(run_starts)
+
+    with ProcessPoolExecutor(
+        max_workers=workers, initializer=_init_worker, initargs=(config, sprite_atlas)
+    ) as pool:
+        pending: Deque[Tuple[Future, Sequence[int]]] = deque()
+        next_run = 0
+        try:
+            while pending or next_run < run_count:
+                while next_run < run_count and len(pending) < max_pending:
+                    stop = min(run_count, next_run + chunk_frames)
+                    indices = [int(start) for start in run_starts[next_run:stop]]
+                    future = pool.submit(_render_chunk, indices)
+                    pending.append((future, run_lengths[next_run:stop]))
+                    next_run = stop
+                future, lengths = pending.popleft()
+                for image, repeat in zip(future.result(), lengths):
+                    yield image, int(repeat)
+        finally:
+            for future, _ in pending:
+                future.cancel()
@@ -0,0 +1,162 @@
+"""Producer/consumer pipeline that overlaps frame drawing with video encoding."""
+from __future__ import annotations
+
+import queue
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+DEFAULT_PIPELINE_DEPTH = 4
+
+# Seconds between liveness checks while one stage waits on the other.
+_POLL_SECONDS = 0.1
+
+
+@dataclass
+class PipelineStats:
+    """Timing and queue metrics collected by :func:`encode_pipelined`."""
+
+    frames: int = 0
+    unique_frames: int = 0
+    draw_seconds: float = 0.0
+    encode_seconds: float = 0.0
+    draw_stall_seconds: float = 0.0
+    encode_stall_seconds: float = 0.0
+    max_queue_depth: int = 0
+    queue_depth_total: int = 0
+
+    @property
+    def mean_queue_depth(self) -> float:
+        """Mean queue depth seen by each drawn frame; repeats share one queue slot."""
+
+        return self.queue_depth_total / self.unique_frames if self.unique_frames else 0.0
+
+    @property
+    def bound_by(self) -> str:
+        """``"encoding"`` when drawing mostly waited for free buffers, else ``"drawing"``."""
+
+        return "encoding" if self.draw_stall_seconds > self.encode_stall_seconds else "drawing"
+
+    def describe(self) -> str:
+        return (
+            f"{self.frames} frames ({self.unique_frames} drawn), draw {self.draw_seconds:.2f}s "
+            f"(stalled {self.draw_stall_seconds:.2f}s), encode {self.encode_seconds:.2f}s "
+            f"(stalled {self.encode_stall_seconds:.2f}s), queue depth "
+            f"mean {self.mean_queue_depth:.1f} / max {self.max_queue_depth}; bound by {self.bound_by}"
+        )
+
+
+def write_run(writer: Any, image: np.ndarray, repeat: int) -> None:
+    """Append ``image`` to ``writer`` ``repeat`` times.
+
+    Writers with an ``append_run`` method receive the whole run in one call,
+    which lets them process a repeated image once.
+    """
+
+    append_run = getattr(writer, "append_run", None)
+    if append_run is not None:
+        append_run(image, repeat)
+        return
+    for _ in range(repeat):
+        writer.append_data(image)
+
+
+class FrameBufferPool:
+    """Fixed ring of preallocated frame buffers shared by the pipeline stages."""
+
+    def __init__(self, shape: Tuple[int, ...], count: int) -> None:
+        self.buffers: List[np.ndarray] = [np.empty(shape, dtype=np.uint8) for _ in range(count)]
+        self._free: "queue.Queue[np.ndarray]" = queue.Queue()
+        for buffer in self.buffers:
+            self._free.put(buffer)
+
+    def acquire(self, timeout: float) -> np.ndarray:
+        return self._free.get(timeout=timeout)
+
+    def release(self, buffer: np.ndarray) -> None:
+        self._free.put(buffer)
+
+
+def encode_pipelined(
+    runs: Iterable[Tuple[np.ndarray, int]], writer: Any, depth: int = DEFAULT_PIPELINE_DEPTH
+) -> PipelineStats:
+    """Append ``(image, repeat)`` runs to ``writer`` from a dedicated encoder thread.
+
+    The calling thread keeps drawing while the encoder thread writes. Frames are
+    copied into one of ``depth + 1`` reusable buffers and handed over through a
+    queue of at most ``depth`` frames, so no array is allocated per frame and
+    drawing can run at most ``depth`` frames ahead of the encoder. Frames keep
+    their channel layout: ffmpeg converts RGBA input noticeably faster than RGB.
+    A repeated image occupies a single buffer that the encoder appends
+    ``repeat`` times.
+    """
+
+    depth = max(1, int(depth))
+    stats = PipelineStats()
+    ready: "queue.Queue[Optional[Tuple[np.ndarray, int]]]" = queue.Queue(maxsize=depth)
+    errors: List[BaseException] = []
+    pool: Optional[FrameBufferPool] = None
+
+    def encode() -> None:
+        try:
+            while True:
+                waited = time.perf_counter()
+                item = ready.get()
+                stats.encode_stall_seconds += time.perf_counter() - waited
+                if item is None:
+                    return
+                buffer, repeat = item
+                started = time.perf_counter()
+                write_run(writer, buffer, repeat)
+                stats.encode_seconds += time.perf_counter() - started
+                assert pool is not None
+                pool.release(buffer)
+        except BaseException as exc:  # pragma: no cover - surfaced in the producer
+            errors.append(exc)
+
+    encoder = threading.Thread(target=encode, name="travelmap-encoder", daemon=True)
+    iterator = iter(runs)
+    try:
+        while True:
+            started = time.perf_counter()
+            run = next(iterator, None)
+            if run is None:
+                break
+            image, repeat = run
+            stats.draw_seconds += time.perf_counter() - started
+
+            if pool is None:
+                pool = FrameBufferPool(image.shape, depth + 1)
+                encoder.start()
+            waited = time.perf_counter()
+            while True:
+                if errors:
+                    raise errors[0]
+                try:
+                    buffer = pool.acquire(timeout=_POLL_SECONDS)
+                    break
+                except queue.Empty:
+                    continue
+            stats.draw_stall_seconds += time.perf_counter() - waited
+
+            np.copyto(buffer, image)
+            depth_now = ready.qsize() + 1
+            stats.max_queue_depth = max(stats.max_queue_depth, depth_now)
+            stats.queue_depth_total += depth_now
+            stats.frames += repeat
+            stats.unique_frames += 1
+            ready.put((buffer, repeat))
+    finally:
+        # Let the encoder drain the queued frames and stop.
+        while encoder.is_alive():
+            try:
+                ready.put(None, timeout=_POLL_SECONDS)
+            except queue.Full:
+                continue
+            encoder.join()
+    if errors:
+        raise errors[0]
+    return stats
@@ -0,0 +1,294 @@
+"""Spatial index over a gazetteer of place labels.
+
+A gazetteer CSV is compiled once into a directory of ``.npy`` arrays stored as
+a struct of arrays: coordinates, priorities and a UTF-8 name blob. The rows
+are sorted into a fixed latitude/longitude grid, so the places of one grid
+row that fall in a viewport form a single contiguous slice. Later runs
+memory-map the arrays instead of parsing the CSV again, which makes opening
+an index independent of the size of the gazetteer.
+"""
+from __future__ import annotations
+
+import csv
+import functools
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .array_cache import cache_directory, load_arrays, save_arrays, source_fingerprint
+
+_BUNDLED_GAZETTEER = Path(__file__).resolve().parent / "data" / "capitals.csv"
+_FORMAT_VERSION = 1
+
+_NAME_COLUMNS = ("name", "capital", "city")
+_LATITUDE_COLUMNS = ("latitude", "lat")
+_LONGITUDE_COLUMNS = ("longitude", "lon", "lng")
+_PRIORITY_COLUMNS = ("priority", "population")
+
+
+class Place:
+    """A labelled location from a gazetteer."""
+
+    __slots__ = ("name", "latitude", "longitude", "priority")
+
+    def __init__(self, name: str, latitude: float, longitude: float, priority: float = 0.0) -> None:
+        self.name = name
+        self.latitude = latitude
+        self.longitude = longitude
+        self.priority = priority
+
+    def __repr__(self) -> str:
+        return f"Place({self.name!r}, {self.latitude}, {self.longitude}, priority={self.priority})"
+
+
+def _column(header: Sequence[str], candidates: Sequence[str], required: bool = True) -> Optional[int]:
+    lowered = [name.strip().lower() for name in header]
+    for candidate in candidates:
+        if candidate in lowered:
+            return lowered.index(candidate)
+    if required:
+        raise ValueError(f"Gazetteer is missing a column named one of: {', '.join(candidates)}.")
+    return None
+
+
+def _read_gazetteer(path: Path) -> Tuple[List[str], np.ndarray, np.ndarray, np.ndarray]:
+    names: List[str] = []
+    latitudes: List[float] = []
+    longitudes: List[float] = []
+    priorities: List[float] = []
+    with path.open("r", encoding="utf8", newline="") as handle:
+        reader = csv.reader(handle)
+        header = next(reader, None)
+        if header is None:
+            raise ValueError(f"Gazetteer {path} is empty.")
+        name_column = _column(header, _NAME_COLUMNS)
+        lat_column = _column(header, _LATITUDE_COLUMNS)
+        lon_column = _column(header, _LONGITUDE_COLUMNS)
+        priority_column = _column(header, _PRIORITY_COLUMNS, required=False)
+        for row in reader:
+            if not row:
+                continue
+            names.append(row[name_column])
+            latitudes.append(float(row[lat_column]))
+            longitudes.append(float(row[lon_column]))
+            value = row[priority_column] if priority_column is not None else ""
+            priorities.append(float(value) if value.strip() else 0.0)
+    return (
+        names,
+        np.array(latitudes, dtype=np.float64),
+        np.array(longitudes, dtype=np.float64),
+        np.array(priorities, dtype=np.float64),
+    )
+
+
+class PlaceIndex:
+    """Grid-bucketed, priority-ordered place table.
+
+    Attributes:
+        latitudes / longitudes: ``(N,)`` coordinates, sorted by grid cell.
+        priorities: ``(N,)`` label priority (higher wins), e.g. population.
+        rows: ``(N,)`` row of each place in the source gazetteer, used to break ties.
+        cell_starts: ``(cells + 1,)`` offsets of each grid cell's places.
+        fingerprint: identifies the source data, for caches derived from it.
+    """
+
+    def __init__(self, arrays: Dict[str, np.ndarray], cell_degrees: float, fingerprint: str) -> None:
+        self.latitudes = arrays["latitudes"]
+        self.longitudes = arrays["longitudes"]
+        self.priorities = arrays["priorities"]
+        self.rows = arrays["rows"]
+        self._name_offsets = arrays["name_offsets"]
+        self._names = arrays["names"]
+        self.cell_starts = arrays["cell_starts"]
+        self.cell_degrees = cell_degrees
+        self.fingerprint = fingerprint
+        self._columns = int(np.ceil(360.0 / cell_degrees))
+        self._grid_rows = int(np.ceil(180.0 / cell_degrees))
+
+    def __len__(self) -> int:
+        return len(self.latitudes)
+
+    # ------------------------------------------------------------------
+    # Construction
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def build(
+        cls,
+        names: Sequence[str],
+        latitudes: np.ndarray,
+        longitudes: np.ndarray,
+        priorities: np.ndarray,
+        cell_degrees: float = 1.0,
+        fingerprint: str = "",
+    ) -> "PlaceIndex":
+        """Build an in-memory index from parallel sequences."""
+
+        if cell_degrees <= 0:
+            raise ValueError("Place index cell size must be positive.")
+        columns = int(np.ceil(360.0 / cell_degrees))
+        grid_rows = int(np.ceil(180.0 / cell_degrees))
+        rows, cols = _grid_coordinates(latitudes, longitudes, cell_degrees, columns, grid_rows)
+        cells = rows * columns + cols
+        source_rows = np.arange(len(names))
+        order = np.lexsort((source_rows, -priorities, cells))
+        encoded = [names[index].encode("utf8") for index in order.tolist()]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(name) for name in encoded], out=offsets[1:])
+        arrays = {
+            "latitudes": latitudes[order],
+            "longitudes": longitudes[order],
+            "priorities": priorities[order],
+            "rows": source_rows[order].astype(np.int64),
+            "name_offsets": offsets,
+            "names": np.frombuffer(b"".join(encoded), dtype=np.uint8),
+            "cell_starts": np.searchsorted(
+                cells[order], np.arange(columns * grid_rows + 1), side="left"
+            ).astype(np.int64),
+        }
+        return cls(arrays, cell_degrees, fingerprint)
+
+    @classmethod
+    def open(
+        cls, source: Path, cache_dir: Optional[Path] = None, cell_degrees: float = 1.0
+    ) -> "PlaceIndex":
+        """Open the compiled index for the gazetteer CSV ``source``, compiling it if needed.
+
+        The compiled arrays are kept under ``cache_dir`` (default
+        :func:`~travelmap.array_cache.default_cache_dir`) and memory-mapped on
+        later calls. When the cache cannot be written the index is built in memory.
+        """
+
+        fingerprint = source_fingerprint(source, _FORMAT_VERSION, cell_degrees)
+        directory = cache_directory("places", fingerprint, cache_dir)
+        cached = load_arrays(directory)
+        if cached is not None:
+            return cls(cached[0], cell_degrees, fingerprint)
+
+        index = cls.build(*_read_gazetteer(Path(source)), cell_degrees=cell_degrees, fingerprint=fingerprint)
+        save_arrays(directory, index._arrays())
+        return index
+
+    def _arrays(self) -> Dict[str, np.ndarray]:
+        return {
+            "latitudes": self.latitudes,
+            "longitudes": self.longitudes,
+            "priorities": self.priorities,
+            "rows": self.rows,
+            "name_offsets": self._name_offsets,
+            "names": self._names,
+            "cell_starts": self.cell_starts,
+        }
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+
+    def name(self, index: int) -> str:
+        start, stop = self._name_offsets[index], self._name_offsets[index + 1]
+        return bytes(self._names[start:stop]).decode("utf8")
+
+    def place(self, index: int) -> Place:
+        return Place(
+            self.name(index),
+            float(self.latitudes[index]),
+            float(self.longitudes[index]),
+            float(self.priorities[index]),
+        )
+
+    def query(
+        self, lat_min: float, lat_max: float, lon_min: float, lon_max: float, limit: Optional[int] = None
+    ) -> np.ndarray:
+        """Return the indices of places inside the box, highest priority first.
+
+        With ``limit`` only the ``limit`` highest priority places are returned.
+        """
+
+        lat_min, lat_max = max(lat_min, -90.0), min(lat_max, 90.0)
+        lon_min, lon_max = max(lon_min, -180.0), min(lon_max, 180.0)
+        if lat_min > lat_max or lon_min > lon_max or not len(self):
+            return np.zeros(0, dtype=np.int64)
+        rows, cols = _grid_coordinates(
+            np.array([lat_min, lat_max]),
+            np.array([lon_min, lon_max]),
+            self.cell_degrees,
+            self._columns,
+            self._grid_rows,
+        )
+        first_row, last_row = rows.tolist()
+        first_column, last_column = cols.tolist()
+        # Within a grid row the cells of the viewport are adjacent, so their
+        # places form one contiguous slice.
+        row_starts = np.arange(first_row, last_row + 1) * self._columns
+        starts = self.cell_starts[row_starts + first_column]
+        stops = self.cell_starts[row_starts + last_column + 1]
+        candidates = np.concatenate(
+            [np.arange(start, stop) for start, stop in zip(starts.tolist(), stops.tolist())]
+        )
+        lats = self.latitudes[candidates]
+        lons = self.longitudes[candidates]
+        inside = (lats >= lat_min) & (lats <= lat_max) & (lons >= lon_min) & (lons <= lon_max)
+        candidates = candidates[inside]
+        priorities = self.priorities[candidates]
+        if limit is not None and len(candidates) > limit:
+            keep = np.argpartition(-priorities, limit - 1)[:limit]
+            candidates, priorities = candidates[keep], priorities[keep]
+        order = np.lexsort((self.rows[candidates], -priorities))
+        return candidates[order]
+
+    def places(self, indices: Sequence[int]) -> List[Place]:
+        return [self.place(index) for index in np.asarray(indices).tolist()]
+
+
+def _grid_coordinates(
+    latitudes: np.ndarray, longitudes: np.ndarray, cell_degrees: float, columns: int, grid_rows: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Return the grid row and column of each coordinate."""
+
+    rows = np.floor((latitudes + 90.0) / cell_degrees)
+    cols = np.floor((longitudes + 180.0) / cell_degrees)
+    return (
+        np.clip(rows, 0, grid_rows - 1).astype(np.int64),
+        np.clip(cols, 0, columns - 1).astype(np.int64),
+    )
+
+
+@functools.lru_cache(maxsize=8)
+def open_place_index(path: Optional[Path] = None) -> PlaceIndex:
+    """Return the index for the gazetteer at ``path`` (default: bundled capitals), once per process."""
+
+    return PlaceIndex.open(Path(path) if path else _BUNDLED_GAZETTEER)
+
+
+def declutter(boxes: np.ndarray, cell_size: float) -> List[int]:
+    """Greedily keep boxes that do not overlap a box kept before them.
+
+    ``boxes`` is an ``(N, 4)`` array of ``(x0, y0, x1, y1)`` pixel rectangles in
+    priority order. Kept boxes are registered in a spatial hash of
+    ``cell_size`` pixel buckets, so each candidate is only tested against the
+    kept boxes in the buckets it covers. Returns the indices of the kept boxes.
+    """
+
+    cell_size = max(float(cell_size), 1.0)
+    boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+    rectangles = boxes.tolist()
+    cells = np.floor(boxes / cell_size).astype(np.int64).tolist()
+    buckets: Dict[Tuple[int, int], List[int]] = {}
+    kept: List[int] = []
+    for index, ((x0, y0, x1, y1), (cx0, cy0, cx1, cy1)) in enumerate(zip(rectangles, cells)):
+        covered = [(cx, cy) for cx in range(cx0, cx1 + 1) for cy in range(cy0, cy1 + 1)]
+        collides = any(
+            x0 < rectangles[other][2]
+            and rectangles[other][0] < x1
+            and y0 < rectangles[other][3]
+            and rectangles[other][1] < y1
+            for cell in covered
+            for other in buckets.get(cell, ())
+        )
+        if collides:
+            continue
+        kept.append(index)
+        for cell in covered:
+            buckets.setdefault(cell, []).append(index)
+    return kept
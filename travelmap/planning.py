@@ -0,0 +1,159 @@
+"""Frame counts per leg and pause, planned with the standard library only.
+
+The timeline of a render and ``travelmap stats`` both take their frame counts
+from :func:`plan_frame_budget`, so the statistics always match the video while
+the command never imports NumPy.
+"""
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass
+from typing import List, Optional, Sequence
+
+from .config import AnimationConfig, Waypoint
+from .spherical import haversine_km
+
+# Every leg moves the vehicle for at least this many frames.
+_MIN_LEG_FRAMES = 2
+
+
+def leg_lengths_km(waypoints: Sequence[Waypoint]) -> List[float]:
+    """Return the length in km of each leg, measured along its path when it has one."""
+
+    lengths: List[float] = []
+    for start, end in zip(waypoints[:-1], waypoints[1:]):
+        points = [(start.latitude, start.longitude), *(end.path or []), (end.latitude, end.longitude)]
+        lengths.append(sum(haversine_km(a, b) for a, b in zip(points[:-1], points[1:])))
+    return lengths
+
+
+def allocate_frames(weights: Sequence[float], budget: int, minimum: int) -> List[int]:
+    """Split ``budget`` frames over legs in proportion to ``weights``, at least ``minimum`` each.
+
+    The remainder after the per-leg minimum is shared out with largest-remainder
+    rounding, so the counts add up to ``budget`` exactly whenever it allows the
+    minimum for every leg.
+    """
+
+    count = len(weights)
+    if not count:
+        return []
+    minimum = max(_MIN_LEG_FRAMES, min(minimum, budget // count))
+    spare = max(budget - minimum * count, 0)
+    total = float(sum(weights))
+    shares = [weight / total * spare for weight in weights] if total > 0 else [spare / count] * count
+    frames = [math.floor(share) for share in shares]
+    leftover = spare - sum(frames)
+    if leftover > 0:
+        # Sorting is stable, so ties go to the earlier leg.
+        for index in sorted(range(count), key=lambda index: frames[index] - shares[index])[:leftover]:
+            frames[index] += 1
+    return [value + minimum for value in frames]
+
+
+def warp_segment_frames(
+    config: AnimationConfig,
+    segment_frames: Sequence[int],
+    segment_distances: Sequence[float],
+    fixed_frames: int,
+) -> List[int]:
+    """Apply the configured target duration or frame budget to the motion frames per leg.
+
+    ``fixed_frames`` counts the pause and summary frames, which are not warped.
+    A ``target_duration`` stretches or compresses the motion to fill the video;
+    ``max_frames`` only compresses it when the trip would otherwise be longer.
+    A budget too small for the fixed frames plus two frames per leg is an error
+    rather than a video that silently overruns it.
+    """
+
+    fps = config.frame_rate
+    budget: Optional[int] = None
+    if config.target_duration is not None:
+        budget = int(round(config.target_duration * fps))
+    if config.max_frames is not None:
+        natural = fixed_frames + sum(segment_frames)
+        if budget is not None or natural > config.max_frames:
+            budget = min(budget if budget is not None else natural, config.max_frames)
+    if budget is None:
+        return list(segment_frames)
+
+    motion_budget = budget - fixed_frames
+    if motion_budget < _MIN_LEG_FRAMES * len(segment_frames):
+        needed = fixed_frames + _MIN_LEG_FRAMES * len(segment_frames)
+        raise ValueError(
+            f"The video budget of {budget} frames ({budget / fps:.2f}s) is too short: the pauses and summary "
+            f"take {fixed_frames} frames ({fixed_frames / fps:.2f}s) and each of the {len(segment_frames)} legs "
+            f"needs {_MIN_LEG_FRAMES}, so at least {needed} frames ({needed / fps:.2f}s) are required. "
+            "Raise target_duration or max_frames, or shorten the pauses."
+        )
+    if config.time_warp == "log":
+        # Long legs are compressed more than short ones.
+        weights = [math.log1p(distance) for distance in segment_distances]
+    else:
+        weights = [float(distance) for distance in segment_distances]
+    minimum = int(round(max(config.min_leg_seconds, 0.0) * fps))
+    return allocate_frames(weights, motion_budget, minimum)
+
+
+@dataclass
+class FrameBudget:
+    """Frame counts of every part of the video.
+
+    Attributes:
+        leg_km: length of each leg along its path.
+        start_pause_frames: frames held at the first waypoint.
+        segment_frames: motion frames per leg, after any time warp.
+        stop_pause_frames: frames held at the waypoint ending each leg.
+        end_pause_frames / summary_frames: frames held after arriving.
+    """
+
+    leg_km: List[float]
+    start_pause_frames: int
+    segment_frames: List[int]
+    stop_pause_frames: List[int]
+    end_pause_frames: int
+    summary_frames: int
+
+    @property
+    def body_frames(self) -> int:
+        """Frames up to and including the last stop pause."""
+
+        return self.start_pause_frames + sum(self.segment_frames) + sum(self.stop_pause_frames)
+
+    @property
+    def frame_count(self) -> int:
+        body = self.body_frames
+        return body + (self.end_pause_frames + self.summary_frames if body else 0)
+
+
+def plan_frame_budget(config: AnimationConfig, waypoints: Sequence[Waypoint]) -> FrameBudget:
+    """Work out how many frames each leg and pause gets.
+
+    With a ``target_duration`` or ``max_frames`` budget the frames of each leg
+    are redistributed by :func:`allocate_frames`, so very slow or very long
+    trips stay within the budget.
+    """
+
+    fps = config.frame_rate
+    start_pause_frames = int(round(config.pause_at_start * fps))
+    leg_km = leg_lengths_km(waypoints)
+    # Convert travel time to seconds using the configured speed.
+    speed = max(config.speed_kmh, 1e-6)
+    segment_frames = [max(_MIN_LEG_FRAMES, math.ceil(3600.0 * distance / speed * fps)) for distance in leg_km]
+    stop_pause_frames = [int(round(wp.pause_seconds * fps)) for wp in waypoints[1:]]
+    end_pause_frames = int(round(config.pause_at_end * fps))
+    summary_frames = int(round(max(config.summary_display_seconds, 0.0) * fps))
+    segment_frames = warp_segment_frames(
+        config,
+        segment_frames,
+        leg_km,
+        start_pause_frames + sum(stop_pause_frames) + end_pause_frames + summary_frames,
+    )
+    return FrameBudget(
+        leg_km,
+        start_pause_frames,
+        segment_frames,
+        stop_pause_frames,
+        end_pause_frames,
+        summary_frames,
+    )
@@ -0,0 +1,122 @@
+"""Draft previews: reduced resolution, strided frames, partial ranges and fast encoding."""
+from __future__ import annotations
+
+import dataclasses
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional, Tuple
+
+import numpy as np
+
+from .config import AnimationConfig
+from .timeline import Timeline
+
+# x264 settings that trade compression efficiency for encoding speed.
+PREVIEW_ENCODER_SETTINGS = {"quality": 5, "ffmpeg_params": ["-preset", "ultrafast", "-tune", "zerolatency"]}
+
+
+@dataclass
+class PreviewOptions:
+    """How to cut a full render down to a quick draft.
+
+    Attributes:
+        scale: fraction of the configured ``width`` and ``height`` to render at.
+        stride: keep every ``stride``-th frame; the output frame rate is divided
+            by the same factor so the preview plays in real time.
+        frames: ``[start, stop)`` frame range of the full timeline.
+        seconds: ``[start, stop)`` time range in seconds of the full timeline.
+        legs: inclusive ``(first, last)`` range of 0-based legs to render.
+        fast_encoder: use :data:`PREVIEW_ENCODER_SETTINGS` instead of the
+            final-quality encoder settings.
+        output_path: where to write the preview; defaults to the configured
+            output path with ``.preview`` before the suffix.
+    """
+
+    scale: float = 0.5
+    stride: int = 1
+    frames: Optional[Tuple[Optional[int], Optional[int]]] = None
+    seconds: Optional[Tuple[Optional[float], Optional[float]]] = None
+    legs: Optional[Tuple[int, int]] = None
+    fast_encoder: bool = True
+    output_path: Optional[Path] = None
+
+    def __post_init__(self) -> None:
+        if not 0.0 < self.scale <= 1.0:
+            raise ValueError("Preview scale must be in (0, 1].")
+        if self.stride < 1:
+            raise ValueError("Preview stride must be at least 1.")
+        for name, bounds, inclusive in (
+            ("frames", self.frames, False),
+            ("seconds", self.seconds, False),
+            ("legs", self.legs, True),
+        ):
+            if bounds is None:
+                continue
+            first, last = bounds
+            if first is not None and first < 0:
+                raise ValueError(f"Preview {name} range must not start before 0.")
+            if first is not None and last is not None and (last < first if inclusive else last <= first):
+                raise ValueError(f"Preview {name} range {first}:{last} is empty or reversed.")
+
+
+class EmptyPreviewError(ValueError):
+    """Raised when the ranges of a preview select no frame of the timeline."""
+
+
+def _even(value: float) -> int:
+    # Encoders subsample chroma 2x2, so keep both dimensions even.
+    return max(2, int(round(value / 2.0)) * 2)
+
+
+def preview_config(config: AnimationConfig, options: PreviewOptions) -> AnimationConfig:
+    """Return ``config`` resized and redirected for a preview render."""
+
+    output_path = options.output_path
+    if output_path is None:
+        output = Path(config.output_path)
+        output_path = output.with_name(f"{output.stem}.preview{output.suffix}")
+    width, height = config.width, config.height
+    if options.scale != 1.0:
+        width, height = _even(width * options.scale), _even(height * options.scale)
+    return dataclasses.replace(config, width=width, height=height, output_path=Path(output_path))
+
+
+def frame_range(timeline: Timeline, options: PreviewOptions, frame_rate: int) -> Tuple[int, int]:
+    """Return the ``[start, stop)`` frames selected by the intersection of all ranges."""
+
+    start, stop = 0, len(timeline)
+    if options.frames is not None:
+        first, last = options.frames
+        start, stop = max(start, first or 0), min(stop, len(timeline) if last is None else last)
+    if options.seconds is not None:
+        first, last = options.seconds
+        start = max(start, int(round((first or 0.0) * frame_rate)))
+        if last is not None:
+            stop = min(stop, int(round(last * frame_rate)))
+    if options.legs is not None:
+        # Frames are ordered by leg, so a leg range is one contiguous block.
+        first_leg, last_leg = options.legs
+        start = max(start, int(np.searchsorted(timeline.legs, first_leg, side="left")))
+        stop = min(stop, int(np.searchsorted(timeline.legs, last_leg, side="right")))
+    return start, max(start, stop)
+
+
+def select_runs(timeline: Timeline, options: PreviewOptions, frame_rate: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Return ``(starts, lengths)`` runs covering the frames a preview keeps.
+
+    Kept frames that belong to the same run of identical frames are merged, so
+    pauses are still drawn once.
+    """
+
+    start, stop = frame_range(timeline, options, frame_rate)
+    kept = np.arange(start, stop, options.stride)
+    if not len(kept):
+        legs = int(timeline.legs.max()) + 1 if len(timeline) else 0
+        raise EmptyPreviewError(
+            f"The preview range does not contain any frames: the video has {len(timeline)} frames "
+            f"({len(timeline) / frame_rate:.2f}s) over {legs} legs."
+        )
+    run_starts, _ = timeline.runs(start, stop)
+    run_ids = np.searchsorted(run_starts, kept, side="right")
+    first = np.flatnonzero(np.concatenate(([True], run_ids[1:] != run_ids[:-1])))
+    return kept[first], np.diff(np.append(first, len(kept)))
@@ -0,0 +1,187 @@
+"""Per-stage timing and memory instrumentation for renders.
+
+A :class:`Profiler` handed to an animator records the wall time of each
+pipeline stage (timeline construction, canvas setup, artist updates,
+rasterisation, pixel readback, sprite rotation, encoding, ...) every time it
+runs, together with peak memory, and summarises them as a JSON-serialisable
+report with per-stage percentiles and overall frames per second.
+
+Stages nest: ``render_frame`` includes the engine stages that run inside it.
+Stages that run in worker processes (``workers > 1``) are not recorded; the
+time spent waiting for their frames is reported as ``collect`` instead.
+"""
+from __future__ import annotations
+
+import contextlib
+import json
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+import numpy as np
+
+REPORT_VERSION = 1
+_PERCENTILES = (50, 90, 99)
+
+
+def _peak_rss_bytes(children: bool = False) -> Optional[int]:
+    """Peak resident set size of this process (or its finished children), if known."""
+
+    try:
+        import resource
+    except ImportError:  # pragma: no cover - not available on Windows
+        return None
+    who = resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF
+    peak = resource.getrusage(who).ru_maxrss
+    # Linux reports kilobytes, macOS bytes.
+    return int(peak if sys.platform == "darwin" else peak * 1024)
+
+
+class Profiler:
+    """Collects stage timings and memory peaks for one render.
+
+    With ``trace_memory`` the Python heap is traced with :mod:`tracemalloc`
+    between :meth:`start` and :meth:`stop`, which reports the peak of
+    Python-managed allocations (including NumPy buffers) at the price of slower
+    allocation. The peak RSS is always reported where the platform provides it.
+    """
+
+    def __init__(self, trace_memory: bool = False) -> None:
+        self.trace_memory = trace_memory
+        self.frames = 0
+        self.unique_frames = 0
+        self._timings: Dict[str, List[float]] = {}
+        self._started: Optional[float] = None
+        self._stopped: Optional[float] = None
+        self._traced_peak: Optional[int] = None
+        self._owns_tracing = False
+
+    def start(self) -> "Profiler":
+        self._started = time.perf_counter()
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._owns_tracing = True
+        return self
+
+    def stop(self) -> None:
+        self._stopped = time.perf_counter()
+        if tracemalloc.is_tracing() and self.trace_memory:
+            self._traced_peak = tracemalloc.get_traced_memory()[1]
+            if self._owns_tracing:
+                tracemalloc.stop()
+                self._owns_tracing = False
+
+    def __enter__(self) -> "Profiler":
+        return self.start()
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.stop()
+
+    # ------------------------------------------------------------------
+    # Recording
+    # ------------------------------------------------------------------
+
+    def add(self, stage: str, seconds: float) -> None:
+        self._timings.setdefault(stage, []).append(seconds)
+
+    @contextlib.contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Time the enclosed block as one occurrence of stage ``name``."""
+
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - started)
+
+    def count_run(self, repeat: int) -> None:
+        """Count one drawn frame that is shown ``repeat`` times."""
+
+        self.unique_frames += 1
+        self.frames += repeat
+
+    def wrap_writer(self, writer: Any) -> "ProfiledWriter":
+        return ProfiledWriter(writer, self)
+
+    # ------------------------------------------------------------------
+    # Reporting
+    # ------------------------------------------------------------------
+
+    @property
+    def wall_seconds(self) -> float:
+        if self._started is None:
+            return 0.0
+        return (self._stopped or time.perf_counter()) - self._started
+
+    def report(self, **metadata: Any) -> Dict[str, Any]:
+        """Return the summary as a JSON-serialisable dict; ``metadata`` is included as-is."""
+
+        stages: Dict[str, Dict[str, float]] = {}
+        for name, samples in self._timings.items():
+            values = np.asarray(samples) * 1000.0
+            summary = {
+                "count": len(samples),
+                "total_seconds": round(float(values.sum()) / 1000.0, 6),
+                "mean_ms": round(float(values.mean()), 4),
+                "max_ms": round(float(values.max()), 4),
+            }
+            for percentile, value in zip(_PERCENTILES, np.percentile(values, _PERCENTILES)):
+                summary[f"p{percentile}_ms"] = round(float(value), 4)
+            stages[name] = summary
+        wall = self.wall_seconds
+        return {
+            "version": REPORT_VERSION,
+            **metadata,
+            "frames": self.frames,
+            "unique_frames": self.unique_frames,
+            "wall_seconds": round(wall, 6),
+            "frames_per_second": round(self.frames / wall, 3) if wall > 0 else 0.0,
+            "stages": stages,
+            "memory": {
+                "peak_rss_bytes": _peak_rss_bytes(),
+                "peak_rss_children_bytes": _peak_rss_bytes(children=True),
+                "peak_traced_bytes": self._traced_peak,
+            },
+        }
+
+    def write_report(self, path: Path, **metadata: Any) -> Dict[str, Any]:
+        report = self.report(**metadata)
+        Path(path).write_text(json.dumps(report, indent=2) + "\n", encoding="utf8")
+        return report
+
+    def describe(self) -> str:
+        """One line per stage, slowest total first, for console output."""
+
+        lines = [f"{self.frames} frames ({self.unique_frames} drawn) in {self.wall_seconds:.2f}s"]
+        for name, summary in sorted(
+            self.report()["stages"].items(), key=lambda item: -item[1]["total_seconds"]
+        ):
+            lines.append(
+                f"  {name:<16} {summary['count']:>7}x  total {summary['total_seconds']:8.3f}s  "
+                f"p50 {summary['p50_ms']:8.3f}ms  p99 {summary['p99_ms']:8.3f}ms"
+            )
+        return "\n".join(lines)
+
+
+class ProfiledWriter:
+    """Frame writer proxy that times every ``append_data`` as the ``encode`` stage."""
+
+    def __init__(self, writer: Any, profiler: Profiler) -> None:
+        self._writer = writer
+        self._profiler = profiler
+
+    def append_data(self, image: np.ndarray) -> None:
+        with self._profiler.stage("encode"):
+            self._writer.append_data(image)
+
+    def close(self) -> None:
+        with self._profiler.stage("encoder_close"):
+            self._writer.close()
+
+    def __enter__(self) -> "ProfiledWriter":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
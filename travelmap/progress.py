@@ -0,0 +1,93 @@
+"""Progress reporting and cooperative cancellation for renders."""
+from __future__ import annotations
+
+import time
+from dataclasses import asdict, dataclass
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+import numpy as np
+
+# Minimum seconds between two progress callbacks, except for the final one.
+DEFAULT_PROGRESS_INTERVAL = 0.25
+
+
+class RenderCancelled(Exception):
+    """Raised by a progress callback to stop a render; the partial output is removed."""
+
+
+@dataclass
+class RenderProgress:
+    """Snapshot of a running render.
+
+    ``frames_done`` counts frames handed to the encoder, including repeats of
+    a frame that is drawn once. ``frame_count`` is the number of frames this
+    render produces, which for preview renders is less than the timeline
+    length. ``frames_reused`` of the done frames came from cached segments or
+    an earlier, interrupted run and were not drawn again; they do not count
+    towards the frame rate.
+    """
+
+    frames_done: int
+    frame_count: int
+    elapsed_seconds: float
+    frames_reused: int = 0
+
+    @property
+    def fraction(self) -> float:
+        return self.frames_done / self.frame_count if self.frame_count else 1.0
+
+    @property
+    def frames_per_second(self) -> float:
+        drawn = self.frames_done - self.frames_reused
+        return drawn / self.elapsed_seconds if self.elapsed_seconds > 0 else 0.0
+
+    @property
+    def eta_seconds(self) -> Optional[float]:
+        """Remaining seconds at the average rate so far, or ``None`` before the first frame."""
+
+        rate = self.frames_per_second
+        if rate <= 0:
+            return None
+        return max(self.frame_count - self.frames_done, 0) / rate
+
+    def to_dict(self) -> Dict[str, Any]:
+        eta = self.eta_seconds
+        return dict(
+            asdict(self),
+            elapsed_seconds=round(self.elapsed_seconds, 3),
+            fraction=round(self.fraction, 4),
+            frames_per_second=round(self.frames_per_second, 3),
+            eta_seconds=round(eta, 2) if eta is not None else None,
+        )
+
+
+ProgressCallback = Callable[[RenderProgress], None]
+
+
+def track_progress(
+    runs: Iterator[Tuple[np.ndarray, int]],
+    callback: ProgressCallback,
+    frame_count: int,
+    interval: float = DEFAULT_PROGRESS_INTERVAL,
+    frames_reused: int = 0,
+) -> Iterator[Tuple[np.ndarray, int]]:
+    """Pass ``(image, repeat)`` runs through, reporting progress to ``callback``.
+
+    The callback runs at most every ``interval`` seconds, once before the first
+    frame and once after the last, on the drawing thread. It may raise
+    :class:`RenderCancelled` to stop the render. ``frames_reused`` frames of
+    ``frame_count`` are already done before the first run.
+    """
+
+    started = time.perf_counter()
+    done = frames_reused
+    callback(RenderProgress(done, frame_count, 0.0, frames_reused))
+    reported = time.perf_counter()
+    for image, repeat in runs:
+        yield image, repeat
+        done += repeat
+        now = time.perf_counter()
+        if now - reported >= interval:
+            callback(RenderProgress(done, frame_count, now - started, frames_reused))
+            reported = now
+    callback(RenderProgress(done, frame_count, time.perf_counter() - started, frames_reused))
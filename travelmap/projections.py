@@ -0,0 +1,370 @@
+"""Map projections applied to whole coordinate arrays at once.
+
+Every projection maps ``(lat, lon)`` rows to ``(x, y)`` rows with ``x``
+growing east and ``y`` north, scaled so that one unit is about one degree of
+arc at the equator (or at the centre of the azimuthal projection). Margins and
+spans given in degrees therefore keep their meaning on every map. The default
+equirectangular projection is the identity on ``(lon, lat)``.
+
+Routes, land polygons and labels are projected once per render; frames only
+slice the projected arrays.
+"""
+from __future__ import annotations
+
+import functools
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .config import AnimationConfig
+
+if TYPE_CHECKING:  # pragma: no cover - imported for type checking only
+    from .map_shapes import ShapeLayer
+
+_DEGREES = 180.0 / np.pi
+# Web Mercator stops at the latitude where the world map becomes square.
+MERCATOR_MAX_LATITUDE = 85.0511287798
+
+# Equal Earth polynomial coefficients (Šavrič, Patterson and Jenny, 2018).
+_EE_A1, _EE_A2, _EE_A3, _EE_A4 = 1.340264, -0.081106, 0.000893, 0.003796
+_EE_M = np.sqrt(3.0) / 2.0
+_EE_NEWTON_STEPS = 8
+
+# Robinson's table of parallel lengths and distances from the equator, every 5 degrees.
+_ROBINSON_LATITUDES = np.arange(0.0, 91.0, 5.0)
+_ROBINSON_X = np.array(
+    [
+        1.0000, 0.9986, 0.9954, 0.9900, 0.9822, 0.9730, 0.9600, 0.9427, 0.9216, 0.8962,
+        0.8679, 0.8350, 0.7986, 0.7597, 0.7186, 0.6732, 0.6213, 0.5722, 0.5322,
+    ]
+)
+_ROBINSON_Y = np.array(
+    [
+        0.0000, 0.0620, 0.1240, 0.1860, 0.2480, 0.3100, 0.3720, 0.4340, 0.4958, 0.5571,
+        0.6176, 0.6769, 0.7346, 0.7903, 0.8435, 0.8936, 0.9394, 0.9761, 1.0000,
+    ]
+)
+_ROBINSON_X_SCALE, _ROBINSON_Y_SCALE = 0.8487, 1.3523
+
+# Grid of viewport points unprojected to find the lat/lon box behind a view.
+_BOUNDS_SAMPLES = 33
+# Step in degrees used to turn compass bearings into on-screen headings.
+_BEARING_STEP = 0.01
+
+
+def wrap_longitude(lon: np.ndarray) -> np.ndarray:
+    """Wrap longitudes into ``[-180, 180)``."""
+
+    return (np.asarray(lon, dtype=np.float64) + 180.0) % 360.0 - 180.0
+
+
+@dataclass(frozen=True)
+class Projection:
+    """A map projection centred on ``center_lat``/``center_lon``.
+
+    The world projections (``mercator``, ``equal_earth``, ``robinson``) use the
+    centre's longitude as central meridian; ``azimuthal`` is the azimuthal
+    equidistant projection around the centre, which keeps polar routes
+    undistorted. Instances are hashable so projected geometry can be cached
+    per projection.
+    """
+
+    name: str = "equirectangular"
+    center_lat: float = 0.0
+    center_lon: float = 0.0
+
+    @property
+    def is_identity(self) -> bool:
+        return self.name == "equirectangular"
+
+    def map_longitudes(
+        self,
+        lon: np.ndarray,
+        starts: Optional[Sequence[int]] = None,
+        near: Optional[np.ndarray] = None,
+    ) -> np.ndarray:
+        """Return longitudes relative to the central meridian.
+
+        They lie in ``[-180, 180)`` unless ``starts`` or ``near`` is given. With
+        ``starts`` the rows are paths beginning at those indices, and steps of
+        more than 180 degrees inside a path are unwrapped so that a path crossing
+        the edge of the map stays in one piece. With ``near`` each longitude is
+        moved by whole turns to within 180 degrees of the matching map longitude
+        in ``near``. The identity projection returns the longitudes unchanged.
+        """
+
+        lon = np.asarray(lon, dtype=np.float64)
+        if self.is_identity:
+            return lon.copy()
+        lam = wrap_longitude(lon - self.center_lon)
+        if starts is not None and len(lam) > 1:
+            steps = np.diff(lam)
+            turns = steps - wrap_longitude(steps)
+            starts = np.asarray(starts, dtype=np.int64)
+            turns[starts[starts > 0] - 1] = 0.0
+            cumulative = np.concatenate(([0.0], np.cumsum(turns)))
+            first = np.zeros(len(lam), dtype=np.int64)
+            first[starts] = starts
+            lam = lam - (cumulative - cumulative[np.maximum.accumulate(first)])
+        if near is not None:
+            lam = lam + np.round((np.asarray(near, dtype=np.float64) - lam) / 360.0) * 360.0
+        return lam
+
+    def project(
+        self,
+        coordinates: np.ndarray,
+        starts: Optional[Sequence[int]] = None,
+        near: Optional[np.ndarray] = None,
+    ) -> np.ndarray:
+        """Project ``(N, 2)`` lat/lon rows to ``(N, 2)`` x/y rows.
+
+        ``starts`` and ``near`` control how longitudes wrap, see
+        :meth:`map_longitudes`.
+        """
+
+        points = np.asarray(coordinates, dtype=np.float64).reshape(-1, 2)
+        if self.is_identity:
+            return np.column_stack((points[:, 1], points[:, 0]))
+        lam = np.radians(self.map_longitudes(points[:, 1], starts, near))
+        phi = np.radians(points[:, 0])
+        x, y = getattr(self, f"_forward_{self.name}")(phi, lam)
+        return np.column_stack((x * _DEGREES, y * _DEGREES))
+
+    def unproject(self, points: np.ndarray) -> np.ndarray:
+        """Return the ``(N, 2)`` lat/lon rows of x/y ``points``, NaN outside the map."""
+
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        if self.is_identity:
+            return np.column_stack((points[:, 1], points[:, 0]))
+        with np.errstate(invalid="ignore", divide="ignore"):
+            phi, lam, valid = getattr(self, f"_inverse_{self.name}")(
+                points[:, 0] / _DEGREES, points[:, 1] / _DEGREES
+            )
+        lat = np.where(valid, np.degrees(phi), np.nan)
+        lon = np.where(valid, wrap_longitude(np.degrees(lam) + self.center_lon), np.nan)
+        return np.column_stack((lat, lon))
+
+    def project_rings(self, rings: Sequence[np.ndarray]) -> Tuple[np.ndarray, ...]:
+        """Project closed lat/lon rings in one pass, keeping each ring in one piece."""
+
+        if not rings:
+            return ()
+        lengths = np.array([len(ring) for ring in rings], dtype=np.int64)
+        starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+        projected = self.project(np.concatenate(rings), starts=starts)
+        projected.setflags(write=False)
+        return tuple(np.split(projected, starts[1:]))
+
+    def screen_bearings(
+        self, positions: np.ndarray, bearings: np.ndarray, near: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        """Turn compass ``bearings`` at ``positions`` into headings on the projected map.
+
+        The result is measured clockwise from the map's up direction, which is
+        what the vehicle sprite is rotated by. The identity projection returns
+        ``bearings`` itself.
+        """
+
+        if self.is_identity:
+            return bearings
+        positions = np.asarray(positions, dtype=np.float64).reshape(-1, 2)
+        lam = self.map_longitudes(positions[:, 1], near=near)
+        radians = np.radians(bearings)
+        lat = positions[:, 0]
+        ahead = np.column_stack(
+            (
+                np.clip(lat + _BEARING_STEP * np.cos(radians), -90.0, 90.0),
+                positions[:, 1] + _BEARING_STEP * np.sin(radians) / np.maximum(np.cos(np.radians(lat)), 1e-6),
+            )
+        )
+        step = self.project(ahead, near=lam) - self.project(positions, near=lam)
+        return np.degrees(np.arctan2(step[:, 0], step[:, 1])) % 360.0
+
+    def geographic_bounds(
+        self, x_min: float, x_max: float, y_min: float, y_max: float
+    ) -> Tuple[float, float, float, float]:
+        """Return a ``(lat_min, lat_max, lon_min, lon_max)`` box covering the projected view.
+
+        The box is used to query shapes and places before projecting them; it
+        may cover more than the view but never less.
+        """
+
+        x_min, x_max = min(x_min, x_max), max(x_min, x_max)
+        y_min, y_max = min(y_min, y_max), max(y_min, y_max)
+        if self.is_identity:
+            return y_min, y_max, x_min, x_max
+
+        xs = np.linspace(x_min, x_max, _BOUNDS_SAMPLES)
+        ys = np.linspace(y_min, y_max, _BOUNDS_SAMPLES)
+        grid = np.stack(np.meshgrid(xs, ys), axis=-1).reshape(-1, 2)
+        geo = self.unproject(grid)
+        geo = geo[np.isfinite(geo[:, 0])]
+        if not len(geo):
+            return -90.0, 90.0, -180.0, 180.0
+
+        # Pad by one sample cell so that nothing between the samples is missed.
+        pad = max(x_max - x_min, y_max - y_min) / (_BOUNDS_SAMPLES - 1)
+        lat_min = max(float(geo[:, 0].min()) - pad, -90.0)
+        lat_max = min(float(geo[:, 0].max()) + pad, 90.0)
+        poles = np.array([[90.0, self.center_lon], [-90.0, self.center_lon]])
+        points = self.project(poles)
+        inside = (points[:, 0] >= x_min) & (points[:, 0] <= x_max)
+        inside &= (points[:, 1] >= y_min) & (points[:, 1] <= y_max)
+        # Mercator cannot show the poles and the azimuthal projection squeezes
+        # the antipode of its centre into a circle; neither is really in view.
+        inside &= np.abs(self.unproject(points)[:, 0] - poles[:, 0]) < 1e-6
+        if inside[0]:
+            lat_max = 90.0
+        if inside[1]:
+            lat_min = -90.0
+
+        lam = self.map_longitudes(geo[:, 1])
+        lon_pad = pad / max(np.cos(np.radians(max(abs(lat_min), abs(lat_max)))), 1e-3)
+        lon_min = float(lam.min()) - lon_pad + self.center_lon
+        lon_max = float(lam.max()) + lon_pad + self.center_lon
+        if inside.any() or lon_min < -180.0 or lon_max > 180.0 or lon_max - lon_min >= 360.0:
+            lon_min, lon_max = -180.0, 180.0
+        return lat_min, lat_max, lon_min, lon_max
+
+    # ------------------------------------------------------------------
+    # Forward and inverse formulas, in radians
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _forward_mercator(phi: np.ndarray, lam: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        limit = np.radians(MERCATOR_MAX_LATITUDE)
+        return lam, np.log(np.tan(np.pi / 4.0 + np.clip(phi, -limit, limit) / 2.0))
+
+    @staticmethod
+    def _inverse_mercator(x: np.ndarray, y: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        limit = np.log(np.tan(np.pi / 4.0 + np.radians(MERCATOR_MAX_LATITUDE) / 2.0))
+        valid = (np.abs(x) <= np.pi) & (np.abs(y) <= limit)
+        return 2.0 * np.arctan(np.exp(y)) - np.pi / 2.0, x, valid
+
+    @staticmethod
+    def _equal_earth_terms(theta: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Return ``y(theta)`` and its derivative."""
+
+        t2 = theta * theta
+        t6 = t2 * t2 * t2
+        y = theta * (_EE_A1 + _EE_A2 * t2 + t6 * (_EE_A3 + _EE_A4 * t2))
+        slope = _EE_A1 + 3.0 * _EE_A2 * t2 + t6 * (7.0 * _EE_A3 + 9.0 * _EE_A4 * t2)
+        return y, slope
+
+    @classmethod
+    def _forward_equal_earth(cls, phi: np.ndarray, lam: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        theta = np.arcsin(_EE_M * np.sin(phi))
+        y, slope = cls._equal_earth_terms(theta)
+        return 2.0 * np.sqrt(3.0) * lam * np.cos(theta) / (3.0 * slope), y
+
+    @classmethod
+    def _inverse_equal_earth(cls, x: np.ndarray, y: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        theta = y / _EE_A1
+        for _ in range(_EE_NEWTON_STEPS):
+            value, slope = cls._equal_earth_terms(theta)
+            theta = theta - (value - y) / slope
+        _, slope = cls._equal_earth_terms(theta)
+        sine = np.sin(theta) / _EE_M
+        lam = 3.0 * x * slope / (2.0 * np.sqrt(3.0) * np.cos(theta))
+        valid = (np.abs(sine) <= 1.0) & (np.abs(lam) <= np.pi)
+        return np.arcsin(np.clip(sine, -1.0, 1.0)), lam, valid
+
+    @staticmethod
+    def _forward_robinson(phi: np.ndarray, lam: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        latitude = np.abs(np.degrees(phi))
+        length = np.interp(latitude, _ROBINSON_LATITUDES, _ROBINSON_X)
+        height = np.interp(latitude, _ROBINSON_LATITUDES, _ROBINSON_Y)
+        return _ROBINSON_X_SCALE * length * lam, _ROBINSON_Y_SCALE * height * np.sign(phi)
+
+    @staticmethod
+    def _inverse_robinson(x: np.ndarray, y: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        height = np.abs(y) / _ROBINSON_Y_SCALE
+        latitude = np.interp(height, _ROBINSON_Y, _ROBINSON_LATITUDES)
+        lam = x / (_ROBINSON_X_SCALE * np.interp(latitude, _ROBINSON_LATITUDES, _ROBINSON_X))
+        valid = (height <= 1.0) & (np.abs(lam) <= np.pi)
+        return np.radians(latitude) * np.sign(y), lam, valid
+
+    def _forward_azimuthal(self, phi: np.ndarray, lam: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        phi0 = np.radians(self.center_lat)
+        cos_c = np.sin(phi0) * np.sin(phi) + np.cos(phi0) * np.cos(phi) * np.cos(lam)
+        c = np.arccos(np.clip(cos_c, -1.0, 1.0))
+        # c / sin(c) grows without bound towards the antipode of the centre.
+        scale = np.where(c > 1e-12, c / np.maximum(np.sin(c), 1e-12), 1.0)
+        x = scale * np.cos(phi) * np.sin(lam)
+        y = scale * (np.cos(phi0) * np.sin(phi) - np.sin(phi0) * np.cos(phi) * np.cos(lam))
+        return x, y
+
+    def _inverse_azimuthal(self, x: np.ndarray, y: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        phi0 = np.radians(self.center_lat)
+        rho = np.hypot(x, y)
+        sin_c, cos_c = np.sin(rho), np.cos(rho)
+        ratio = np.where(rho > 0.0, y * sin_c / np.where(rho > 0.0, rho, 1.0), 0.0)
+        phi = np.arcsin(np.clip(cos_c * np.sin(phi0) + ratio * np.cos(phi0), -1.0, 1.0))
+        lam = np.arctan2(x * sin_c, rho * np.cos(phi0) * cos_c - y * np.sin(phi0) * sin_c)
+        return phi, lam, rho <= np.pi
+
+
+def _central_meridian(vertices: np.ndarray) -> float:
+    """Return the meridian opposite the widest range of longitudes the route never crosses.
+
+    The edge of a world map then falls where it cuts neither the route nor
+    the land around it. Longitudes are binned by whole degrees.
+    """
+
+    lon = wrap_longitude(vertices[:, 1])
+    steps = wrap_longitude(np.diff(lon))
+    west = np.concatenate((lon, lon[:-1] + np.minimum(steps, 0.0))) + 180.0
+    east = np.concatenate((lon, lon[:-1] + np.maximum(steps, 0.0))) + 180.0
+    # Spans may run past 360 degrees; count them on a doubled circle and fold.
+    counts = np.zeros(722, dtype=np.int64)
+    np.add.at(counts, np.floor(west).astype(np.int64) % 360, 1)
+    np.add.at(counts, np.floor(east).astype(np.int64) % 360 + (east // 360 != west // 360) * 360 + 1, -1)
+    covered = np.cumsum(counts)[:720] > 0
+    covered = covered[:360] | covered[360:]
+    if covered.all():
+        return 0.0
+    # Rotate a covered bin to the front so no uncovered run wraps around.
+    shift = int(np.argmax(covered))
+    rolled = np.roll(covered, -shift).astype(np.int8)
+    edges = np.diff(np.concatenate((rolled, [1])))
+    starts, stops = np.flatnonzero(edges == -1) + 1, np.flatnonzero(edges == 1) + 1
+    widest = int(np.argmax(stops - starts))
+    edge = (starts[widest] + stops[widest]) / 2.0 + shift - 180.0
+    return float(wrap_longitude(edge + 180.0))
+
+
+def projection_for(config: AnimationConfig, vertices: np.ndarray) -> Projection:
+    """Return the projection of ``config``, centred on the route unless a centre is configured."""
+
+    if config.projection == "equirectangular":
+        return Projection()
+    if config.projection_center is not None:
+        lat, lon = config.projection_center
+        return Projection(config.projection, float(lat), float(lon))
+    if config.projection != "azimuthal":
+        return Projection(config.projection, 0.0, _central_meridian(vertices))
+    # Spherical mean of the route, so a route around a pole centres on the pole.
+    phi, lam = np.radians(vertices[:, 0]), np.radians(vertices[:, 1])
+    mean = np.array(
+        [(np.cos(phi) * np.cos(lam)).mean(), (np.cos(phi) * np.sin(lam)).mean(), np.sin(phi).mean()]
+    )
+    lat = float(np.degrees(np.arctan2(mean[2], np.hypot(mean[0], mean[1]))))
+    lon = float(np.degrees(np.arctan2(mean[1], mean[0]))) if np.hypot(mean[0], mean[1]) > 1e-9 else 0.0
+    return Projection(config.projection, lat, lon)
+
+
+@functools.lru_cache(maxsize=16)
+def visible_projected_rings(
+    layer: "ShapeLayer",
+    projection: Projection,
+    bounds: Tuple[float, float, float, float],
+    pixels_per_degree: float,
+) -> Tuple[np.ndarray, ...]:
+    """Return ``layer``'s rings inside the lat/lon ``bounds``, projected, as read-only x/y arrays.
+
+    Results are cached, so renders of the same map region (previews, batch
+    jobs, service requests) project the land polygons only once.
+    """
+
+    return projection.project_rings(layer.visible_rings(*bounds, pixels_per_degree))
@@ -0,0 +1,384 @@
+"""Matplotlib-free rendering engine that rasterises frames with Pillow and NumPy.
+
+The raster engine reproduces the style of
+:class:`~travelmap.renderer.TravelMapAnimator` on the same projected map
+without matplotlib's artist machinery. The static backdrop is drawn once and
+each frame only copies it and paints the route lines, vehicle sprite and
+summary box on top.
+"""
+from __future__ import annotations
+
+import functools
+import importlib.util
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import numpy as np
+from PIL import Image, ImageColor, ImageDraw, ImageFont
+
+from .animator import BaseAnimator
+from .fleet import FleetMixin, blend_mask, stroke_mask
+from .icons import sprite_atlas_for
+from .tiles import TilePyramid
+
+Coordinate = Tuple[float, float]
+PixelBox = Tuple[int, int, int, int]
+
+# Sizes are specified in points and converted with the same DPI as the
+# matplotlib engine so that both engines lay frames out identically.
+_DPI = 100.0
+_LAYOUT_PAD_POINTS = 1.08 * 10.0
+_TITLE_PAD_POINTS = 16.0
+_DASH_PATTERN = (3.7, 1.6)
+
+
+def _points_to_px(points: float) -> float:
+    return points * _DPI / 72.0
+
+
+def _rgba(colour: str, alpha: float = 1.0) -> Tuple[int, int, int, int]:
+    red, green, blue = ImageColor.getrgb(colour)[:3]
+    return red, green, blue, int(round(alpha * 255))
+
+
+def _font_path(bold: bool) -> str:
+    """Locate matplotlib's bundled DejaVu Sans without importing matplotlib."""
+
+    name = "DejaVuSans-Bold.ttf" if bold else "DejaVuSans.ttf"
+    spec = importlib.util.find_spec("matplotlib")
+    if spec is not None and spec.submodule_search_locations:
+        for location in spec.submodule_search_locations:
+            candidate = Path(location) / "mpl-data" / "fonts" / "ttf" / name
+            if candidate.exists():
+                return str(candidate)
+    return name
+
+
+@functools.lru_cache(maxsize=None)
+def load_font(size_points: float, bold: bool = False) -> ImageFont.ImageFont:
+    """Return a Pillow font matching the matplotlib engine's text at ``size_points``."""
+
+    size_px = max(1, int(round(_points_to_px(size_points))))
+    try:
+        return ImageFont.truetype(_font_path(bold), size_px)
+    except OSError:  # pragma: no cover - depends on installed fonts
+        try:
+            return ImageFont.load_default(size=size_px)
+        except TypeError:
+            return ImageFont.load_default()
+
+
+def dash_polyline(points: np.ndarray, on: float, off: float) -> List[List[Coordinate]]:
+    """Split a pixel-space polyline into dash polylines of length ``on`` separated by ``off``."""
+
+    if len(points) < 2:
+        return []
+    lengths = np.hypot(*np.diff(points, axis=0).T)
+    cumulative = np.concatenate(([0.0], np.cumsum(lengths)))
+    total = cumulative[-1]
+    if total <= 0.0:
+        return []
+
+    starts = np.arange(0.0, total, on + off)
+    ends = np.minimum(starts + on, total)
+    start_x = np.interp(starts, cumulative, points[:, 0])
+    start_y = np.interp(starts, cumulative, points[:, 1])
+    end_x = np.interp(ends, cumulative, points[:, 0])
+    end_y = np.interp(ends, cumulative, points[:, 1])
+    first_inner = np.searchsorted(cumulative, starts, side="right")
+    last_inner = np.searchsorted(cumulative, ends, side="left")
+
+    dashes: List[List[Coordinate]] = []
+    for index in range(len(starts)):
+        dash = [(start_x[index], start_y[index])]
+        dash.extend(map(tuple, points[first_inner[index] : last_inner[index]]))
+        dash.append((end_x[index], end_y[index]))
+        dashes.append(dash)
+    return dashes
+
+
+def _text_box(text: str, size_points: float) -> Tuple[Image.Image, float]:
+    """Render ``text`` in a translucent rounded box and return it with the box padding in pixels."""
+
+    font = load_font(size_points)
+    pad = _points_to_px(0.5 * size_points)
+    spacing = int(round(_points_to_px(size_points) * 0.2))
+    measure = ImageDraw.Draw(Image.new("RGBA", (1, 1)))
+    left, top, right, bottom = measure.multiline_textbbox((0, 0), text, font=font, spacing=spacing)
+    box_width = int(round(right - left + 2 * pad))
+    box_height = int(round(bottom - top + 2 * pad))
+    overlay = Image.new("RGBA", (box_width + 1, box_height + 1), (0, 0, 0, 0))
+    draw = ImageDraw.Draw(overlay)
+    draw.rounded_rectangle((0, 0, box_width, box_height), radius=int(round(pad)), fill=_rgba("#000000", 0.7))
+    draw.multiline_text((pad - left, pad - top), text, font=font, fill=_rgba("#ffffff"), spacing=spacing)
+    return overlay, pad
+
+
+def shared_image(buffer: np.ndarray) -> Image.Image:
+    """Wrap a contiguous ``(height, width, 4)`` uint8 array in an RGBA image sharing its memory."""
+
+    height, width = buffer.shape[:2]
+    image = Image.frombuffer("RGBA", (width, height), buffer, "raw", "RGBA", 0, 1)
+    # ``frombuffer`` marks shared images read-only, which would make the first
+    # drawing call copy the pixels instead of writing into ``buffer``.
+    image.readonly = 0
+    return image
+
+
+class RasterTravelMapAnimator(BaseAnimator):
+    """Create an animated travel map by rasterising frames directly with Pillow."""
+
+    # ------------------------------------------------------------------
+    # Rendering helpers
+    # ------------------------------------------------------------------
+
+    def _setup_canvas(self) -> None:
+        width, height = self.config.width, self.config.height
+
+        pad = _points_to_px(_LAYOUT_PAD_POINTS)
+        top = pad
+        title_font = load_font(16)
+        if self.config.title:
+            ascent, _ = title_font.getmetrics()
+            top += _points_to_px(_TITLE_PAD_POINTS) + ascent
+        self._axes_box: PixelBox = (
+            int(round(pad)),
+            int(round(top)),
+            int(round(width - pad)),
+            int(round(height - pad)),
+        )
+        x0, y0, x1, y1 = self._axes_box
+        self._compute_limits()
+
+        background = Image.new("RGB", (width, height), "#06142a")
+        axes = Image.new("RGB", (x1 - x0, y1 - y0), "#0a1f3f")
+        axes_draw = ImageDraw.Draw(axes, "RGBA")
+
+        # Draw simplified land masses. A following camera draws them per frame
+        # from the tile pyramid instead, together with the waypoint labels.
+        outline_width = max(1, int(round(_points_to_px(1.0))))
+        self._tiles: Optional[TilePyramid] = None
+        if self.config.camera == "follow":
+            self._tiles = TilePyramid(
+                self._shape_layer,
+                ocean=_rgba("#0a1f3f"),
+                land=_rgba("#12355b", 0.6),
+                outline=_rgba("#0f2744"),
+                outline_width=outline_width,
+            )
+        else:
+            for shape in self._visible_shapes():
+                points = self._to_pixels(shape)
+                polygon = list(map(tuple, points))
+                axes_draw.polygon(polygon, fill=_rgba("#12355b", 0.6))
+                axes_draw.line(polygon, fill=_rgba("#0f2744"), width=outline_width)
+        background.paste(axes, (x0, y0))
+
+        draw = ImageDraw.Draw(background, "RGBA")
+        draw.rectangle((x0 - 1, y0 - 1, x1, y1), outline=_rgba("#000000"), width=1)
+
+        if self._tiles is None:
+            # Label gazetteer places within the viewport, skipping overlapping labels
+            capital_font = load_font(6)
+            places, points = self._visible_places()
+            for place, (x, y) in zip(places, self._to_pixels(points).tolist()):
+                draw.text(
+                    (x + x0, y + y0),
+                    place.name,
+                    font=capital_font,
+                    fill=_rgba("#d5e5ff", 0.8),
+                    anchor="mm",
+                )
+            self._draw_waypoint_labels(draw, (x0, y0))
+
+        if self.config.title:
+            draw.text(
+                ((x0 + x1) / 2.0, y0 - _points_to_px(_TITLE_PAD_POINTS)),
+                self.config.title,
+                font=title_font,
+                fill=_rgba("#ffffff"),
+                anchor="ms",
+            )
+
+        # Frames are composed in preallocated RGBA buffers. Only the axes region
+        # changes between frames, so the rest of the frame buffer is written once.
+        self._frame_buffer = np.array(background.convert("RGBA"))
+        self._axes_background = self._frame_buffer[y0:y1, x0:x1].copy()
+        self._axes_buffer = np.empty_like(self._axes_background)
+        self._axes_image = shared_image(self._axes_buffer)
+
+        # Dynamic artist styles
+        self._trail_width = max(1, int(round(_points_to_px(3.0))))
+        self._future_width = max(1, int(round(_points_to_px(1.5))))
+        self._dash_on, self._dash_off = (_points_to_px(value * 1.5) for value in _DASH_PATTERN)
+
+        # Vehicle sprite, scaled like the matplotlib OffsetImage (zoom in points).
+        zoom = max(width, height) / 8000.0 * _DPI / 72.0
+        icon = Image.fromarray(self._vehicle_icon, mode="RGBA")
+        sprite_size = (
+            max(1, int(round(icon.width * zoom))),
+            max(1, int(round(icon.height * zoom))),
+        )
+        self._sprite_icon = np.array(icon.resize(sprite_size, Image.LANCZOS))
+        self._sprite_atlas = sprite_atlas_for(self._sprite_icon, self.config.vehicle.rotation_resolution)
+
+        self._summary_overlay = self._build_summary_overlay()
+
+    def _build_summary_overlay(self) -> Optional[Tuple[Image.Image, Tuple[int, int]]]:
+        """Pre-render the summary box and return it with its origin inside the axes."""
+
+        if not self._summary_text_content:
+            return None
+        x0, y0, x1, y1 = self._axes_box
+        overlay, pad = _text_box(self._summary_text_content, 10)
+        # Anchor the text's lower-left corner at 2% of the axes, like the matplotlib engine.
+        origin = (
+            int(round(0.02 * (x1 - x0) - pad)),
+            int(round((y1 - y0) * 0.98 + pad - (overlay.height - 1))),
+        )
+        return overlay, origin
+
+    def _draw_waypoint_labels(self, draw: ImageDraw.ImageDraw, origin: Tuple[float, float]) -> None:
+        font = load_font(9, bold=True)
+        for waypoint, (x, y) in zip(self.config.waypoints, self._to_pixels(self._waypoint_xy).tolist()):
+            draw.text(
+                (x + origin[0], y + origin[1]),
+                waypoint.name,
+                font=font,
+                fill=_rgba("#ffffff"),
+                anchor="md",
+            )
+
+    def _apply_view(self, view: Tuple[float, float, float]) -> None:
+        """Point the viewport at ``(centre lat, centre lon, lon span)`` and draw its background."""
+
+        x0, y0, x1, y1 = self._axes_box
+        lat, lon, lon_span = view
+        scale = (x1 - x0) / lon_span
+        assert self._tiles is not None
+        # Tiles are equirectangular, the only projection a following camera supports.
+        backdrop, (self._y_max, self._x_min) = self._tiles.render_view(lat, lon, scale, (x1 - x0, y1 - y0))
+        self._x_max = self._x_min + (x1 - x0) / scale
+        self._y_min = self._y_max - (y1 - y0) / scale
+        np.copyto(self._axes_buffer, backdrop)
+
+    def _viewport_pixels(self) -> Tuple[float, float]:
+        x0, y0, x1, y1 = self._axes_box
+        return float(x1 - x0), float(y1 - y0)
+
+    def _label_pixels(self, points: np.ndarray) -> np.ndarray:
+        return self._to_pixels(points) + self._axes_box[:2]
+
+    def _to_pixels(self, points: np.ndarray) -> np.ndarray:
+        """Convert projected ``(x, y)`` rows to pixel coordinates inside the axes box."""
+
+        x0, y0, x1, y1 = self._axes_box
+        x = (points[:, 0] - self._x_min) / (self._x_max - self._x_min) * (x1 - x0)
+        y = (self._y_max - points[:, 1]) / (self._y_max - self._y_min) * (y1 - y0)
+        return np.column_stack((x, y))
+
+    # ------------------------------------------------------------------
+    # Frame drawing
+    # ------------------------------------------------------------------
+
+    def _draw_frame(self, index: int, axes: Image.Image) -> None:
+        draw = ImageDraw.Draw(axes)
+        timeline = self._frame_states
+        position = self._position_xy[index : index + 1]
+
+        # The trail lies under the future line, as in the matplotlib engine.
+        trail = self._route_xy[: timeline.trail_counts[index]]
+        if timeline.trail_tails[index]:
+            trail = np.concatenate((trail, position))
+        if len(trail) >= 2:
+            trail = list(map(tuple, self._to_pixels(trail)))
+            colour = _rgba("#ff5555")[:3]
+            draw.line(trail, fill=colour, width=self._trail_width, joint="curve")
+            # Round caps to match matplotlib's ``solid_capstyle="round"``.
+            radius = self._trail_width / 2.0
+            for x, y in (trail[0], trail[-1]):
+                draw.ellipse((x - radius, y - radius, x + radius, y + radius), fill=colour)
+
+        start = timeline.upcoming_starts[index]
+        if 0 <= start < len(self._route_xy):
+            colour = _rgba("#66ff99")[:3]
+            upcoming = np.concatenate((position, self._route_xy[start:]))
+            for dash in dash_polyline(self._to_pixels(upcoming), self._dash_on, self._dash_off):
+                draw.line(dash, fill=colour, width=self._future_width)
+
+        with self._stage("sprite"):
+            sprite = Image.fromarray(self._sprite_atlas.get(float(self._screen_bearings[index])), mode="RGBA")
+        x, y = self._to_pixels(position)[0]
+        axes.paste(
+            sprite,
+            (int(round(x - sprite.width / 2.0)), int(round(y - sprite.height / 2.0))),
+            sprite,
+        )
+
+    def _render_frame(self, index: int) -> np.ndarray:
+        """Draw frame ``index`` and return its RGBA pixels.
+
+        The returned array is reused by the next call, so consumers must copy it if
+        they need to keep it.
+        """
+
+        views = self._frame_states.views
+        with self._stage("background"):
+            if views is not None and self._tiles is not None:
+                self._apply_view(tuple(views[index].tolist()))
+                self._draw_waypoint_labels(ImageDraw.Draw(self._axes_image), (0.0, 0.0))
+            else:
+                np.copyto(self._axes_buffer, self._axes_background)
+        with self._stage("draw_frame"):
+            self._draw_frame(index, self._axes_image)
+        with self._stage("compose"):
+            if self._frame_states.show_summary[index] and self._summary_overlay is not None:
+                overlay, origin = self._summary_overlay
+                self._axes_image.paste(overlay, origin, overlay)
+            x0, y0, x1, y1 = self._axes_box
+            self._frame_buffer[y0:y1, x0:x1] = self._axes_buffer
+        return self._frame_buffer
+
+
+class FleetRasterAnimator(FleetMixin, RasterTravelMapAnimator):
+    """Replay a whole fleet of trips with the raster engine.
+
+    Each frame strokes every trail into one mask, blends all vehicle sprites
+    from the dense atlas in a single pass and stamps the clock on top.
+    """
+
+    def _setup_canvas(self) -> None:
+        super()._setup_canvas()
+        self._sprite_atlas = self._fleet_sprite_atlas(self._vehicle_icon)
+        self._fleet_trail_width = _points_to_px(1.5)
+        self._fleet_trail_colour = _rgba("#ff5555", 0.7)
+        self._clock_overlay: Optional[Tuple[str, Image.Image]] = None
+
+    def _draw_clock(self, index: int, axes: Image.Image) -> None:
+        text = self._clock_text(index)
+        if not text:
+            return
+        if self._clock_overlay is None or self._clock_overlay[0] != text:
+            self._clock_overlay = (text, _text_box(text, 12)[0])
+        overlay = self._clock_overlay[1]
+        x0, y0, x1, y1 = self._axes_box
+        # Top-left corner at 2% of the axes, mirroring the summary box.
+        origin = (int(round(0.02 * (x1 - x0))), int(round(0.02 * (y1 - y0))))
+        axes.paste(overlay, origin, overlay)
+
+    def _draw_frame(self, index: int, axes: Image.Image) -> None:
+        timeline = self._frame_states
+        with self._stage("trails"):
+            segments = timeline.trail_segments(index)
+            if len(segments):
+                pixels = self._to_pixels(segments.reshape(-1, 2)).reshape(-1, 2, 2)
+                mask = stroke_mask(self._axes_buffer.shape[:2], pixels, self._fleet_trail_width)
+                blend_mask(self._axes_buffer, mask, self._fleet_trail_colour)
+        with self._stage("sprite"):
+            positions, headings, active = timeline.sample(index)
+            self._sprite_sheet().composite(
+                self._axes_buffer,
+                self._sprite_atlas.indices(headings[active]),
+                self._to_pixels(positions[active]),
+            )
+        self._draw_clock(index, axes)
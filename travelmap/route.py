@@ -0,0 +1,87 @@
+"""Route geometry: waypoints joined by optional per-leg polylines, with an arc-length index."""
+from __future__ import annotations
+
+from typing import Sequence, Tuple
+
+import numpy as np
+
+from .config import Waypoint
+from .geometry import cumulative_distances
+
+# Path points this close to a leg's end waypoint (in degrees) duplicate it.
+_DUPLICATE_DEGREES = 1e-9
+
+
+class Route:
+    """The full travelled polyline and the position of every waypoint on it.
+
+    Legs without a path are a single great-circle segment between their
+    waypoints; legs with a path follow its vertices. ``cumulative`` holds the
+    arc length in kilometres from the start to every vertex, so locating a
+    point a given distance along a leg is a binary search plus one
+    interpolation, however many vertices the leg has.
+
+    Attributes:
+        vertices: ``(V, 2)`` lat/lon vertices of the whole route.
+        waypoint_indices: ``(W,)`` vertex index of each waypoint.
+        cumulative: ``(V,)`` distance in km from the start to each vertex.
+    """
+
+    def __init__(self, vertices: np.ndarray, waypoint_indices: np.ndarray) -> None:
+        self.vertices = vertices
+        self.waypoint_indices = waypoint_indices
+        self.cumulative = cumulative_distances(vertices)
+
+    @classmethod
+    def from_waypoints(cls, waypoints: Sequence[Waypoint]) -> "Route":
+        parts = []
+        indices = []
+        count = 0
+        for index, waypoint in enumerate(waypoints):
+            end = np.array([[waypoint.latitude, waypoint.longitude]], dtype=np.float64)
+            path = np.asarray(waypoint.path if waypoint.path is not None else [], dtype=np.float64)
+            path = path.reshape(-1, 2)
+            if index and len(path):
+                # Paths usually repeat the waypoints they connect.
+                if np.all(np.abs(path[0] - parts[-1][-1]) <= _DUPLICATE_DEGREES):
+                    path = path[1:]
+                if len(path) and np.all(np.abs(path[-1] - end[0]) <= _DUPLICATE_DEGREES):
+                    path = path[:-1]
+                parts.append(path)
+                count += len(path)
+            parts.append(end)
+            indices.append(count)
+            count += 1
+        vertices = np.concatenate(parts) if parts else np.zeros((0, 2), dtype=np.float64)
+        return cls(vertices, np.array(indices, dtype=np.int64))
+
+    def leg_lengths(self) -> np.ndarray:
+        """Return the path length in km of each leg."""
+
+        return np.diff(self.cumulative[self.waypoint_indices])
+
+    def locate(self, legs: np.ndarray, fractions: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Find the points ``fractions`` of the way along ``legs``.
+
+        Returns the index of the route segment each point lies on (the segment
+        from vertex ``i`` to ``i + 1``) and the fraction of the way along that
+        segment. A fraction of ``1`` maps to the end of the leg's last segment.
+        """
+
+        first = self.waypoint_indices[legs]
+        last = self.waypoint_indices[legs + 1] - 1
+        start = self.cumulative[first]
+        arcs = start + fractions * (self.cumulative[last + 1] - start)
+        segments = np.clip(np.searchsorted(self.cumulative, arcs, side="left") - 1, first, last)
+        lengths = self.cumulative[segments + 1] - self.cumulative[segments]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            local = np.where(lengths > 0, (arcs - self.cumulative[segments]) / lengths, fractions)
+        local = np.clip(local, 0.0, 1.0)
+        # Single-segment legs use the leg fraction as is, which keeps plain
+        # waypoint routes free of rounding noise.
+        single = first == last
+        local[single] = fractions[single]
+        arrived = fractions >= 1.0
+        segments[arrived] = last[arrived]
+        local[arrived] = 1.0
+        return segments, local
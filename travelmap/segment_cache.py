@@ -0,0 +1,370 @@
+"""Content-addressed cache of encoded video segments for incremental re-renders.
+
+The timeline is split into segments, one per leg plus one for the summary
+hold. Each segment is fingerprinted from everything that affects its pixels:
+the static layer (viewport, style, labels, engine, vehicle icon), the frame
+states in the segment and the parts of the route they draw. Segments whose
+fingerprint is already cached are reused as-is; the others are rendered and
+encoded into their own files, and the final video is assembled with a
+stream-copy concat, so editing one leg only re-renders that leg.
+"""
+from __future__ import annotations
+
+import dataclasses
+import hashlib
+import json
+import os
+import subprocess
+import tempfile
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+if TYPE_CHECKING:  # pragma: no cover - imported for type checking only
+    from .animator import BaseAnimator
+
+# Bump when a change to the renderers alters the pixels produced for the same
+# inputs, so that stale segments are no longer matched.
+CACHE_VERSION = 1
+
+# Settings that only shape the timeline. Their effect is already captured by the
+# per-frame states, so changing them must not invalidate unaffected segments.
+_TIMELINE_FIELDS = (
+    "output_path",
+    "speed_kmh",
+    "pause_at_start",
+    "pause_at_end",
+    "summary_display_seconds",
+    "target_duration",
+    "max_frames",
+    "time_warp",
+    "min_leg_seconds",
+)
+
+_SIZE_UNITS = {"": 1, "K": 1024, "M": 1024**2, "G": 1024**3, "T": 1024**4}
+
+
+@dataclass(frozen=True)
+class Segment:
+    """A contiguous ``[start, stop)`` range of frames identified by its content ``key``."""
+
+    key: str
+    start: int
+    stop: int
+
+    @property
+    def frames(self) -> int:
+        return self.stop - self.start
+
+
+@dataclass
+class CacheStats:
+    """Segment reuse metrics collected by :func:`render_cached`."""
+
+    segments: int = 0
+    reused: int = 0
+    reused_frames: int = 0
+    rendered_frames: int = 0
+    evicted: int = 0
+
+    def describe(self) -> str:
+        return (
+            f"reused {self.reused} of {self.segments} segments, rendered "
+            f"{self.rendered_frames} frames, evicted {self.evicted} segments"
+        )
+
+
+def parse_size(text: str) -> int:
+    """Parse a byte count such as ``"500M"`` or ``"2G"`` (binary units)."""
+
+    value = text.strip().upper().rstrip("IB")
+    unit = value[-1:] if value[-1:] in _SIZE_UNITS else ""
+    try:
+        number = float(value[: len(value) - len(unit)])
+    except ValueError as exc:
+        raise ValueError(f"Invalid size: {text!r}") from exc
+    return int(number * _SIZE_UNITS[unit])
+
+
+class SegmentCache:
+    """Directory of encoded segments named after their fingerprint.
+
+    When ``max_bytes`` is set, least recently used segments are evicted after
+    each render until the cache fits. Reusing a segment refreshes its
+    modification time, which serves as the LRU clock.
+    """
+
+    def __init__(self, directory: Path, max_bytes: Optional[int] = None) -> None:
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def path(self, key: str, suffix: str) -> Path:
+        return self.directory / f"{key}{suffix}"
+
+    def lookup(self, key: str, suffix: str) -> Optional[Path]:
+        """Return the cached segment for ``key`` and mark it as recently used."""
+
+        path = self.path(key, suffix)
+        if not path.exists():
+            return None
+        os.utime(path)
+        return path
+
+    def store(self, source: Path, key: str, suffix: str) -> Path:
+        """Move a fully encoded segment file into the cache."""
+
+        path = self.path(key, suffix)
+        os.replace(source, path)
+        return path
+
+    def evict(self, keep: Iterable[Path] = ()) -> int:
+        """Remove least recently used segments until the cache fits ``max_bytes``.
+
+        Segments in ``keep`` are never removed. Returns the number of evicted files.
+        """
+
+        if self.max_bytes is None:
+            return 0
+        protected: Set[Path] = {Path(path) for path in keep}
+        entries: List[Tuple[float, int, Path]] = []
+        total = 0
+        for path in self.directory.iterdir():
+            if not path.is_file() or path.name.startswith("."):
+                continue
+            stat = path.stat()
+            total += stat.st_size
+            if path not in protected:
+                entries.append((stat.st_mtime, stat.st_size, path))
+        evicted = 0
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+            evicted += 1
+        return evicted
+
+
+def _static_digest(animator: "BaseAnimator", suffix: str) -> "hashlib._Hash":
+    """Hash every input shared by all frames: layout, style, labels and encoder."""
+
+    data = dataclasses.asdict(animator.config)
+    for name in _TIMELINE_FIELDS:
+        data.pop(name, None)
+    for waypoint in data["waypoints"]:
+        waypoint.pop("pause_seconds", None)
+    digest = hashlib.sha256()
+    digest.update(json.dumps(data, sort_keys=True, default=str).encode("utf8"))
+    digest.update(json.dumps([CACHE_VERSION, suffix, animator.encoder_settings()]).encode("utf8"))
+    digest.update(animator._place_index.fingerprint.encode("utf8"))
+    digest.update(animator._shape_layer.fingerprint.encode("utf8"))
+    icon = np.ascontiguousarray(animator._vehicle_icon)
+    digest.update(repr(icon.shape).encode("utf8"))
+    digest.update(icon.tobytes())
+    return digest
+
+
+def plan_segments(animator: "BaseAnimator", suffix: str, max_frames: Optional[int] = None) -> List[Segment]:
+    """Split the animator's timeline into per-leg segments keyed by their content.
+
+    With ``max_frames`` long legs are further split into segments of at most
+    that many frames.
+    """
+
+    timeline = animator._frame_states
+    frame_count = len(timeline)
+    if not frame_count:
+        return []
+    changes = (timeline.legs[1:] != timeline.legs[:-1]) | (
+        timeline.show_summary[1:] != timeline.show_summary[:-1]
+    )
+    bounds = np.concatenate(([0], np.flatnonzero(changes) + 1, [frame_count])).tolist()
+    if max_frames is not None:
+        if max_frames < 1:
+            raise ValueError("Segments must hold at least one frame.")
+        splits = {
+            split for start, stop in zip(bounds[:-1], bounds[1:]) for split in range(start, stop, max_frames)
+        }
+        bounds = sorted(splits.union(bounds))
+    static = _static_digest(animator, suffix)
+
+    segments: List[Segment] = []
+    for start, stop in zip(bounds[:-1], bounds[1:]):
+        window = slice(start, stop)
+        digest = static.copy()
+        for column in (
+            timeline.positions,
+            timeline.bearings,
+            timeline.trail_counts,
+            timeline.trail_tails,
+            timeline.upcoming_starts,
+            timeline.show_summary,
+        ):
+            digest.update(np.ascontiguousarray(column[window]).tobytes())
+        if timeline.views is not None:
+            digest.update(np.ascontiguousarray(timeline.views[window]).tobytes())
+        # The trail draws a prefix of the route and the dashed preview a suffix.
+        digest.update(timeline.vertices[: int(timeline.trail_counts[window].max())].tobytes())
+        upcoming = timeline.upcoming_starts[window]
+        upcoming = upcoming[upcoming >= 0]
+        if len(upcoming):
+            digest.update(b"upcoming")
+            digest.update(timeline.vertices[int(upcoming.min()) :].tobytes())
+        if timeline.show_summary[window].any():
+            digest.update(animator._summary_text_content.encode("utf8"))
+        segments.append(Segment(digest.hexdigest(), start, stop))
+    return segments
+
+
+class _SegmentWriter:
+    """Frame writer that spreads appended frames over consecutive segment files."""
+
+    def __init__(
+        self,
+        cache: SegmentCache,
+        segments: List[Segment],
+        suffix: str,
+        open_writer: Callable[[Path], Any],
+        on_commit: Optional[Callable[[Segment], None]] = None,
+    ) -> None:
+        self._cache = cache
+        self._segments = segments
+        self._suffix = suffix
+        self._open_writer = open_writer
+        self._on_commit = on_commit
+        self._index = 0
+        self._written = 0
+        self._writer: Any = None
+        self._partial: Optional[Path] = None
+
+    def append_data(self, image: np.ndarray) -> None:
+        segment = self._segments[self._index]
+        if self._writer is None:
+            partial_name = f".{segment.key}.{os.getpid()}.partial{self._suffix}"
+            self._partial = self._cache.directory / partial_name
+            self._writer = self._open_writer(self._partial)
+        self._writer.append_data(image)
+        self._written += 1
+        if self._written == segment.frames:
+            self._writer.close()
+            self._writer = None
+            assert self._partial is not None
+            self._cache.store(self._partial, segment.key, self._suffix)
+            self._partial = None
+            if self._on_commit is not None:
+                self._on_commit(segment)
+            self._index += 1
+            self._written = 0
+
+    def close(self) -> None:
+        # An unfinished segment is discarded rather than cached.
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        if self._partial is not None:
+            self._partial.unlink(missing_ok=True)
+            self._partial = None
+
+    def __enter__(self) -> "_SegmentWriter":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+
+def concat_segments(paths: List[Path], output_path: Path) -> None:
+    """Join encoded segments into ``output_path`` without re-encoding them."""
+
+    try:
+        import imageio_ffmpeg
+    except ImportError as exc:
+        raise ImportError(
+            "FFMPEG support is required to assemble cached segments. Install the "
+            "'imageio-ffmpeg' package (for example via 'pip install imageio-ffmpeg') "
+            "and try again."
+        ) from exc
+
+    with tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False, encoding="utf8") as listing:
+        for path in paths:
+            escaped = str(Path(path).resolve()).replace("'", "'\\''")
+            listing.write(f"file '{escaped}'\n")
+    try:
+        result = subprocess.run(
+            [
+                imageio_ffmpeg.get_ffmpeg_exe(),
+                "-y",
+                "-loglevel",
+                "error",
+                "-f",
+                "concat",
+                "-safe",
+                "0",
+                "-i",
+                listing.name,
+                "-c",
+                "copy",
+                str(output_path),
+            ],
+            capture_output=True,
+            text=True,
+        )
+    finally:
+        os.unlink(listing.name)
+    if result.returncode != 0:
+        raise RuntimeError(f"Failed to concatenate cached segments: {result.stderr.strip()}")
+
+
+def render_cached(
+    animator: "BaseAnimator",
+    cache: SegmentCache,
+    output_path: Path,
+    workers: int,
+    chunk_frames: int,
+    share_sprites: bool,
+    pipeline_depth: int,
+    segments: Optional[List[Segment]] = None,
+    on_commit: Optional[Callable[[Segment], None]] = None,
+) -> CacheStats:
+    """Render ``animator`` to ``output_path`` reusing cached segments where possible.
+
+    ``segments`` overrides the per-leg plan of :func:`plan_segments` and
+    ``on_commit`` is called with each segment as soon as it is stored.
+    """
+
+    suffix = output_path.suffix
+    if segments is None:
+        segments = plan_segments(animator, suffix)
+    # Identical segments share a key, so each distinct one is rendered once.
+    pending: Dict[str, Segment] = {}
+    for segment in segments:
+        if segment.key not in pending and cache.lookup(segment.key, suffix) is None:
+            pending[segment.key] = segment
+    missing = list(pending.values())
+    rendered = {id(segment) for segment in missing}
+    stats = CacheStats(
+        segments=len(segments),
+        reused=sum(segment.key not in pending for segment in segments),
+        reused_frames=sum(segment.frames for segment in segments if id(segment) not in rendered),
+        rendered_frames=sum(segment.frames for segment in missing),
+    )
+
+    if missing:
+        timeline = animator._frame_states
+        pieces = [timeline.runs(segment.start, segment.stop) for segment in missing]
+        runs = (
+            np.concatenate([starts for starts, _ in pieces]),
+            np.concatenate([lengths for _, lengths in pieces]),
+        )
+        frames = animator.iter_frame_runs(
+            workers, chunk_frames=chunk_frames, share_sprites=share_sprites, runs=runs
+        )
+        with _SegmentWriter(cache, missing, suffix, animator._open_writer, on_commit) as writer:
+            animator._encode(frames, writer, pipeline_depth, len(animator._frame_states), stats.reused_frames)
+
+    paths = [cache.path(segment.key, suffix) for segment in segments]
+    concat_segments(paths, output_path)
+    stats.evicted = cache.evict(keep=paths)
+    return stats
@@ -0,0 +1,699 @@
+"""Local render service: ``python -m travelmap serve``.
+
+A small asyncio HTTP server that accepts itineraries in the
+:class:`~travelmap.config.AnimationConfig` schema and renders them on a fixed
+pool of warm worker processes. Each worker imports the engines and loads the
+place table and fonts once at startup, then renders one job at a time, so a
+burst of submissions does not start a fresh interpreter per request.
+
+Endpoints (JSON unless noted):
+
+``POST /jobs``
+    Queue the configuration in the request body. Returns ``202`` with the job,
+    ``400`` for an invalid configuration and ``503`` when the queue is full.
+``GET /jobs`` / ``GET /jobs/<id>``
+    List jobs or describe one, including progress and ETA while it runs.
+``GET /jobs/<id>/events``
+    Server-sent events: a ``progress`` event whenever the job changes and a
+    final event named after its end state (``done``, ``failed`` or ``cancelled``).
+``GET /jobs/<id>/output``
+    The rendered video, once the job is done.
+``DELETE /jobs/<id>``
+    Cancel a queued or running job, or forget a finished one and delete its video.
+``GET /health``
+    Worker and queue counts.
+
+The service is meant for the local machine and binds to ``127.0.0.1`` by
+default. Outputs are always written below ``--output-dir``, whatever the
+submitted ``output`` says; only its extension is kept, and extra ``outputs``
+are ignored. Files named by a configuration (track, fleet, icon, gazetteer and
+map data) must be relative paths inside ``--data-dir``. Browsers may only call
+the service from the origins given with ``--allow-origin``; requests carrying
+any other ``Origin`` header are refused.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import collections
+import dataclasses
+import json
+import multiprocessing
+import signal
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Deque, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from .config import AnimationConfig
+from .pipeline import DEFAULT_PIPELINE_DEPTH
+
+JOB_STATES = ("queued", "running", "done", "failed", "cancelled")
+_FINAL_STATES = ("done", "failed", "cancelled")
+_VIDEO_TYPES = {".mp4": "video/mp4", ".webm": "video/webm", ".mkv": "video/x-matroska", ".gif": "image/gif"}
+_STATUS_TEXT = {
+    200: "OK",
+    202: "Accepted",
+    204: "No Content",
+    400: "Bad Request",
+    403: "Forbidden",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    409: "Conflict",
+    413: "Payload Too Large",
+    500: "Internal Server Error",
+    503: "Service Unavailable",
+}
+_CORS_HEADERS = {
+    "Access-Control-Allow-Methods": "GET, POST, DELETE, OPTIONS",
+    "Access-Control-Allow-Headers": "Content-Type",
+    "Vary": "Origin",
+}
+# Seconds between SSE comments that keep idle connections open.
+_KEEPALIVE_SECONDS = 15.0
+_FILE_CHUNK_BYTES = 1 << 20
+
+
+class HTTPError(Exception):
+    def __init__(self, status: int, message: str) -> None:
+        super().__init__(message)
+        self.status = status
+
+
+@dataclass
+class Job:
+    """One submitted render and its latest known state."""
+
+    id: str
+    config: Dict[str, Any]
+    output_path: Path
+    state: str = "queued"
+    progress: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    submitted: float = field(default_factory=time.time)
+    started: Optional[float] = None
+    finished: Optional[float] = None
+    version: int = 0
+    _changed: asyncio.Event = field(default_factory=asyncio.Event, repr=False)
+
+    @property
+    def final(self) -> bool:
+        return self.state in _FINAL_STATES
+
+    def update(self, **changes: Any) -> None:
+        """Apply ``changes`` and wake everyone waiting for this job."""
+
+        for name, value in changes.items():
+            setattr(self, name, value)
+        self.version += 1
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def wait_changed(self, version: int, timeout: float) -> None:
+        """Wait until the job moves past ``version`` or ``timeout`` seconds pass."""
+
+        event = self._changed
+        if self.version != version:
+            return
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "state": self.state,
+            "title": self.config.get("title", ""),
+            "progress": self.progress,
+            "error": self.error,
+            "submitted": self.submitted,
+            "started": self.started,
+            "finished": self.finished,
+            "output": f"/jobs/{self.id}/output" if self.state == "done" else None,
+            "events": f"/jobs/{self.id}/events",
+        }
+
+
+# ----------------------------------------------------------------------
+# Job configurations
+# ----------------------------------------------------------------------
+
+
+def _named_files(mapping: Dict[str, Any]) -> Iterator[Any]:
+    """Yield every file path a configuration mapping asks the renderer to read."""
+
+    for key, file_keys in (("track", ("file", "path")), ("fleet", ("file", "source"))):
+        spec = mapping.get(key)
+        if isinstance(spec, dict):
+            yield from (spec.get(name) for name in file_keys)
+        else:
+            yield spec
+    vehicle = mapping.get("vehicle")
+    if isinstance(vehicle, dict):
+        yield vehicle.get("icon")
+        yield vehicle.get("icon_path")
+    yield mapping.get("gazetteer")
+    yield mapping.get("map_data")
+
+
+def parse_job_config(mapping: Dict[str, Any], data_dir: Path) -> AnimationConfig:
+    """Build the configuration of a submitted job, confined to ``data_dir``.
+
+    Every file the job names must be a relative path that stays inside
+    ``data_dir``, so a client cannot have arbitrary local files read.
+    """
+
+    root = data_dir.resolve()
+    for value in _named_files(mapping):
+        if not value:
+            continue
+        if not isinstance(value, str):
+            raise ValueError(f"File paths must be strings, got {value!r}.")
+        path = Path(value)
+        if path.is_absolute() or ".." in path.parts or not (root / path).resolve().is_relative_to(root):
+            raise ValueError(f"Files must be relative paths inside the data directory: {value!r}.")
+    config = AnimationConfig.from_mapping(mapping, base_dir=root)
+    icon_path = config.vehicle.icon_path
+    if icon_path is not None:
+        vehicle = dataclasses.replace(config.vehicle, icon_path=root / icon_path)
+        config = dataclasses.replace(config, vehicle=vehicle)
+    return config
+
+
+# ----------------------------------------------------------------------
+# Worker processes
+# ----------------------------------------------------------------------
+
+
+def _worker_main(connection: Any, pipeline_depth: int, data_dir: Path) -> None:
+    """Render jobs received over ``connection`` until told to stop.
+
+    Messages in: ``("render", job_id, mapping, output_path)``, ``("cancel",
+    job_id)`` or ``None`` to exit. Messages out: ``("started", job_id)``,
+    ``("progress", job_id, progress)`` and one of ``("done", job_id, path)``,
+    ``("failed", job_id, error)`` or ``("cancelled", job_id)``.
+    """
+
+    from .batch import _warm_worker
+    from .engines import create_animator
+    from .progress import RenderCancelled, RenderProgress
+
+    # Ctrl+C reaches the whole process group; the service shuts workers down itself.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    _warm_worker()
+    while True:
+        try:
+            message = connection.recv()
+        except EOFError:
+            # The service went away without saying goodbye.
+            return
+        if message is None:
+            return
+        if message[0] != "render":
+            # A cancel for a job that already finished.
+            continue
+        _, job_id, mapping, output_path = message
+        connection.send(("started", job_id))
+
+        def report(progress: RenderProgress, job_id: str = job_id) -> None:
+            connection.send(("progress", job_id, progress.to_dict()))
+            while connection.poll():
+                request = connection.recv()
+                if request == ("cancel", job_id):
+                    raise RenderCancelled()
+
+        animator = None
+        try:
+            config = parse_job_config(mapping, data_dir)
+            config = dataclasses.replace(config, output_path=Path(output_path), outputs=[])
+            animator = create_animator(config)
+            path = animator.render(pipeline_depth=pipeline_depth, progress=report)
+        except RenderCancelled:
+            connection.send(("cancelled", job_id))
+        except Exception as exc:  # noqa: BLE001 - reported to the client, the worker lives on
+            connection.send(("failed", job_id, f"{type(exc).__name__}: {exc}"))
+        else:
+            connection.send(("done", job_id, str(path)))
+        finally:
+            # The worker outlives the job, so a cancelled or failed render must
+            # not keep its figure.
+            if animator is not None:
+                animator.close()
+
+
+class _WorkerSlot:
+    """A warm worker process, its pipe and the job it is rendering."""
+
+    def __init__(self, context: Any, pipeline_depth: int, data_dir: Path) -> None:
+        self.connection, child = context.Pipe()
+        self.process = context.Process(
+            target=_worker_main, args=(child, pipeline_depth, data_dir), name="travelmap-render", daemon=True
+        )
+        self.process.start()
+        child.close()
+        self.job: Optional[Job] = None
+
+
+# ----------------------------------------------------------------------
+# Service
+# ----------------------------------------------------------------------
+
+
+class RenderService:
+    """Queue of render jobs served by ``jobs`` warm worker processes.
+
+    At most ``max_queue`` jobs wait for a worker; further submissions are
+    rejected until the queue drains. Finished jobs beyond ``keep_jobs`` are
+    forgotten, oldest first, and their videos deleted. Files named by job
+    configurations are read from ``data_dir`` (default: the working directory).
+    """
+
+    def __init__(
+        self,
+        output_dir: Path,
+        jobs: int = 1,
+        max_queue: int = 16,
+        keep_jobs: int = 100,
+        pipeline_depth: int = DEFAULT_PIPELINE_DEPTH,
+        data_dir: Optional[Path] = None,
+    ) -> None:
+        if jobs < 1:
+            raise ValueError("At least one render worker is required.")
+        self.output_dir = Path(output_dir)
+        self.data_dir = Path(data_dir if data_dir is not None else Path.cwd()).resolve()
+        self.worker_count = jobs
+        self.max_queue = max_queue
+        self.keep_jobs = keep_jobs
+        self.pipeline_depth = pipeline_depth
+        self.jobs: "collections.OrderedDict[str, Job]" = collections.OrderedDict()
+        self._queue: Deque[Job] = collections.deque()
+        self._slots: List[_WorkerSlot] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        # Spawned workers do not inherit the event loop or its threads.
+        self._context = multiprocessing.get_context("spawn")
+
+    # -- lifecycle -----------------------------------------------------
+
+    def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        for _ in range(self.worker_count):
+            self._start_slot()
+
+    def _start_slot(self, replace: Optional[_WorkerSlot] = None) -> None:
+        slot = _WorkerSlot(self._context, self.pipeline_depth, self.data_dir)
+        if replace is None:
+            self._slots.append(slot)
+        else:
+            self._slots[self._slots.index(replace)] = slot
+        thread = threading.Thread(target=self._read_slot, args=(slot,), name="travelmap-serve-reader", daemon=True)
+        thread.start()
+
+    def close(self) -> None:
+        """Cancel running renders, stop the workers and delete unfinished videos."""
+
+        slots, self._slots = self._slots, []
+        for slot in slots:
+            try:
+                if slot.job is not None:
+                    slot.connection.send(("cancel", slot.job.id))
+                slot.connection.send(None)
+            except (OSError, ValueError):
+                pass
+        for slot in slots:
+            slot.process.join(timeout=5.0)
+            if slot.process.is_alive():
+                slot.process.terminate()
+            if slot.job is not None:
+                slot.job.output_path.unlink(missing_ok=True)
+
+    def _read_slot(self, slot: _WorkerSlot) -> None:
+        """Forward a worker's messages to the event loop; runs on its own thread."""
+
+        assert self._loop is not None
+        try:
+            while True:
+                try:
+                    message = slot.connection.recv()
+                except (EOFError, OSError):
+                    self._loop.call_soon_threadsafe(self._on_worker_exit, slot)
+                    return
+                self._loop.call_soon_threadsafe(self._on_message, slot, message)
+        except RuntimeError:
+            # The event loop closed during shutdown.
+            return
+
+    # -- jobs ----------------------------------------------------------
+
+    async def submit(self, mapping: Dict[str, Any]) -> Job:
+        """Validate and queue a configuration mapping."""
+
+        if not isinstance(mapping, dict):
+            raise HTTPError(400, "The request body must be a JSON object.")
+        if len(self._queue) >= self.max_queue:
+            raise HTTPError(503, "The render queue is full; try again later.")
+        loop = asyncio.get_running_loop()
+        try:
+            # Parsing can read a recorded track, so keep it off the event loop.
+            config = await loop.run_in_executor(None, parse_job_config, mapping, self.data_dir)
+        except (ValueError, TypeError, KeyError, OSError) as exc:
+            raise HTTPError(400, f"Invalid configuration: {exc}") from exc
+        if len(self._queue) >= self.max_queue:
+            raise HTTPError(503, "The render queue is full; try again later.")
+        job_id = uuid.uuid4().hex[:12]
+        suffix = Path(config.output_path).suffix or ".mp4"
+        job = Job(job_id, mapping, self.output_dir / f"{job_id}{suffix}")
+        self.jobs[job_id] = job
+        self._queue.append(job)
+        self._forget_old_jobs()
+        self._dispatch()
+        return job
+
+    def get(self, job_id: str) -> Job:
+        job = self.jobs.get(job_id)
+        if job is None:
+            raise HTTPError(404, f"No job {job_id!r}.")
+        return job
+
+    def cancel(self, job_id: str) -> Job:
+        """Cancel a queued or running job; a finished job is forgotten instead."""
+
+        job = self.get(job_id)
+        if job.final:
+            self._forget(job)
+        elif job in self._queue:
+            self._queue.remove(job)
+            job.update(state="cancelled", finished=time.time())
+        else:
+            # The worker stops at its next progress report. A running job
+            # without a worker lost it while the service shuts down.
+            slot = next((slot for slot in self._slots if slot.job is job), None)
+            if slot is None:
+                job.output_path.unlink(missing_ok=True)
+                job.update(state="cancelled", finished=time.time())
+            else:
+                slot.connection.send(("cancel", job.id))
+        return job
+
+    def _forget(self, job: Job) -> None:
+        self.jobs.pop(job.id, None)
+        job.output_path.unlink(missing_ok=True)
+
+    def _forget_old_jobs(self) -> None:
+        finished = [job for job in self.jobs.values() if job.final]
+        for job in finished[: max(len(finished) - self.keep_jobs, 0)]:
+            self._forget(job)
+
+    def _dispatch(self) -> None:
+        for slot in self._slots:
+            if not self._queue:
+                return
+            if slot.job is None and slot.process.is_alive():
+                job = self._queue.popleft()
+                slot.job = job
+                slot.connection.send(("render", job.id, job.config, str(job.output_path)))
+
+    def _on_message(self, slot: _WorkerSlot, message: Tuple[Any, ...]) -> None:
+        kind, job_id = message[0], message[1]
+        job = self.jobs.get(job_id)
+        if kind == "started":
+            if job is not None:
+                job.update(state="running", started=time.time())
+            return
+        if kind == "progress":
+            if job is not None:
+                job.update(progress=message[2])
+            return
+        # The job finished one way or another; the worker is free again.
+        slot.job = None
+        if job is not None:
+            if kind == "done":
+                job.update(state="done", finished=time.time())
+            elif kind == "failed":
+                job.update(state="failed", error=message[2], finished=time.time())
+            else:
+                job.output_path.unlink(missing_ok=True)
+                job.update(state="cancelled", finished=time.time())
+        self._dispatch()
+
+    def _on_worker_exit(self, slot: _WorkerSlot) -> None:
+        if slot not in self._slots:
+            return
+        job, slot.job = slot.job, None
+        if job is not None and not job.final:
+            job.output_path.unlink(missing_ok=True)
+            job.update(state="failed", error="The render worker exited unexpectedly.", finished=time.time())
+        self._start_slot(replace=slot)
+        self._dispatch()
+
+    def health(self) -> Dict[str, Any]:
+        return {
+            "workers": len(self._slots),
+            "busy": sum(slot.job is not None for slot in self._slots),
+            "queued": len(self._queue),
+            "max_queue": self.max_queue,
+        }
+
+
+# ----------------------------------------------------------------------
+# HTTP
+# ----------------------------------------------------------------------
+
+
+class RenderServer:
+    """Minimal HTTP/1.1 front end for a :class:`RenderService` (one request per connection).
+
+    Requests with an ``Origin`` header, i.e. made by a web page, are only
+    served for ``allowed_origins``, which also receive CORS headers.
+    """
+
+    def __init__(
+        self, service: RenderService, max_body_bytes: int = 16 << 20, allowed_origins: Sequence[str] = ()
+    ) -> None:
+        self.service = service
+        self.max_body_bytes = max_body_bytes
+        self.allowed_origins = frozenset(origin.rstrip("/") for origin in allowed_origins)
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        cors: Dict[str, str] = {}
+        try:
+            try:
+                method, path, headers, body = await self._read_request(reader)
+                cors = self._cors_headers(headers.get("origin"))
+                await self._route(method, path, body, writer, cors)
+            except HTTPError as exc:
+                await self._send_json(writer, exc.status, {"error": str(exc)}, cors)
+            except (ConnectionError, asyncio.IncompleteReadError):
+                pass
+            except Exception as exc:  # noqa: BLE001 - keep serving after a handler bug
+                await self._send_json(writer, 500, {"error": f"{type(exc).__name__}: {exc}"}, cors)
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    def _cors_headers(self, origin: Optional[str]) -> Dict[str, str]:
+        """Return the CORS headers for a request from ``origin``, refusing unknown origins."""
+
+        if origin is None:
+            return {}
+        if origin.rstrip("/") not in self.allowed_origins:
+            raise HTTPError(403, f"Requests from origin {origin!r} are not allowed.")
+        return dict(_CORS_HEADERS, **{"Access-Control-Allow-Origin": origin})
+
+    async def _read_request(self, reader: asyncio.StreamReader) -> Tuple[str, str, Dict[str, str], bytes]:
+        request_line = (await reader.readline()).decode("latin-1").strip()
+        parts = request_line.split()
+        if len(parts) != 3:
+            raise HTTPError(400, "Malformed request line.")
+        method, target, _ = parts
+        headers: Dict[str, str] = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        length = int(headers.get("content-length") or 0)
+        if length > self.max_body_bytes:
+            raise HTTPError(413, "The request body is too large.")
+        body = await reader.readexactly(length) if length else b""
+        return method.upper(), target.split("?", 1)[0].rstrip("/") or "/", headers, body
+
+    async def _route(
+        self, method: str, path: str, body: bytes, writer: asyncio.StreamWriter, cors: Dict[str, str]
+    ) -> None:
+        service = self.service
+        if method == "OPTIONS":
+            await self._send(writer, 204, cors, b"")
+            return
+        parts = path.strip("/").split("/")
+        if parts == ["health"] and method == "GET":
+            await self._send_json(writer, 200, service.health(), cors)
+        elif parts == ["jobs"] and method == "GET":
+            await self._send_json(writer, 200, [job.describe() for job in service.jobs.values()], cors)
+        elif parts == ["jobs"] and method == "POST":
+            try:
+                mapping = json.loads(body.decode("utf8"))
+            except (UnicodeDecodeError, json.JSONDecodeError) as exc:
+                raise HTTPError(400, f"The request body is not valid JSON: {exc}") from exc
+            job = await service.submit(mapping)
+            await self._send_json(writer, 202, job.describe(), cors)
+        elif len(parts) == 2 and parts[0] == "jobs" and method == "GET":
+            await self._send_json(writer, 200, service.get(parts[1]).describe(), cors)
+        elif len(parts) == 2 and parts[0] == "jobs" and method == "DELETE":
+            await self._send_json(writer, 202, service.cancel(parts[1]).describe(), cors)
+        elif len(parts) == 3 and parts[0] == "jobs" and parts[2] == "events" and method == "GET":
+            await self._stream_events(service.get(parts[1]), writer, cors)
+        elif len(parts) == 3 and parts[0] == "jobs" and parts[2] == "output" and method == "GET":
+            await self._send_output(service.get(parts[1]), writer, cors)
+        elif parts[0] in ("health", "jobs"):
+            raise HTTPError(405, f"{method} is not supported for {path}.")
+        else:
+            raise HTTPError(404, f"No such resource: {path}.")
+
+    async def _send(
+        self, writer: asyncio.StreamWriter, status: int, headers: Dict[str, str], body: bytes
+    ) -> None:
+        head = [f"HTTP/1.1 {status} {_STATUS_TEXT.get(status, '')}"]
+        all_headers = dict(headers)
+        all_headers.setdefault("Content-Length", str(len(body)))
+        all_headers["Connection"] = "close"
+        head += [f"{name}: {value}" for name, value in all_headers.items()]
+        writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + body)
+        await writer.drain()
+
+    async def _send_json(
+        self, writer: asyncio.StreamWriter, status: int, payload: Any, cors: Dict[str, str]
+    ) -> None:
+        body = json.dumps(payload).encode("utf8")
+        await self._send(writer, status, dict(cors, **{"Content-Type": "application/json"}), body)
+
+    async def _stream_events(self, job: Job, writer: asyncio.StreamWriter, cors: Dict[str, str]) -> None:
+        head = [f"HTTP/1.1 200 {_STATUS_TEXT[200]}", "Content-Type: text/event-stream", "Cache-Control: no-cache"]
+        head += [f"{name}: {value}" for name, value in cors.items()]
+        writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1"))
+        version = -1
+        while True:
+            if job.version != version:
+                version = job.version
+                event = job.state if job.final else "progress"
+                writer.write(f"event: {event}\ndata: {json.dumps(job.describe())}\n\n".encode("utf8"))
+                await writer.drain()
+                if job.final:
+                    return
+            else:
+                writer.write(b": keep-alive\n\n")
+                await writer.drain()
+            await job.wait_changed(version, _KEEPALIVE_SECONDS)
+
+    async def _send_output(self, job: Job, writer: asyncio.StreamWriter, cors: Dict[str, str]) -> None:
+        if job.state != "done" or not job.output_path.exists():
+            raise HTTPError(409, f"Job {job.id} has no output (state: {job.state}).")
+        size = job.output_path.stat().st_size
+        content_type = _VIDEO_TYPES.get(job.output_path.suffix.lower(), "application/octet-stream")
+        head = [
+            f"HTTP/1.1 200 {_STATUS_TEXT[200]}",
+            f"Content-Type: {content_type}",
+            f"Content-Length: {size}",
+            f'Content-Disposition: attachment; filename="{job.output_path.name}"',
+            "Connection: close",
+        ]
+        head += [f"{name}: {value}" for name, value in cors.items()]
+        writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1"))
+        loop = asyncio.get_running_loop()
+        with job.output_path.open("rb") as handle:
+            while True:
+                chunk = await loop.run_in_executor(None, handle.read, _FILE_CHUNK_BYTES)
+                if not chunk:
+                    break
+                writer.write(chunk)
+                await writer.drain()
+
+
+async def serve(
+    host: str,
+    port: int,
+    service: RenderService,
+    ready: Optional[asyncio.Event] = None,
+    allowed_origins: Sequence[str] = (),
+) -> None:
+    """Run the HTTP server for ``service`` until cancelled or sent ``SIGTERM``."""
+
+    service.start()
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    try:
+        loop.add_signal_handler(signal.SIGTERM, stop.set)
+    except (NotImplementedError, RuntimeError):  # pragma: no cover - Windows or not the main thread
+        pass
+    server = await asyncio.start_server(
+        RenderServer(service, allowed_origins=allowed_origins).handle, host, port
+    )
+    try:
+        async with server:
+            address = ", ".join(str(sock.getsockname()[:2]) for sock in server.sockets)
+            print(f"Serving renders on {address} with {service.worker_count} worker(s)", flush=True)
+            if ready is not None:
+                ready.set()
+            await stop.wait()
+    finally:
+        service.close()
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="travelmap serve", description="Run the local render service.")
+    parser.add_argument("--host", default="127.0.0.1", help="Address to bind (default: 127.0.0.1).")
+    parser.add_argument("--port", type=int, default=8765, help="Port to listen on (default: 8765).")
+    parser.add_argument("--jobs", type=int, default=1, help="Warm render worker processes (default: 1).")
+    parser.add_argument(
+        "--max-queue", type=int, default=16, help="Jobs allowed to wait for a worker (default: 16)."
+    )
+    parser.add_argument(
+        "--keep-jobs", type=int, default=100, help="Finished jobs (and videos) kept (default: 100)."
+    )
+    parser.add_argument(
+        "--output-dir",
+        type=Path,
+        default=Path("travelmap-jobs"),
+        help="Directory for rendered videos (default: ./travelmap-jobs).",
+    )
+    parser.add_argument(
+        "--data-dir",
+        type=Path,
+        default=None,
+        help="Directory that job configurations may read files from (default: the working directory).",
+    )
+    parser.add_argument(
+        "--allow-origin",
+        action="append",
+        default=[],
+        metavar="ORIGIN",
+        help="Web origin allowed to call the service, e.g. http://localhost:8000 (may be repeated).",
+    )
+    parser.add_argument(
+        "--pipeline-depth",
+        type=int,
+        default=DEFAULT_PIPELINE_DEPTH,
+        help=f"Frames queued between drawing and encoding in each worker (default: {DEFAULT_PIPELINE_DEPTH}).",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    args = parse_args(argv)
+    service = RenderService(
+        args.output_dir,
+        jobs=args.jobs,
+        max_queue=args.max_queue,
+        keep_jobs=args.keep_jobs,
+        pipeline_depth=args.pipeline_depth,
+        data_dir=args.data_dir,
+    )
+    try:
+        asyncio.run(serve(args.host, args.port, service, allowed_origins=args.allow_origin))
+    except KeyboardInterrupt:
+        pass
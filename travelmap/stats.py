@@ -0,0 +1,141 @@
+"""Trip statistics without rendering: ``python -m travelmap stats CONFIG...``.
+
+Reports the per-leg distances, travel times, frame counts and fuel costs that
+a render would use, plus the end-of-trip summary text, as JSON or CSV. Only
+the configuration, summary and frame planning modules are imported, never
+NumPy, matplotlib, Pillow, imageio or the render pipeline, so the command
+starts quickly enough to be called per quote by another service. Recorded
+tracks and encoded polylines are parsed with NumPy, which is then imported on
+demand.
+"""
+from __future__ import annotations
+
+import argparse
+import csv
+import json
+import sys
+from pathlib import Path
+from typing import Any, Dict, List, Optional, TextIO
+
+from .config import AnimationConfig, load_config
+from .planning import plan_frame_budget
+from .summary import compute_leg_summaries, format_summary_text
+
+STATS_FORMATS = ("json", "csv")
+_CSV_COLUMNS = (
+    "config",
+    "leg",
+    "start",
+    "end",
+    "distance_km",
+    "distance_miles",
+    "travel_hours",
+    "motion_frames",
+    "pause_frames",
+    "video_seconds",
+    "fuel_price_per_litre",
+    "fuel_cost",
+)
+
+
+def trip_stats(config: AnimationConfig) -> Dict[str, Any]:
+    """Return the statistics of ``config`` as a JSON-serialisable dict.
+
+    ``travel_hours`` is the real-world travel time at ``speed_kmh``;
+    ``motion_frames`` and ``video_seconds`` describe the rendered video, after
+    any ``target_duration`` or ``max_frames`` time warp.
+    """
+
+    if config.fleet is not None:
+        raise ValueError("Trip statistics are not available for fleet replays.")
+    waypoints = config.waypoints
+    leg_summaries, total_miles, total_cost = compute_leg_summaries(config, waypoints)
+    plan = plan_frame_budget(config, waypoints)
+    fps = config.frame_rate
+    speed = max(config.speed_kmh, 1e-6)
+
+    legs: List[Dict[str, Any]] = []
+    for index, (leg, distance_km, motion, pause) in enumerate(
+        zip(leg_summaries, plan.leg_km, plan.segment_frames, plan.stop_pause_frames),
+        start=1,
+    ):
+        legs.append(
+            {
+                "leg": index,
+                "start": leg.start_name,
+                "end": leg.end_name,
+                "distance_km": round(distance_km, 3),
+                "distance_miles": round(leg.distance_miles, 3),
+                "travel_hours": round(distance_km / speed, 4),
+                "motion_frames": motion,
+                "pause_frames": pause,
+                "video_seconds": round((motion + pause) / fps, 3),
+                "fuel_price_per_litre": leg.fuel_price_per_litre,
+                "fuel_cost": round(leg.fuel_cost, 2) if leg.fuel_cost is not None else None,
+            }
+        )
+
+    total_km = sum(plan.leg_km)
+    frame_count = plan.frame_count
+    return {
+        "title": config.title,
+        "frame_rate": fps,
+        "currency_symbol": config.currency_symbol,
+        "legs": legs,
+        "totals": {
+            "distance_km": round(total_km, 3),
+            "distance_miles": round(total_miles, 3),
+            "travel_hours": round(total_km / speed, 4),
+            "frames": frame_count,
+            "video_seconds": round(frame_count / fps, 3),
+            "fuel_cost": round(total_cost, 2) if total_cost is not None else None,
+        },
+        "summary_text": format_summary_text(config, leg_summaries, total_miles, total_cost),
+    }
+
+
+def _load(source: str) -> AnimationConfig:
+    if source == "-":
+        raw = json.load(sys.stdin)
+        if not isinstance(raw, dict):
+            raise ValueError("Configuration must contain a mapping at the top level.")
+        return AnimationConfig.from_mapping(raw, base_dir=Path.cwd())
+    return load_config(Path(source))
+
+
+def write_stats(reports: List[Dict[str, Any]], fmt: str, stream: TextIO) -> None:
+    """Write ``(config, stats)`` reports as one JSON document or as CSV rows, one per leg."""
+
+    if fmt == "json":
+        document: Any = reports[0] if len(reports) == 1 else reports
+        json.dump(document, stream, indent=2, ensure_ascii=False)
+        stream.write("\n")
+        return
+    writer = csv.DictWriter(stream, fieldnames=_CSV_COLUMNS, extrasaction="ignore", lineterminator="\n")
+    writer.writeheader()
+    for report in reports:
+        for leg in report["legs"]:
+            writer.writerow(dict(leg, config=report["config"]))
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="travelmap stats",
+        description="Print per-leg distances, durations, frame counts and fuel costs without rendering.",
+    )
+    parser.add_argument("config", nargs="+", help="Configuration files, or '-' to read JSON from stdin.")
+    parser.add_argument("--format", choices=STATS_FORMATS, default="json", help="Output format (default: json).")
+    parser.add_argument("--output", type=Path, default=None, help="Write to this file instead of stdout.")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    args = parse_args(argv)
+    reports = []
+    for source in args.config:
+        reports.append({"config": source, **trip_stats(_load(source))})
+    if args.output is None:
+        write_stats(reports, args.format, sys.stdout)
+        return
+    with args.output.open("w", encoding="utf8", newline="") as handle:
+        write_stats(reports, args.format, handle)
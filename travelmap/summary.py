@@ -0,0 +1,99 @@
+"""Per-leg distance and fuel cost summaries for an itinerary."""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import List, Optional, Sequence, Tuple
+
+from .config import LITRES_PER_GALLON, AnimationConfig, Waypoint
+from .planning import leg_lengths_km
+
+MILES_PER_KM = 0.621371
+
+
+@dataclass
+class LegSummary:
+    start_name: str
+    end_name: str
+    distance_miles: float
+    fuel_price_per_litre: Optional[float]
+    fuel_cost: Optional[float]
+
+
+def compute_leg_summaries(
+    config: AnimationConfig, waypoints: Sequence[Waypoint]
+) -> Tuple[List[LegSummary], float, Optional[float]]:
+    """Return the leg summaries, total distance in miles and total fuel cost."""
+
+    leg_summaries: List[LegSummary] = []
+    total_distance = 0.0
+    total_cost = 0.0
+    cost_available = False
+    mpg = config.vehicle.fuel_efficiency_mpg
+    default_price = config.vehicle.fuel_price_per_litre
+
+    # Legs with a path are measured along it rather than as the crow flies.
+    distances_km = leg_lengths_km(waypoints)
+
+    for start, end, distance_km in zip(waypoints[:-1], waypoints[1:], distances_km):
+        distance_miles = distance_km * MILES_PER_KM
+        total_distance += distance_miles
+
+        price = start.fuel_price_per_litre if start.fuel_price_per_litre is not None else default_price
+        fuel_cost: Optional[float] = None
+        if mpg and mpg > 0 and price is not None:
+            gallons_needed = distance_miles / mpg
+            litres_needed = gallons_needed * LITRES_PER_GALLON
+            fuel_cost = litres_needed * price
+            total_cost += fuel_cost
+            cost_available = True
+
+        leg_summaries.append(
+            LegSummary(
+                start_name=start.name,
+                end_name=end.name,
+                distance_miles=distance_miles,
+                fuel_price_per_litre=price,
+                fuel_cost=fuel_cost,
+            )
+        )
+
+    return leg_summaries, total_distance, total_cost if cost_available else None
+
+
+def format_summary_text(
+    config: AnimationConfig,
+    leg_summaries: Sequence[LegSummary],
+    total_distance_miles: float,
+    total_fuel_cost: Optional[float],
+) -> str:
+    """Return the multi-line end-of-trip summary shown on the final frames."""
+
+    if not leg_summaries:
+        return ""
+
+    lines = ["Trip Summary"]
+    for index, leg in enumerate(leg_summaries, start=1):
+        line = f"{index}. {leg.start_name} → {leg.end_name}: {leg.distance_miles:.1f} mi"
+        if leg.fuel_cost is not None:
+            line += f" | est. cost {config.currency_symbol}{leg.fuel_cost:.2f}"
+        elif (
+            leg.fuel_price_per_litre is not None
+            and config.vehicle.fuel_efficiency_mpg
+            and config.vehicle.fuel_efficiency_mpg > 0
+        ):
+            line += (
+                f" | price {config.currency_symbol}{leg.fuel_price_per_litre:.2f}/L"
+            )
+        lines.append(line)
+
+    lines.append(f"Total distance: {total_distance_miles:.1f} mi")
+    if total_fuel_cost is not None:
+        lines.append(
+            f"Estimated fuel cost: {config.currency_symbol}{total_fuel_cost:.2f}"
+        )
+
+    mpg = config.vehicle.fuel_efficiency_mpg
+    if mpg:
+        lines.append(f"Vehicle efficiency: {mpg:.1f} mpg")
+
+    return "\n".join(lines)
@@ -0,0 +1,228 @@
+"""Pyramid of pre-rendered background tiles for cameras that pan and zoom.
+
+Zoom level ``z`` maps the world onto an equirectangular image
+``TILE_SIZE * 2**z`` pixels wide, cut into square tiles. A tile is rendered
+once from the map polygons at the matching level of detail, kept in an
+in-memory LRU and saved under the array cache, so later frames, worker
+processes and runs reuse it. A frame's background is resampled from the tiles
+at the nearest finer zoom; while the zoom stays the same, frames crop a
+pre-resampled region instead, which costs about as much as copying a fixed
+backdrop.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import math
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional, Tuple
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+from .array_cache import cache_directory, load_arrays, save_arrays
+from .map_shapes import ShapeLayer
+
+RGBA = Tuple[int, int, int, int]
+
+TILE_SIZE = 256
+MAX_ZOOM = 14
+# Bump when tile drawing changes so that stale tiles on disk are not reused.
+_TILE_VERSION = 1
+_CLIP_MARGIN_PIXELS = 4.0
+
+_TileKey = Tuple[int, int, int]
+
+
+def pixels_per_degree(zoom: int) -> float:
+    return TILE_SIZE * 2.0**zoom / 360.0
+
+
+class TilePyramid:
+    """Land tiles of ``shape_layer`` drawn in the given colours, on demand.
+
+    ``memory_tiles`` bounds the in-memory LRU. Tiles are also written below
+    ``cache_dir`` (default :func:`~travelmap.array_cache.default_cache_dir`);
+    tiles without any land are never stored.
+    """
+
+    def __init__(
+        self,
+        shape_layer: ShapeLayer,
+        ocean: RGBA,
+        land: RGBA,
+        outline: RGBA,
+        outline_width: int = 1,
+        cache_dir: Optional[Path] = None,
+        memory_tiles: int = 256,
+    ) -> None:
+        self._shape_layer = shape_layer
+        self._ocean = ocean
+        self._land = land
+        self._outline = outline
+        self._outline_width = outline_width
+        self._memory_tiles = max(memory_tiles, 1)
+        self.fingerprint = hashlib.sha256(
+            json.dumps(
+                [_TILE_VERSION, TILE_SIZE, shape_layer.fingerprint, ocean, land, outline, outline_width]
+            ).encode("utf8")
+        ).hexdigest()
+        self._directory = cache_directory("tiles", self.fingerprint, cache_dir)
+        self._tiles: "OrderedDict[_TileKey, np.ndarray]" = OrderedDict()
+        self._empty = np.empty((TILE_SIZE, TILE_SIZE, 3), dtype=np.uint8)
+        self._empty[:] = ocean[:3]
+        self._mosaic_cache: Optional[Tuple[Image.Image, int, int, int]] = None
+        self._region: Optional[Tuple[float, int, int, np.ndarray]] = None
+        self._last_scale: Optional[float] = None
+
+    @staticmethod
+    def zoom_for(target_pixels_per_degree: float) -> int:
+        """Return the coarsest zoom at least as detailed as ``target_pixels_per_degree``."""
+
+        zoom = math.ceil(math.log2(max(target_pixels_per_degree, 1e-9) * 360.0 / TILE_SIZE) - 1e-9)
+        return min(max(zoom, 0), MAX_ZOOM)
+
+    # ------------------------------------------------------------------
+    # Tiles
+    # ------------------------------------------------------------------
+
+    def tile(self, zoom: int, column: int, row: int) -> np.ndarray:
+        """Return the ``(TILE_SIZE, TILE_SIZE, 3)`` RGB pixels of one tile."""
+
+        key = (zoom, column, row)
+        pixels = self._tiles.get(key)
+        if pixels is not None:
+            self._tiles.move_to_end(key)
+            return pixels
+        pixels = self._load_tile(zoom, column, row)
+        self._tiles[key] = pixels
+        if len(self._tiles) > self._memory_tiles:
+            self._tiles.popitem(last=False)
+        return pixels
+
+    def _tile_directory(self, zoom: int, column: int, row: int) -> Path:
+        return self._directory / str(zoom) / f"{column}_{row}"
+
+    def _load_tile(self, zoom: int, column: int, row: int) -> np.ndarray:
+        scale = pixels_per_degree(zoom)
+        margin = _CLIP_MARGIN_PIXELS / scale
+        lon_min = -180.0 + column * TILE_SIZE / scale
+        lat_max = 90.0 - row * TILE_SIZE / scale
+        lon_max = lon_min + TILE_SIZE / scale
+        lat_min = lat_max - TILE_SIZE / scale
+        directory = self._tile_directory(zoom, column, row)
+        cached = load_arrays(directory)
+        if cached is not None:
+            return np.array(cached[0]["pixels"])
+        rings = self._shape_layer.visible_rings(
+            lat_min - margin, lat_max + margin, lon_min - margin, lon_max + margin, scale
+        )
+        if not rings:
+            return self._empty
+
+        image = Image.new("RGBA", (TILE_SIZE, TILE_SIZE), self._ocean[:3] + (255,))
+        draw = ImageDraw.Draw(image, "RGBA")
+        for ring in rings:
+            x = (ring[:, 1] - lon_min) * scale
+            y = (lat_max - ring[:, 0]) * scale
+            polygon = list(zip(x.tolist(), y.tolist()))
+            draw.polygon(polygon, fill=self._land)
+            draw.line(polygon, fill=self._outline, width=self._outline_width)
+        pixels = np.array(image.convert("RGB"))
+        save_arrays(directory, {"pixels": pixels})
+        return pixels
+
+    # ------------------------------------------------------------------
+    # Views
+    # ------------------------------------------------------------------
+
+    def _mosaic(
+        self, zoom: int, columns: Tuple[int, int], rows: Tuple[int, int]
+    ) -> Tuple[Image.Image, int, int]:
+        """Return an image of the tile ranges with the tile column and row of its corner.
+
+        The previous mosaic is reused while it covers the ranges, which keeps
+        zoom transitions from copying the same tiles for every frame.
+        """
+
+        cached = self._mosaic_cache
+        if cached is not None:
+            image, cached_zoom, first_column, first_row = cached
+            last_column = first_column + image.width // TILE_SIZE - 1
+            last_row = first_row + image.height // TILE_SIZE - 1
+            if (
+                cached_zoom == zoom
+                and first_column <= columns[0]
+                and columns[1] <= last_column
+                and first_row <= rows[0]
+                and rows[1] <= last_row
+            ):
+                return image, first_column, first_row
+
+        # Pad by one tile so that a moving camera keeps reusing the mosaic.
+        first_column, last_column = columns[0] - 1, columns[1] + 1
+        first_row, last_row = rows[0] - 1, rows[1] + 1
+        pixels = np.empty(
+            ((last_row - first_row + 1) * TILE_SIZE, (last_column - first_column + 1) * TILE_SIZE, 3),
+            dtype=np.uint8,
+        )
+        for row in range(first_row, last_row + 1):
+            for column in range(first_column, last_column + 1):
+                y = (row - first_row) * TILE_SIZE
+                x = (column - first_column) * TILE_SIZE
+                pixels[y : y + TILE_SIZE, x : x + TILE_SIZE] = self.tile(zoom, column, row)
+        image = Image.fromarray(pixels, mode="RGB")
+        self._mosaic_cache = (image, zoom, first_column, first_row)
+        return image, first_column, first_row
+
+    def _resample(self, scale: float, left: int, top: int, width: int, height: int) -> np.ndarray:
+        """Draw the ``width`` x ``height`` region at ``(left, top)`` of the world at ``scale`` px/degree."""
+
+        zoom = self.zoom_for(scale)
+        ratio = pixels_per_degree(zoom) / scale
+        box = (left * ratio, top * ratio, (left + width) * ratio, (top + height) * ratio)
+        columns = (math.floor(box[0] / TILE_SIZE), math.ceil(box[2] / TILE_SIZE) - 1)
+        rows = (math.floor(box[1] / TILE_SIZE), math.ceil(box[3] / TILE_SIZE) - 1)
+        mosaic, first_column, first_row = self._mosaic(zoom, columns, rows)
+        origin_x, origin_y = first_column * TILE_SIZE, first_row * TILE_SIZE
+        image = mosaic.resize(
+            (width, height),
+            Image.BILINEAR,
+            box=(box[0] - origin_x, box[1] - origin_y, box[2] - origin_x, box[3] - origin_y),
+        )
+        return np.array(image.convert("RGBA"))
+
+    def render_view(
+        self, latitude: float, longitude: float, scale: float, size: Tuple[int, int]
+    ) -> Tuple[np.ndarray, Tuple[float, float]]:
+        """Return the RGBA background of a view and the ``(lat, lon)`` of its top-left corner.
+
+        The view is ``size`` ``(width, height)`` pixels at ``scale`` pixels per
+        degree, centred on ``(latitude, longitude)`` to the nearest whole pixel.
+        The returned array is a view into a cache and must not be modified.
+
+        Resampling happens once per scale for a region half a view larger on
+        each side; frames that stay at the same zoom only crop from it.
+        """
+
+        width, height = size
+        left = int(round((longitude + 180.0) * scale - width / 2.0))
+        top = int(round((90.0 - latitude) * scale - height / 2.0))
+        region = self._region
+        if region is None or region[0] != scale or not (
+            region[1] <= left
+            and left + width <= region[1] + region[3].shape[1]
+            and region[2] <= top
+            and top + height <= region[2] + region[3].shape[0]
+        ):
+            # A changing scale (a zoom transition) is only used once, so padding
+            # is only worth it when the zoom stays put.
+            pad_x, pad_y = (width // 2, height // 2) if scale == self._last_scale else (0, 0)
+            pixels = self._resample(scale, left - pad_x, top - pad_y, width + 2 * pad_x, height + 2 * pad_y)
+            region = self._region = (scale, left - pad_x, top - pad_y, pixels)
+        self._last_scale = scale
+        _, region_left, region_top, pixels = region
+        row, column = top - region_top, left - region_left
+        view = pixels[row : row + height, column : column + width]
+        return view, (90.0 - top / scale, left / scale - 180.0)
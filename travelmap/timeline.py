@@ -0,0 +1,325 @@
+"""Timeline construction: expands an itinerary into per-frame vehicle states."""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import List, Optional, Sequence, Tuple, Union, overload
+
+import numpy as np
+
+from .camera import follow_views
+from .config import AnimationConfig, Waypoint
+from .geometry import bearings_many, interpolate_great_circle_many
+from .planning import plan_frame_budget
+from .route import Route
+
+Coordinate = Tuple[float, float]
+
+
+@dataclass
+class FrameState:
+    position: Coordinate
+    traveled: List[Coordinate]
+    upcoming: List[Coordinate]
+    bearing: float
+    show_summary: bool = False
+    view: Optional[Tuple[float, float, float]] = None
+
+
+class Timeline(Sequence[FrameState]):
+    """Per-frame vehicle states backed by a handful of NumPy arrays.
+
+    Every frame's trail is a prefix of the shared ``vertices`` array, optionally
+    followed by the vehicle position, and its upcoming route is the vehicle
+    position followed by a suffix of the same array. Storing the prefix length
+    and suffix start per frame keeps memory at O(frames + vertices) instead of
+    copying the route into every frame. Indexing materialises a
+    :class:`FrameState` on demand.
+
+    Attributes:
+        vertices: ``(V, 2)`` lat/lon route vertices shared by all frames.
+        waypoint_indices: ``(W,)`` index in ``vertices`` of each waypoint.
+        positions: ``(N, 2)`` lat/lon vehicle position per frame.
+        bearings: ``(N,)`` vehicle heading in degrees per frame.
+        trail_counts: ``(N,)`` number of leading ``vertices`` in the trail.
+        trail_tails: ``(N,)`` whether the position is appended to the trail.
+        upcoming_starts: ``(N,)`` first vertex of the upcoming route, ``-1`` if none.
+        show_summary: ``(N,)`` whether the trip summary is displayed.
+        legs: ``(N,)`` index of the leg each frame belongs to. The start pause
+            belongs to the first leg, each stop pause to the leg that ends there
+            and the end pause and summary hold to the last leg.
+        paused: ``(N,)`` whether the vehicle is stationary (start, stop, end and
+            summary pauses).
+        views: ``(N, 3)`` camera centre latitude, longitude and longitude span
+            per frame, or ``None`` for the fixed viewport.
+    """
+
+    def __init__(
+        self, vertices: np.ndarray, frame_count: int, waypoint_indices: Optional[np.ndarray] = None
+    ) -> None:
+        self.vertices = vertices
+        self.waypoint_indices = (
+            np.arange(len(vertices)) if waypoint_indices is None else waypoint_indices
+        )
+        self.positions = np.zeros((frame_count, 2), dtype=np.float64)
+        self.bearings = np.zeros(frame_count, dtype=np.float64)
+        self.trail_counts = np.zeros(frame_count, dtype=np.int32)
+        self.trail_tails = np.zeros(frame_count, dtype=bool)
+        self.upcoming_starts = np.full(frame_count, -1, dtype=np.int32)
+        self.show_summary = np.zeros(frame_count, dtype=bool)
+        self.legs = np.zeros(frame_count, dtype=np.int32)
+        self.paused = np.zeros(frame_count, dtype=bool)
+        self.views: Optional[np.ndarray] = None
+
+    def __len__(self) -> int:
+        return len(self.positions)
+
+    @overload
+    def __getitem__(self, index: int) -> FrameState:
+        ...
+
+    @overload
+    def __getitem__(self, index: slice) -> List[FrameState]:
+        ...
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[FrameState, List[FrameState]]:
+        if isinstance(index, slice):
+            return [self[item] for item in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("timeline index out of range")
+        return FrameState(
+            position=_as_coordinate(self.positions[index]),
+            traveled=_as_coordinates(self.trail(index)),
+            upcoming=_as_coordinates(self.upcoming(index)),
+            bearing=float(self.bearings[index]),
+            show_summary=bool(self.show_summary[index]),
+            view=None if self.views is None else tuple(self.views[index].tolist()),
+        )
+
+    def trail(self, index: int) -> np.ndarray:
+        """Return the travelled polyline of frame ``index`` as an ``(K, 2)`` array."""
+
+        trail = self.vertices[: self.trail_counts[index]]
+        if self.trail_tails[index]:
+            trail = np.concatenate((trail, self.positions[index : index + 1]))
+        return trail
+
+    def upcoming(self, index: int) -> np.ndarray:
+        """Return the remaining route of frame ``index`` as an ``(K, 2)`` array."""
+
+        start = self.upcoming_starts[index]
+        if start < 0:
+            return self.vertices[:0]
+        return np.concatenate((self.positions[index : index + 1], self.vertices[start:]))
+
+    def runs(self, start: int = 0, stop: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Return ``(starts, lengths)`` of the runs of consecutive identical frames.
+
+        Start, stop, end and summary pauses produce long runs of frames that draw
+        exactly the same picture; each run only needs to be rendered once. Only
+        frames in ``[start, stop)`` are considered.
+        """
+
+        start, stop, _ = slice(start, stop).indices(len(self))
+        if stop <= start:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+        window = slice(start, stop)
+        positions = self.positions[window]
+        same = np.all(positions[1:] == positions[:-1], axis=1)
+        for column in (
+            self.bearings[window],
+            self.trail_counts[window],
+            self.trail_tails[window],
+            self.upcoming_starts[window],
+            self.show_summary[window],
+        ):
+            same &= column[1:] == column[:-1]
+        if self.views is not None:
+            views = self.views[window]
+            same &= np.all(views[1:] == views[:-1], axis=1)
+        starts = start + np.flatnonzero(np.concatenate(([True], ~same)))
+        lengths = np.diff(np.append(starts, stop))
+        return starts, lengths
+
+    def _fill(
+        self,
+        start: int,
+        count: int,
+        position: Coordinate,
+        bearing: float,
+        trail_count: int,
+        trail_tail: bool,
+        upcoming_start: int,
+        show_summary: bool = False,
+    ) -> int:
+        """Fill ``count`` identical stationary frames from ``start`` and return the next index."""
+
+        stop = start + count
+        self.positions[start:stop] = position
+        self.bearings[start:stop] = bearing
+        self.trail_counts[start:stop] = trail_count
+        self.trail_tails[start:stop] = trail_tail
+        self.upcoming_starts[start:stop] = upcoming_start
+        self.show_summary[start:stop] = show_summary
+        self.paused[start:stop] = True
+        return stop
+
+
+def _as_coordinate(point: np.ndarray) -> Coordinate:
+    lat, lon = point.tolist()
+    return lat, lon
+
+
+def _as_coordinates(points: np.ndarray) -> List[Coordinate]:
+    return [(lat, lon) for lat, lon in points.tolist()]
+
+
+def _segment_offsets(counts: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Return the segment index and 0-based step within the segment for each of ``sum(counts)`` items."""
+
+    segments = np.repeat(np.arange(len(counts)), counts)
+    starts = np.cumsum(counts) - counts
+    return segments, np.arange(len(segments)) - starts[segments]
+
+
+def _bearings_from(coords: np.ndarray, segments: np.ndarray, positions: np.ndarray) -> np.ndarray:
+    """Bearing from ``positions`` on route ``segments`` towards the next relevant vertex.
+
+    Positions that already coincide with the end of their segment face the
+    vertex after it. The final vertex has no onward target and faces north.
+    """
+
+    bearings = np.zeros(len(segments))
+    has_target = segments + 1 < len(coords)
+    if not has_target.any():
+        return bearings
+    segments = segments[has_target]
+    positions = positions[has_target]
+    targets = coords[segments + 1]
+    arrived = np.all(np.abs(positions - targets) <= 1e-6, axis=1) & (segments + 2 < len(coords))
+    targets[arrived] = coords[segments[arrived] + 2]
+    bearings[has_target] = bearings_many(positions, targets)
+    return bearings
+
+
+@dataclass
+class FramePlan:
+    """Frame counts of every part of the video, known before any per-frame array exists.
+
+    Attributes:
+        route: the travelled route.
+        leg_km: ``(L,)`` length of each leg along its path.
+        start_pause_frames: frames held at the first waypoint.
+        segment_frames: ``(L,)`` motion frames per leg, after any time warp.
+        stop_pause_frames: ``(L,)`` frames held at the waypoint ending each leg.
+        end_pause_frames / summary_frames: frames held after arriving.
+    """
+
+    route: Route
+    leg_km: np.ndarray
+    start_pause_frames: int
+    segment_frames: np.ndarray
+    stop_pause_frames: np.ndarray
+    end_pause_frames: int
+    summary_frames: int
+
+    @property
+    def body_frames(self) -> int:
+        """Frames up to and including the last stop pause."""
+
+        return self.start_pause_frames + int(self.segment_frames.sum() + self.stop_pause_frames.sum())
+
+    @property
+    def frame_count(self) -> int:
+        body = self.body_frames
+        return body + (self.end_pause_frames + self.summary_frames if body else 0)
+
+
+def plan_frames(config: AnimationConfig, waypoints: Sequence[Waypoint]) -> FramePlan:
+    """Return the :class:`FramePlan` of :func:`~travelmap.planning.plan_frame_budget` as arrays."""
+
+    budget = plan_frame_budget(config, waypoints)
+    return FramePlan(
+        Route.from_waypoints(waypoints),
+        np.asarray(budget.leg_km, dtype=np.float64),
+        budget.start_pause_frames,
+        np.asarray(budget.segment_frames, dtype=np.int64),
+        np.asarray(budget.stop_pause_frames, dtype=np.int64),
+        budget.end_pause_frames,
+        budget.summary_frames,
+    )
+
+
+def build_timeline(config: AnimationConfig, waypoints: Sequence[Waypoint]) -> Timeline:
+    """Expand the itinerary into a :class:`Timeline` with one entry per video frame.
+
+    The timeline is assembled with vectorised NumPy operations, so construction
+    cost grows with the number of frames rather than with Python-level work per
+    frame or per waypoint. Frame counts come from :func:`plan_frames`, before
+    any per-frame array is allocated.
+    """
+
+    plan = plan_frames(config, waypoints)
+    route = plan.route
+    vertices = route.vertices
+    waypoint_indices = route.waypoint_indices
+    start_pause_frames = plan.start_pause_frames
+    segment_frames = plan.segment_frames
+    stop_pause_frames = plan.stop_pause_frames
+    end_pause_frames = plan.end_pause_frames
+    summary_frames = plan.summary_frames
+
+    block_frames = segment_frames + stop_pause_frames
+    body_frames = plan.body_frames
+    frame_count = plan.frame_count
+    timeline = Timeline(vertices, frame_count, waypoint_indices)
+    block_starts = start_pause_frames + np.cumsum(block_frames) - block_frames
+
+    # Bearing while standing at each waypoint (start pause and stop pauses).
+    stop_bearings = _bearings_from(vertices, waypoint_indices, vertices[waypoint_indices])
+
+    # Optional pause at the start
+    if len(vertices):
+        timeline._fill(0, start_pause_frames, tuple(vertices[0]), stop_bearings[0], 1, False, 1)
+
+    # Motion frames: each leg is followed by its stop pause. The vehicle moves
+    # at constant speed along the leg's path, located through the arc-length index.
+    legs, steps = _segment_offsets(segment_frames)
+    motion = block_starts[legs] + steps
+    fractions = np.minimum(1.0, (steps + 1) / segment_frames[legs])
+    segments, local = route.locate(legs, fractions)
+    positions = interpolate_great_circle_many(vertices[segments], vertices[segments + 1], local)
+    timeline.positions[motion] = positions
+    timeline.bearings[motion] = _bearings_from(vertices, segments, positions)
+    timeline.trail_counts[motion] = segments + 1
+    timeline.legs[motion] = legs
+    timeline.trail_tails[motion] = True
+    # Once the vehicle reaches the segment end the upcoming route starts after it.
+    timeline.upcoming_starts[motion] = segments + np.where(local < 1.0, 1, 2)
+
+    legs, steps = _segment_offsets(stop_pause_frames)
+    stops = block_starts[legs] + segment_frames[legs] + steps
+    arrived = waypoint_indices[legs + 1]
+    timeline.positions[stops] = vertices[arrived]
+    timeline.bearings[stops] = stop_bearings[legs + 1]
+    timeline.trail_counts[stops] = arrived + 1
+    timeline.legs[stops] = legs
+    timeline.upcoming_starts[stops] = arrived + 1
+    timeline.paused[stops] = True
+
+    if body_frames:
+        final = body_frames - 1
+        final_state = (
+            _as_coordinate(timeline.positions[final]),
+            float(timeline.bearings[final]),
+            int(timeline.trail_counts[final]),
+            bool(timeline.trail_tails[final]),
+        )
+        timeline.legs[body_frames:] = max(len(waypoint_indices) - 2, 0)
+        cursor = timeline._fill(body_frames, end_pause_frames, *final_state, upcoming_start=-1)
+        timeline._fill(cursor, summary_frames, *final_state, upcoming_start=-1, show_summary=True)
+
+    if config.camera == "follow":
+        timeline.views = follow_views(config, timeline)
+    return timeline
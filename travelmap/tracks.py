@@ -0,0 +1,416 @@
+"""Streaming import of recorded GPS tracks (GPX and CSV) into leg geometry.
+
+Raw recordings can hold millions of points, far more than an animation can
+show. Points are parsed one at a time (``iterparse`` for GPX, a CSV reader for
+CSV) and thinned as they arrive: points closer than ``min_distance_km`` or
+``min_interval_seconds`` to the last kept point are dropped, and the survivors
+are simplified with Douglas–Peucker in fixed-size chunks. Memory therefore
+depends on the chunk size and the simplified track, not on the file size. A
+final pass simplifies the whole track to half a pixel of the map it spans.
+
+Named points become :class:`~travelmap.config.Waypoint` stops and everything
+between them becomes the ``path`` of the leg that leads to the next stop. The
+decimated track is cached as ``.npy`` arrays keyed by the source file and the
+options, so later renders of the same recording skip parsing entirely.
+"""
+from __future__ import annotations
+
+import csv
+import gzip
+import io
+import math
+import xml.etree.ElementTree as ET
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import IO, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from .array_cache import cache_directory, load_arrays, save_arrays, source_fingerprint
+from .config import Waypoint
+from .geometry import EARTH_RADIUS_KM, douglas_peucker, haversine_km_many
+
+_FORMAT_VERSION = 1
+_KM_PER_DEGREE = math.radians(EARTH_RADIUS_KM)
+
+_NAME_COLUMNS = ("name", "stop", "waypoint")
+_LATITUDE_COLUMNS = ("latitude", "lat")
+_LONGITUDE_COLUMNS = ("longitude", "lon", "lng")
+_TIME_COLUMNS = ("time", "timestamp", "datetime")
+_PAUSE_COLUMNS = ("pause", "pause_seconds")
+# Pause marker for GPX waypoints that still have to be snapped onto the track.
+_SNAP = -1.0
+
+# One parsed point: latitude, longitude, time in seconds (NaN if unknown),
+# stop name (empty for plain track points) and stop pause in seconds.
+_Point = Tuple[float, float, float, str, float]
+
+
+@dataclass
+class TrackOptions:
+    """How to thin a recording down to what the animation can show.
+
+    Attributes:
+        min_distance_km: drop points closer than this to the last kept point.
+        min_interval_seconds: drop points recorded sooner than this after the
+            last kept point (ignored for points without a time).
+        tolerance_km: Douglas–Peucker tolerance applied while streaming.
+        width: pixel width of the map; the finished track is simplified again
+            to half a pixel of its own extent at this width. ``None`` skips
+            the final pass.
+        chunk_points: thinned points buffered before each simplification.
+        pause_seconds: pause at named stops that do not set their own.
+    """
+
+    min_distance_km: float = 0.0
+    min_interval_seconds: float = 0.0
+    tolerance_km: float = 0.01
+    width: Optional[int] = 1920
+    chunk_points: int = 65536
+    pause_seconds: float = 0.0
+
+    def __post_init__(self) -> None:
+        if self.chunk_points < 2:
+            raise ValueError("Track chunk size must be at least 2 points.")
+        if self.tolerance_km < 0 or self.min_distance_km < 0 or self.min_interval_seconds < 0:
+            raise ValueError("Track decimation thresholds cannot be negative.")
+
+
+class Track:
+    """A decimated track and its named stops.
+
+    Attributes:
+        points: ``(K, 2)`` lat/lon vertices that survived decimation.
+        stop_indices: ``(S,)`` increasing index in ``points`` of each named stop.
+        stop_names: name of each stop.
+        stop_pauses: ``(S,)`` pause in seconds at each stop.
+        source_points: number of points in the recording.
+    """
+
+    def __init__(
+        self,
+        points: np.ndarray,
+        stop_indices: np.ndarray,
+        stop_names: List[str],
+        stop_pauses: np.ndarray,
+        source_points: int,
+    ) -> None:
+        self.points = points
+        self.stop_indices = stop_indices
+        self.stop_names = stop_names
+        self.stop_pauses = stop_pauses
+        self.source_points = source_points
+
+    def __len__(self) -> int:
+        return len(self.points)
+
+    @classmethod
+    def open(
+        cls, source: Path, options: Optional[TrackOptions] = None, cache_dir: Optional[Path] = None
+    ) -> "Track":
+        """Read and decimate the GPX or CSV file ``source``, reusing a cached result if possible."""
+
+        options = options or TrackOptions()
+        fingerprint = source_fingerprint(source, _FORMAT_VERSION, asdict(options))
+        directory = cache_directory("tracks", fingerprint, cache_dir)
+        cached = load_arrays(directory)
+        if cached is not None:
+            arrays, meta = cached
+            return cls(
+                np.asarray(arrays["points"]),
+                np.asarray(arrays["stop_indices"]),
+                list(meta["stop_names"]),
+                np.asarray(arrays["stop_pauses"]),
+                int(meta["source_points"]),
+            )
+
+        # Timestamps are only parsed when time-based thinning needs them.
+        points = _read_points(Path(source), with_times=options.min_interval_seconds > 0)
+        track = _decimate(points, options)
+        save_arrays(
+            directory,
+            {"points": track.points, "stop_indices": track.stop_indices, "stop_pauses": track.stop_pauses},
+            {"stop_names": track.stop_names, "source_points": track.source_points},
+        )
+        return track
+
+    def waypoints(self, start_name: str = "Start", end_name: str = "Finish") -> List[Waypoint]:
+        """Split the track at its stops into waypoints whose paths follow the recording.
+
+        The first and last point are always waypoints; they take the name of a
+        stop recorded there, or ``start_name`` / ``end_name``.
+        """
+
+        if len(self.points) < 2:
+            raise ValueError("A track needs at least two distinct points.")
+        last = len(self.points) - 1
+        names = {0: start_name, last: end_name}
+        pauses = {0: 0.0, last: 0.0}
+        for index, name, pause in zip(self.stop_indices.tolist(), self.stop_names, self.stop_pauses.tolist()):
+            names[index] = name
+            pauses[index] = pause
+
+        waypoints: List[Waypoint] = []
+        previous = 0
+        for index in sorted(names):
+            latitude, longitude = self.points[index].tolist()
+            path = None
+            if waypoints and index - previous > 1:
+                path = [(lat, lon) for lat, lon in self.points[previous + 1 : index].tolist()]
+            waypoints.append(Waypoint(names[index], latitude, longitude, pauses[index], path=path))
+            previous = index
+        return waypoints
+
+
+# ----------------------------------------------------------------------
+# Parsing
+# ----------------------------------------------------------------------
+
+
+def _open_text(path: Path) -> IO[str]:
+    if path.suffix.lower() == ".gz":
+        return io.TextIOWrapper(gzip.open(path, "rb"), encoding="utf8", newline="")
+    return path.open("r", encoding="utf8", newline="")
+
+
+def _open_binary(path: Path) -> IO[bytes]:
+    return gzip.open(path, "rb") if path.suffix.lower() == ".gz" else path.open("rb")
+
+
+def _track_format(path: Path) -> str:
+    suffixes = [suffix.lower() for suffix in path.suffixes if suffix.lower() != ".gz"]
+    kind = suffixes[-1].lstrip(".") if suffixes else ""
+    if kind not in ("gpx", "csv"):
+        raise ValueError(f"Unsupported track format for {path}; expected a .gpx or .csv file.")
+    return kind
+
+
+def _parse_time(text: Optional[str]) -> float:
+    """Seconds since the epoch for an ISO 8601 timestamp or a plain number, NaN if absent."""
+
+    if text is None or not text.strip():
+        return math.nan
+    text = text.strip()
+    try:
+        return float(text)
+    except ValueError:
+        pass
+    if text.endswith(("Z", "z")):
+        text = text[:-1] + "+00:00"
+    try:
+        moment = datetime.fromisoformat(text)
+    except ValueError as exc:
+        raise ValueError(f"Invalid track timestamp: {text!r}") from exc
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.timestamp()
+
+
+def _read_points(path: Path, with_times: bool = True) -> Iterator[_Point]:
+    reader = _read_gpx if _track_format(path) == "gpx" else _read_csv
+    return reader(path, with_times)
+
+
+def _local_name(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1]
+
+
+def _read_gpx(path: Path, with_times: bool = True) -> Iterator[_Point]:
+    """Yield track and route points in document order, then waypoints as stops.
+
+    Waypoints (``<wpt>``) carry no position in the recording, so they are
+    yielded after the track with a NaN time and snapped to it afterwards.
+    Elements are detached from their parent once read, so the parsed tree
+    never holds more than one point.
+    """
+
+    stops: List[_Point] = []
+    with _open_binary(path) as handle:
+        parents: List[ET.Element] = []
+        for event, element in ET.iterparse(handle, events=("start", "end")):
+            if event == "start":
+                parents.append(element)
+                continue
+            parents.pop()
+            kind = _local_name(element.tag)
+            if kind not in ("trkpt", "rtept", "wpt"):
+                continue
+            fields = {_local_name(child.tag): child.text for child in element}
+            try:
+                point = (
+                    float(element.attrib["lat"]),
+                    float(element.attrib["lon"]),
+                    _parse_time(fields.get("time")) if with_times else math.nan,
+                    (fields.get("name") or "").strip(),
+                    math.nan,
+                )
+            except (KeyError, ValueError) as exc:
+                raise ValueError(f"Invalid GPX {kind} in {path}: {exc}") from exc
+            element.clear()
+            if parents:
+                parents[-1].remove(element)
+            if kind == "wpt":
+                if point[3]:
+                    stops.append(point)
+            else:
+                yield point
+    for point in stops:
+        yield point[:2] + (math.nan, point[3], _SNAP)
+
+
+def _column(header: List[str], candidates: Tuple[str, ...], required: bool = True) -> Optional[int]:
+    lowered = [name.strip().lower() for name in header]
+    for candidate in candidates:
+        if candidate in lowered:
+            return lowered.index(candidate)
+    if required:
+        raise ValueError(f"Track CSV is missing a column named one of: {', '.join(candidates)}.")
+    return None
+
+
+def _read_csv(path: Path, with_times: bool = True) -> Iterator[_Point]:
+    with _open_text(path) as handle:
+        reader = csv.reader(handle)
+        header = next(reader, None)
+        if header is None:
+            raise ValueError(f"Track {path} is empty.")
+        lat_column = _column(header, _LATITUDE_COLUMNS)
+        lon_column = _column(header, _LONGITUDE_COLUMNS)
+        time_column = _column(header, _TIME_COLUMNS, required=False) if with_times else None
+        name_column = _column(header, _NAME_COLUMNS, required=False)
+        pause_column = _column(header, _PAUSE_COLUMNS, required=False)
+        for line, row in enumerate(reader, start=2):
+            if not row:
+                continue
+            try:
+                pause = row[pause_column].strip() if pause_column is not None else ""
+                yield (
+                    float(row[lat_column]),
+                    float(row[lon_column]),
+                    _parse_time(row[time_column]) if time_column is not None else math.nan,
+                    row[name_column].strip() if name_column is not None else "",
+                    max(float(pause), 0.0) if pause else math.nan,
+                )
+            except (IndexError, ValueError) as exc:
+                raise ValueError(f"Invalid track row {line} in {path}: {exc}") from exc
+
+
+# ----------------------------------------------------------------------
+# Decimation
+# ----------------------------------------------------------------------
+
+
+def _extent_km(points: np.ndarray) -> float:
+    lat_extent = float(np.ptp(points[:, 0])) * _KM_PER_DEGREE
+    middle = math.radians(float(points[:, 0].mean()))
+    lon_extent = float(np.ptp(points[:, 1])) * _KM_PER_DEGREE * math.cos(middle)
+    return max(lat_extent, lon_extent)
+
+
+def _decimate(points: Iterator[_Point], options: TrackOptions) -> Track:
+    """Thin and simplify streamed points, keeping every named stop."""
+
+    kept: List[np.ndarray] = []
+    stop_indices: List[int] = []
+    stop_names: List[str] = []
+    stop_pauses: List[float] = []
+    snapped: List[_Point] = []
+
+    # Thinned points waiting for simplification; a chunk's last point starts
+    # the next chunk so that chunk boundaries do not open gaps.
+    buffer: List[Tuple[float, float]] = []
+    forced: List[bool] = []
+    buffer_stops: List[Tuple[int, str, float]] = []
+    kept_count = 0
+    source_points = 0
+    last: Optional[Tuple[float, float, float]] = None
+    pending: Optional[Tuple[float, float]] = None
+    cos_lat = 1.0
+
+    def flush(final: bool) -> None:
+        nonlocal kept_count
+        if len(buffer) < 2 and not final:
+            return
+        chunk = np.array(buffer, dtype=np.float64).reshape(-1, 2)
+        mask = douglas_peucker(chunk, options.tolerance_km, np.array(forced, dtype=bool))
+        positions = np.cumsum(mask) - 1
+        # The carried-over first point was already emitted with the previous chunk.
+        skip = 1 if kept_count else 0
+        kept.append(chunk[mask][skip:])
+        for index, name, pause in buffer_stops:
+            stop_indices.append(kept_count - skip + int(positions[index]))
+            stop_names.append(name)
+            stop_pauses.append(pause)
+        kept_count += int(mask.sum()) - skip
+        del buffer[:-1], buffer_stops[:]
+        forced[:] = [True]
+
+    for latitude, longitude, seconds, name, pause in points:
+        if pause == _SNAP:
+            snapped.append((latitude, longitude, seconds, name, pause))
+            continue
+        source_points += 1
+        if last is not None and not name:
+            dy = (latitude - last[0]) * _KM_PER_DEGREE
+            dx = (longitude - last[1]) * _KM_PER_DEGREE * cos_lat
+            too_soon = options.min_interval_seconds > 0 and seconds - last[2] < options.min_interval_seconds
+            if too_soon or math.hypot(dx, dy) < options.min_distance_km:
+                pending = (latitude, longitude)
+                continue
+        last = (latitude, longitude, seconds if not math.isnan(seconds) else -math.inf)
+        cos_lat = math.cos(math.radians(latitude))
+        pending = None
+        if name:
+            buffer_stops.append((len(buffer), name, options.pause_seconds if math.isnan(pause) else pause))
+        buffer.append((latitude, longitude))
+        forced.append(bool(name) or len(forced) == 0)
+        if len(buffer) >= options.chunk_points:
+            flush(final=False)
+    if pending is not None:
+        # The end of the recording is always kept, however close it is.
+        buffer.append(pending)
+        forced.append(True)
+    if not buffer:
+        raise ValueError("The track does not contain any points.")
+    flush(final=True)
+
+    track_points = np.concatenate(kept)
+    indices = np.array(stop_indices, dtype=np.int64)
+    if options.width and len(track_points) > 2:
+        tolerance = 0.5 * _extent_km(track_points) / max(options.width, 1)
+        keep = np.zeros(len(track_points), dtype=bool)
+        keep[indices] = True
+        mask = douglas_peucker(track_points, tolerance, keep)
+        indices = (np.cumsum(mask) - 1)[indices]
+        track_points = track_points[mask]
+
+    names = list(stop_names)
+    pauses = list(stop_pauses)
+    if snapped:
+        # Snap each GPX waypoint to the nearest vertex of the simplified track.
+        targets = np.array([point[:2] for point in snapped], dtype=np.float64)
+        nearest = [
+            int(np.argmin(haversine_km_many(track_points, target[None, :]))) for target in targets
+        ]
+        indices = np.concatenate((indices, np.array(nearest, dtype=np.int64)))
+        names += [point[3] for point in snapped]
+        pauses += [options.pause_seconds] * len(snapped)
+    order = np.argsort(indices, kind="stable")
+    # Several stops can land on the same vertex; the first one wins.
+    order = order[np.diff(indices[order], prepend=-1) > 0]
+    return Track(
+        track_points,
+        indices[order],
+        [names[index] for index in order.tolist()],
+        np.array(pauses, dtype=np.float64)[order],
+        source_points,
+    )
+
+
+def load_track_waypoints(
+    source: Path, options: Optional[TrackOptions] = None, cache_dir: Optional[Path] = None
+) -> List[Waypoint]:
+    """Read a GPX or CSV recording and return its stops as waypoints with leg paths."""
+
+    return Track.open(source, options, cache_dir).waypoints()